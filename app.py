@@ -3,6 +3,7 @@ from flask_session import Session
 import os
 import sys
 import logging
+import multiprocessing
 from dotenv import load_dotenv
 
 # Configure logging for Railway
@@ -13,17 +14,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Certificate renderer processes (spawn) re-import this module as __mp_main__ to unpickle
+# their work; only the server process itself initialises the database and starts threads
+IS_MAIN_PROCESS = multiprocessing.current_process().name == 'MainProcess'
+
 # Log startup
-logger.info("="*60)
-logger.info("🚀 Starting WAPL ID Management System")
-logger.info(f"PORT environment variable: {os.environ.get('PORT', 'NOT SET')}")
-logger.info("="*60)
+if IS_MAIN_PROCESS:
+    logger.info("="*60)
+    logger.info("🚀 Starting WAPL ID Management System")
+    logger.info(f"PORT environment variable: {os.environ.get('PORT', 'NOT SET')}")
+    logger.info("="*60)
 
 # Load environment variables from .env file
 load_dotenv()
 
 # Import database
-from database import init_db, db
+from database import init_db, db, init_app as init_db_unit_of_work
+from jobs import start_worker_threads
+from outbox import start_sender_threads
+import tasks  # registers background job handlers
 
 
 # Import blueprints
@@ -55,6 +64,9 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file upload
 # Initialize session
 Session(app)
 
+# One DB connection and one transaction per request
+init_db_unit_of_work(app)
+
 
 # ==================== DIRECTORY SETUP ====================
 
@@ -95,13 +107,20 @@ except Exception as e:
     # Fallback to current directory to prevent crash
     UPLOAD_BASE_PATH = '.'
 
-# Initialize database
-try:
-    init_db()
-    logger.info("Database initialized successfully")
-except Exception as e:
-    logger.error(f"Database initialization failed: {e}")
-    # We continue startup so the app can at least bind the port and show logs
+if IS_MAIN_PROCESS:
+    # Initialize database
+    try:
+        init_db()
+        logger.info("Database initialized successfully")
+    except Exception as e:
+        logger.error(f"Database initialization failed: {e}")
+        # We continue startup so the app can at least bind the port and show logs
+
+    # Background job workers (certificate issuance); set JOB_WORKER_THREADS=0 when `python worker.py` runs separately
+    start_worker_threads(int(os.environ.get('JOB_WORKER_THREADS', 2)))
+
+    # Email outbox senders; handlers only queue mail (see outbox.py)
+    start_sender_threads(int(os.environ.get('EMAIL_SENDER_THREADS', 1)))
 
 
 
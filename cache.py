@@ -0,0 +1,75 @@
+"""
+In-process caching helpers.
+
+Caches live per worker process: gunicorn workers do not share them, so every
+entry must be safe to serve for up to its TTL after a write in another worker.
+Writes in this process invalidate immediately through db.on_table_write().
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire ``ttl`` seconds after being set"""
+
+    def __init__(self, ttl=30.0, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a load that raced a write is not stored
+        self._generation = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, loader, ttl=None):
+        """
+        Return the cached value, calling ``loader()`` to fill it on a miss.
+        ``ttl`` may be a function of the loaded value (e.g. to stop at an expiry date).
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            generation = self._generation
+            value = loader()
+            with self._lock:
+                stale = generation != self._generation
+            if not stale:
+                self.set(key, value, ttl(value) if callable(ttl) else ttl)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
@@ -3,13 +3,16 @@ import os
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from datetime import datetime
-from werkzeug.security import generate_password_hash
 from contextlib import contextmanager
 import secrets
 import string
 import urllib.parse
+import re
 import logging
 import socket
+import threading
+import time
+from flask import g, has_request_context, current_app
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -21,6 +24,9 @@ if os.environ.get('VERCEL') or os.environ.get('RENDER'):
 else:
     DB_NAME = 'wapl.db'
 
+# UPDATE ... RETURNING needs SQLite 3.35+ (PostgreSQL always has it)
+SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
 def get_db_type():
     """Return 'postgres' or 'sqlite'"""
     return 'postgres' if os.environ.get('DATABASE_URL') else 'sqlite'
@@ -33,10 +39,94 @@ def is_postgres():
     """Check if using PostgreSQL"""
     return get_db_type() == 'postgres'
 
+# ==================== DNS CACHE ====================
+
+DB_DNS_TTL = float(os.environ.get('DB_DNS_TTL', 300))
+DB_DNS_RETRY = float(os.environ.get('DB_DNS_RETRY', 30))
+
+
+class HostResolver:
+    """
+    IPv4 resolution cache for the database host.
+
+    Only the very first lookup of a hostname blocks. After that the cached
+    address is always returned immediately; once it is older than ``ttl``
+    a background thread re-resolves it, and if that lookup fails the last
+    known-good address keeps being served (retried every ``retry`` seconds).
+    """
+
+    def __init__(self, ttl=300.0, retry=30.0):
+        self.ttl = ttl
+        self.retry = retry
+        self._entries = {}  # hostname -> [address, refresh_due_at]
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _lookup(self, hostname):
+        return socket.getaddrinfo(hostname, None, socket.AF_INET)[0][4][0]
+
+    def resolve(self, hostname):
+        with self._lock:
+            entry = self._entries.get(hostname)
+
+        if entry is None:
+            address = self._lookup(hostname)
+            with self._lock:
+                self._entries[hostname] = [address, time.monotonic() + self.ttl]
+            logger.info(f"🔧 Resolved {hostname} to IPv4: {address}")
+            return address
+
+        address, refresh_due_at = entry
+        if time.monotonic() >= refresh_due_at:
+            self._refresh_in_background(hostname)
+        return address
+
+    def mark_stale(self, hostname):
+        """Ask for a re-resolution on next use (e.g. after a failed connect)"""
+        with self._lock:
+            entry = self._entries.get(hostname)
+            if entry:
+                entry[1] = 0
+
+    def _refresh_in_background(self, hostname):
+        with self._lock:
+            if hostname in self._refreshing:
+                return
+            self._refreshing.add(hostname)
+        threading.Thread(target=self._refresh, args=(hostname,), name='dns-refresh', daemon=True).start()
+
+    def _refresh(self, hostname):
+        try:
+            address = self._lookup(hostname)
+            with self._lock:
+                previous = self._entries.get(hostname, [None])[0]
+                self._entries[hostname] = [address, time.monotonic() + self.ttl]
+            if address != previous:
+                logger.info(f"🔧 {hostname} now resolves to IPv4: {address} (was {previous})")
+        except Exception as e:
+            with self._lock:
+                entry = self._entries.get(hostname)
+                if entry:
+                    entry[1] = time.monotonic() + self.retry
+            logger.warning(f"⚠️ DNS refresh for {hostname} failed, keeping last known-good address: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(hostname)
+
+    def reset_after_fork(self):
+        # Refresh threads do not survive fork(); keep the addresses, drop the bookkeeping
+        self._lock = threading.Lock()
+        self._refreshing = set()
+
+
+_resolver = HostResolver(ttl=DB_DNS_TTL, retry=DB_DNS_RETRY)
+
+
 def resolve_supabase_ipv4(db_url):
     """
     Fix Supabase IPv6 issue on Railway by resolving hostname to IPv4.
     Railway doesn't support IPv6 outbound connections to Supabase.
+    Lookups go through the cached resolver, so DNS stays off the query path.
     """
     try:
         # Parse the URL to get the hostname
@@ -45,276 +135,538 @@ def resolve_supabase_ipv4(db_url):
         
         if hostname and 'supabase.co' in hostname:
             # Force IPv4 resolution
-            ipv4_addr = socket.getaddrinfo(hostname, None, socket.AF_INET)[0][4][0]
+            ipv4_addr = _resolver.resolve(hostname)
             # Replace hostname with IPv4 in the URL
             new_netloc = parsed.netloc.replace(hostname, ipv4_addr)
             new_url = parsed._replace(netloc=new_netloc).geturl()
-            logger.info(f"🔧 Resolved Supabase to IPv4: {ipv4_addr}")
             return new_url
     except Exception as e:
         logger.warning(f"⚠️ Could not resolve IPv4: {e}")
     
     return db_url
 
+# ==================== CONNECTION POOL ====================
+
+# Pool sizing and health-check settings (per process)
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', 1))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 10))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+DB_POOL_PING_AFTER = float(os.environ.get('DB_POOL_PING_AFTER', 30))
+DB_POOL_RECYCLE = float(os.environ.get('DB_POOL_RECYCLE', 1800))
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of open database connections owned by one process.
+
+    Idle connections are health-checked on checkout (pinged when they have
+    been idle longer than ``ping_after`` seconds, replaced when older than
+    ``recycle`` seconds) and the pool is reset after ``fork()`` so gunicorn
+    workers never share a socket with the master.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=30.0, ping_after=30.0, recycle=1800.0):
+        self._connect = connect
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.recycle = recycle
+        self._reset_state()
+
+    def _reset_state(self):
+        self._cond = threading.Condition()
+        self._idle = []        # [(conn, created_at, last_used)]
+        self._created = {}     # id(conn) -> created_at
+        self._size = 0         # idle + checked out
+        self._warmed = False
+        self._pid = os.getpid()
+
+    def _open(self):
+        conn = self._connect()
+        self._created[id(conn)] = time.monotonic()
+        return conn
+
+    def _close(self, conn):
+        self._created.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, created_at, last_used):
+        """Cheap checks first, round-trip ping only for long-idle connections"""
+        now = time.monotonic()
+        if getattr(conn, 'closed', 0):
+            return False
+        if self.recycle and now - created_at > self.recycle:
+            return False
+        if self.ping_after and now - last_used > self.ping_after:
+            try:
+                cursor = conn.cursor()
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+                conn.rollback()
+            except Exception:
+                return False
+        return True
+
+    def _warm(self, slots):
+        """
+        Open ``slots`` idle connections (reserved by the caller under the lock).
+        Runs without the lock so a slow connect never blocks other threads.
+        """
+        opened = []
+        for _ in range(slots):
+            try:
+                opened.append(self._open())
+            except Exception as e:
+                logger.warning(f"⚠️ Could not pre-open pooled connection: {e}")
+                break
+        now = time.monotonic()
+        with self._cond:
+            self._idle.extend((conn, now, now) for conn in opened)
+            self._size -= slots - len(opened)
+            self._cond.notify_all()
+
+    def acquire(self):
+        """Check out a healthy connection, waiting up to ``timeout`` seconds"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            warm_slots = 0
+            with self._cond:
+                if self._pid != os.getpid():
+                    self._reset_state()
+                if not self._warmed:
+                    # Reserve the min_size slots now, open them after releasing the lock
+                    self._warmed = True
+                    warm_slots = max(0, self.min_size - self._size)
+                    self._size += warm_slots
+            if warm_slots:
+                self._warm(warm_slots)
+
+            with self._cond:
+                entry = None
+                while True:
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"Timed out waiting for a database connection (pool size {self.max_size})")
+                    self._cond.wait(remaining)
+
+            if entry is None:
+                try:
+                    return self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            conn, created_at, last_used = entry
+            if self._is_healthy(conn, created_at, last_used):
+                return conn
+
+            # Stale connection: drop it and try again with a fresh slot
+            self._close(conn)
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, resetting any open transaction"""
+        if self._pid != os.getpid():
+            # Connection belongs to the parent process - never touch its socket
+            return
+
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        if getattr(conn, 'closed', 0):
+            discard = True
+
+        with self._cond:
+            if discard:
+                self._size -= 1
+            else:
+                created_at = self._created.get(id(conn), time.monotonic())
+                self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+
+        if discard:
+            self._close(conn)
+
+    def close_idle(self):
+        """Close every idle connection (checked-out connections are untouched)"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._warmed = False
+        for conn, _, _ in idle:
+            self._close(conn)
+
+    def reset_after_fork(self):
+        """Forget inherited connections without closing the parent's sockets"""
+        self._reset_state()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _connect_postgres(db_url):
+    connect_url = db_url
+    # Fix Supabase IPv6 issue - resolve to IPv4
+    if 'supabase.co' in db_url:
+        connect_url = resolve_supabase_ipv4(db_url)
+
+    # PostgreSQL Connection with timeout
+    try:
+        return psycopg2.connect(
+            connect_url,
+            cursor_factory=RealDictCursor,
+            connect_timeout=10
+        )
+    except psycopg2.OperationalError:
+        if connect_url != db_url:
+            # The cached address may have moved - re-resolve in the background
+            _resolver.mark_stale(urllib.parse.urlparse(db_url).hostname)
+        raise
+
+
+def _connect_sqlite():
+    # Add 30-second timeout to prevent lock errors
+    conn = sqlite3.connect(DB_NAME, timeout=30.0, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    # Enable WAL mode for better concurrency (persisted per connection, so only once)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA busy_timeout=30000')  # 30 seconds
+    return conn
+
+
+def get_pool():
+    """Return the process-wide pool for the configured database"""
+    db_url = os.environ.get('DATABASE_URL')
+    key = db_url or f"sqlite:{DB_NAME}"
+
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                if db_url:
+                    connect = lambda: _connect_postgres(db_url)
+                else:
+                    connect = _connect_sqlite
+                pool = ConnectionPool(
+                    connect,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    ping_after=DB_POOL_PING_AFTER,
+                    recycle=DB_POOL_RECYCLE
+                )
+                _pools[key] = pool
+    return pool
+
+
+def _close_pools_before_fork():
+    # Idle sockets must not be inherited by gunicorn workers
+    for pool in list(_pools.values()):
+        pool.close_idle()
+
+
+def _reset_in_child():
+    global _pools_lock
+    _pools_lock = threading.Lock()
+    for pool in list(_pools.values()):
+        pool.reset_after_fork()
+    _resolver.reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before=_close_pools_before_fork, after_in_child=_reset_in_child)
+
+
+def _is_connection_error(error):
+    """True when the error means the connection itself is unusable"""
+    return isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError, sqlite3.ProgrammingError))
+
+
 @contextmanager
 def get_db_connection():
-    """Get database connection (PostgreSQL or SQLite)"""
-    conn = None
-    db_url = os.environ.get('DATABASE_URL')
-    
+    """Check out a pooled database connection (PostgreSQL or SQLite)"""
+    pool = get_pool()
+    conn = pool.acquire()
+    discard = False
+
     try:
-        if db_url:
-            # Fix Supabase IPv6 issue - resolve to IPv4
-            if 'supabase.co' in db_url:
-                db_url = resolve_supabase_ipv4(db_url)
-            
-            # PostgreSQL Connection with timeout
-            conn = psycopg2.connect(
-                db_url, 
-                cursor_factory=RealDictCursor,
-                connect_timeout=10
-            )
-            yield conn
-        else:
-            # SQLite Connection
-            # Add 30-second timeout to prevent lock errors
-            conn = sqlite3.connect(DB_NAME, timeout=30.0, check_same_thread=False)
-            conn.row_factory = sqlite3.Row
-            # Enable WAL mode for better concurrency
-            conn.execute('PRAGMA journal_mode=WAL')
-            conn.execute('PRAGMA busy_timeout=30000')  # 30 seconds
-            yield conn
+        yield conn
     except Exception as e:
-        if conn:
+        discard = _is_connection_error(e)
+        try:
             conn.rollback()
+        except Exception:
+            discard = True
         raise e
     finally:
-        if conn:
-            conn.close()
+        pool.release(conn, discard=discard)
 
-def init_db():
-    """Initialize database with all tables"""
+# ==================== INDEXES ====================
+
+# Representative hot queries, used by index_usage_report() to show which plans hit an index
+HOT_QUERIES = [
+    ('student by user', 'SELECT * FROM students WHERE user_id = ?', (1,)),
+    ('hr by user', 'SELECT * FROM hrs WHERE user_id = ?', (1,)),
+    ('admin by user', 'SELECT * FROM admins WHERE user_id = ?', (1,)),
+    ('students assigned to hr', 'SELECT id FROM students WHERE assigned_hr_id = ?', (1,)),
+    ('students by status', 'SELECT id FROM students WHERE account_status = ?', ('active',)),
+    ('recruitment status lookup', 'SELECT * FROM recruitment_status WHERE student_id = ? AND hr_id = ?', (1, 1)),
+    ('recruitment by status', 'SELECT COUNT(*) FROM recruitment_status WHERE status = ?', ('shortlisted',)),
+    ('active certificate', 'SELECT * FROM certificates WHERE student_id = ? AND is_active = ?', (1, True)),
+    ('pending otp', 'SELECT * FROM otp_verifications WHERE user_id = ? AND purpose = ? AND is_used = ?', (1, 'registration', False)),
+    ('students in domain', 'SELECT student_id FROM student_domains WHERE domain_id = ?', (1,)),
+    ('students with skill', 'SELECT student_id FROM student_skills WHERE skill IN (?, ?)', ('python', 'sql')),
+    ('student list page', "SELECT id FROM students s WHERE (COALESCE(s.registration_date, '1970-01-01 00:00:00'), s.id) < (?, ?) ORDER BY COALESCE(s.registration_date, '1970-01-01 00:00:00') DESC, s.id DESC LIMIT 50", ('2100-01-01', 0)),
+]
+
+
+def index_usage_report():
+    """
+    Run EXPLAIN over HOT_QUERIES and report which secondary index each plan uses.
+    On PostgreSQL the planner may still pick a sequential scan on tiny tables.
+    """
     db_type = get_db_type()
-    
-    try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Define types for PostgreSQL compatibility
-            if db_type == 'postgres':
-                pk_type = "SERIAL PRIMARY KEY"
-                datetime_default = "DEFAULT CURRENT_TIMESTAMP"
-                # Boolean in postgres is valid, same as sqlite (0/1 works in sqlite, true/false in pg)
-            else:
-                pk_type = "INTEGER PRIMARY KEY AUTOINCREMENT"
-                datetime_default = "DEFAULT CURRENT_TIMESTAMP"
-
-            # Users table
-            cursor.execute(f'''
-                CREATE TABLE IF NOT EXISTS users (
-                    id {pk_type},
-                    email TEXT UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL,
-                role TEXT NOT NULL CHECK(role IN ('student', 'hr', 'admin')),
-                is_verified BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP {datetime_default},
-                last_login TIMESTAMP
-            )
-        ''')
-        
-        # Domains table
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS domains (
-                id {pk_type},
-                domain_name TEXT NOT NULL UNIQUE,
-                is_active BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP {datetime_default},
-                created_by_admin_id INTEGER
-            )
-        ''')
-        
-        # Admins table
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS admins (
-                id {pk_type},
-                user_id INTEGER NOT NULL,
-                full_name TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                is_super_admin INTEGER DEFAULT 0,
-                created_by_admin_id INTEGER,
-                created_at TIMESTAMP {datetime_default},
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (created_by_admin_id) REFERENCES admins(id)
-            )
-        ''')
-        
-        # Data migration steps (adding columns if missing) would go here
-        # For new deployment validation, we skip manual ALTERs for readability 
-        # as CREATE IF NOT EXISTS handles clean state.
-        
-        # HRs table
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS hrs (
-                id {pk_type},
-                user_id INTEGER NOT NULL,
-                full_name TEXT NOT NULL,
-                company_name TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                designation TEXT NOT NULL,
-                created_by_admin_id INTEGER,
-                created_at TIMESTAMP {datetime_default},
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (created_by_admin_id) REFERENCES admins(id)
-            )
-        ''')
-        
-        # Students table
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS students (
-                id {pk_type},
-                user_id INTEGER NOT NULL,
-                wapl_id TEXT UNIQUE NOT NULL,
-                full_name TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                profile_pic TEXT,
-                resume TEXT,
-                domain_id INTEGER,
-                registration_date TIMESTAMP {datetime_default},
-                certificate_issued_date TIMESTAMP,
-                certificate_expiry_date TIMESTAMP,
-                assigned_hr_id INTEGER,
-                address TEXT,
-                education_details TEXT,
-                skills TEXT,
-                projects TEXT,
-                account_status TEXT NOT NULL DEFAULT 'pending',
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (domain_id) REFERENCES domains(id),
-                FOREIGN KEY (assigned_hr_id) REFERENCES hrs(id)
-            )
-        ''')
-
-        # Student-Domain junction table (MANY-TO-MANY)
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS student_domains (
-                id {pk_type},
-                student_id INTEGER NOT NULL,
-                domain_id INTEGER NOT NULL,
-                created_at TIMESTAMP {datetime_default},
-                FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
-                FOREIGN KEY (domain_id) REFERENCES domains(id) ON DELETE CASCADE,
-                UNIQUE(student_id, domain_id)
-            )
-        ''')
-        
-        # OTP verifications table
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS otp_verifications (
-                id {pk_type},
-                user_id INTEGER NOT NULL,
-                otp_code TEXT NOT NULL,
-                purpose TEXT NOT NULL CHECK(purpose IN ('registration', 'login', 'password_reset')),
-                is_used BOOLEAN DEFAULT FALSE,
-                expires_at TIMESTAMP NOT NULL,
-                created_at TIMESTAMP {datetime_default},
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        ''')
-        
-        # Certificates table
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS certificates (
-                id {pk_type},
-                student_id INTEGER NOT NULL,
-                certificate_unique_id TEXT UNIQUE NOT NULL,
-                issue_date TIMESTAMP NOT NULL,
-                expiry_date TIMESTAMP NOT NULL,
-                qr_code TEXT NOT NULL,
-                pdf_path TEXT NOT NULL,
-                is_active BOOLEAN DEFAULT TRUE,
-                issued_by_hr_id INTEGER,
-                display_name TEXT,
-                FOREIGN KEY (student_id) REFERENCES students(id),
-                FOREIGN KEY (issued_by_hr_id) REFERENCES hrs(id)
-            )
-        ''')
-
-        # Recruitment status table
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS recruitment_status (
-                id {pk_type},
-                student_id INTEGER NOT NULL,
-                hr_id INTEGER NOT NULL,
-                status TEXT NOT NULL DEFAULT 'viewed',
-                notes TEXT,
-                created_at TIMESTAMP {datetime_default},
-                updated_at TIMESTAMP {datetime_default},
-                FOREIGN KEY (student_id) REFERENCES students(id),
-                FOREIGN KEY (hr_id) REFERENCES hrs(id)
-            )
-        ''')
-
-        # Certificate audit table
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS certificate_audit (
-                id {pk_type},
-                certificate_id INTEGER NOT NULL,
-                action TEXT NOT NULL,
-                reason TEXT,
-                changed_by_admin_id INTEGER,
-                created_at TIMESTAMP {datetime_default},
-                FOREIGN KEY (certificate_id) REFERENCES certificates(id),
-                FOREIGN KEY (changed_by_admin_id) REFERENCES users(id)
-            )
-        ''')
+    report = []
 
-        conn.commit()
-        
-        # Initialize default data if empty (simplified check)
-        # In a real migration we'd check properly, here we check users count
-        cursor.execute("SELECT COUNT(*) as count FROM users")
-        if get_db_type() == 'postgres':
-            count = cursor.fetchone()['count']
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        if db_type == 'postgres':
+            cursor.execute("SELECT indexname AS name FROM pg_indexes WHERE schemaname = current_schema() AND indexname LIKE 'idx_%'")
         else:
-            count = cursor.fetchone()[0]
-
-        if count == 0:
-            print("🆕 Empty database detected, initializing defaults...")
-            # Pre-populate domains
-            default_domains = ['AI', 'ML', 'DevOps', 'Web Development', 'Data Science']
-            for domain in default_domains:
-                if get_db_type() == 'postgres':
-                    cursor.execute('INSERT INTO domains (domain_name, is_active) VALUES (%s, TRUE) ON CONFLICT DO NOTHING', (domain,))
-                else:
-                    cursor.execute('INSERT OR IGNORE INTO domains (domain_name, is_active) VALUES (?, 1)', (domain,))
-            
-            # Create default SUPER admin account
-            admin_email = 'admin@wapl.com'
-            admin_password_hash = generate_password_hash('admin123')
-            
-            insert_user_sql = "INSERT INTO users (email, password_hash, role, is_verified) VALUES (?, ?, 'admin', ?)"
-            if get_db_type() == 'postgres':
-                insert_user_sql = insert_user_sql.replace('?', '%s') + " RETURNING id"
-                cursor.execute(insert_user_sql, (admin_email, admin_password_hash, True))
-                admin_user_id = cursor.fetchone()['id']
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'")
+        index_names = sorted(row['name'] for row in cursor.fetchall())
+
+        for label, query, params in HOT_QUERIES:
+            if db_type == 'postgres':
+                cursor.execute('EXPLAIN ' + query.replace('?', '%s'), params)
+                plan = [row['QUERY PLAN'] for row in cursor.fetchall()]
             else:
-                cursor.execute(insert_user_sql, (admin_email, admin_password_hash, 1))
-                admin_user_id = cursor.lastrowid
-            
-            insert_admin_sql = "INSERT INTO admins (user_id, full_name, phone, is_super_admin) VALUES (?, 'Super Admin', '1234567890', 1)"
-            if get_db_type() == 'postgres':
-                insert_admin_sql = insert_admin_sql.replace('?', '%s')
-            
-            cursor.execute(insert_admin_sql, (admin_user_id,))
-            print("✅ Default Super Admin created")
-            conn.commit()
+                cursor.execute('EXPLAIN QUERY PLAN ' + query, params)
+                plan = [row[-1] for row in cursor.fetchall()]
+
+            plan_text = '\n'.join(plan)
+            report.append({
+                'query': label,
+                'sql': query,
+                'plan': plan,
+                'indexes_used': [name for name in index_names if name in plan_text],
+            })
 
-        print(f"✅ Database initialized successfully ({db_type.upper()})")
+    return {'db_type': db_type, 'indexes': index_names, 'queries': report}
+
+
+def auto_migrate_enabled():
+    """
+    Whether web workers may apply pending migrations themselves.
+    Defaults to on for SQLite (local / single-box) and off for PostgreSQL,
+    where `python migrate.py` runs once per deploy instead.
+    """
+    default = 'false' if get_db_type() == 'postgres' else 'true'
+    return os.environ.get('AUTO_MIGRATE', default).lower() in ('1', 'true', 'yes')
+
+
+def init_db():
+    """Check the schema version at startup; apply pending migrations only if AUTO_MIGRATE is on"""
+    import migrations
+
+    db_type = get_db_type()
+
+    try:
+        pending = migrations.pending()
+
+        if not pending:
+            print(f"✅ Database schema up to date ({db_type.upper()})")
+        elif auto_migrate_enabled():
+            migrations.upgrade()
+            print(f"✅ Database initialized successfully ({db_type.upper()})")
+        else:
+            names = ', '.join(f"{m['version']:04d}_{m['name']}" for m in pending)
+            logger.warning(f"⚠️ {len(pending)} pending migration(s): {names} - run `python migrate.py upgrade`")
     except Exception as e:
         logger.error(f"❌ Database initialization failed: {e}")
         logger.warning("⚠️ App will start but database features may not work until DB is accessible")
         # Don't crash the app - let it start and handle DB errors at request time
 
+# ==================== UNIT OF WORK ====================
+
+
+class UnitOfWork:
+    """
+    One pooled connection and one transaction shared by several queries.
+
+    Bound to Flask's ``g`` for the duration of an HTTP request (see
+    ``init_app``) or to the current thread via ``db.transaction()``.
+    Writes are not committed per statement; ``commit()`` flushes them all
+    at once and ``close()`` rolls back anything left uncommitted.
+    """
+
+    def __init__(self):
+        self._pool = None
+        self.conn = None
+        self.has_writes = False
+        self.failed = False
+        self.written_tables = set()
+        self._after_commit = []
+        self._savepoints = 0
+
+    def connection(self):
+        if self.conn is None:
+            self._pool = get_pool()
+            self.conn = self._pool.acquire()
+        return self.conn
+
+    def commit(self):
+        if self.conn is not None:
+            if self.failed and get_db_type() == 'postgres':
+                # PostgreSQL silently turns COMMIT of an aborted transaction into ROLLBACK
+                self.rollback()
+                raise RuntimeError("Transaction aborted by an earlier failed statement; changes were rolled back")
+            if self.has_writes:
+                self.conn.commit()
+        self.has_writes = False
+
+        # Only now are the writes visible to other connections
+        tables, self.written_tables = self.written_tables, set()
+        callbacks, self._after_commit = self._after_commit, []
+        _notify_table_writes(tables)
+        for callback in callbacks:
+            _run_callback(callback)
+
+    @contextmanager
+    def savepoint(self):
+        """
+        Let a block fail without aborting the whole transaction: on error only
+        its own statements are rolled back (PostgreSQL otherwise rejects every
+        statement after a failed one until the transaction ends).
+        """
+        conn = self.connection()
+        cursor = conn.cursor()
+        if get_db_type() == 'sqlite' and not conn.in_transaction:
+            # Releasing a savepoint that opened the transaction would commit it
+            cursor.execute('BEGIN')
+        self._savepoints += 1
+        name = f"uow_sp_{self._savepoints}"
+        failed = self.failed
+        cursor.execute(f'SAVEPOINT {name}')
+        try:
+            yield
+        except Exception:
+            cursor.execute(f'ROLLBACK TO SAVEPOINT {name}')
+            cursor.execute(f'RELEASE SAVEPOINT {name}')
+            self.failed = failed
+            raise
+        else:
+            cursor.execute(f'RELEASE SAVEPOINT {name}')
+        finally:
+            self._savepoints -= 1
+
+    def rollback(self):
+        self.written_tables = set()
+        self._after_commit = []
+        if self.conn is None:
+            return
+        self.conn.rollback()
+        self.has_writes = False
+        self.failed = False
+
+    def close(self, error=None):
+        self.written_tables = set()
+        self._after_commit = []
+        if self.conn is None:
+            return
+        conn, self.conn = self.conn, None
+        discard = error is not None and _is_connection_error(error)
+        # release() rolls back whatever was not committed
+        self._pool.release(conn, discard=discard)
+
+
+_local = threading.local()
+
+
+# ==================== WRITE NOTIFICATIONS ====================
+
+_WRITE_TARGET = re.compile(r'^\s*(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|UPDATE|DELETE\s+FROM)\s+(\w+)', re.IGNORECASE)
+
+_table_write_listeners = []  # [(tables, callback)]
+
+
+def _written_tables(query):
+    """Table a single INSERT/UPDATE/DELETE statement writes to (empty set for reads)"""
+    match = _WRITE_TARGET.match(query)
+    return {match.group(1).lower()} if match else set()
+
+
+def _run_callback(callback):
+    try:
+        callback()
+    except Exception as e:
+        logger.warning(f"⚠️ After-commit callback {getattr(callback, '__name__', callback)} failed: {e}")
+
+
+def _notify_table_writes(tables):
+    if not tables:
+        return
+    for listen_tables, callback in _table_write_listeners:
+        if tables & listen_tables:
+            _run_callback(callback)
+
+
+def _current_unit_of_work():
+    """Return the active unit of work: explicit transaction first, then the request's"""
+    uow = getattr(_local, 'uow', None)
+    if uow is not None:
+        return uow
+
+    if has_request_context() and current_app.extensions.get('db_unit_of_work'):
+        uow = g.get('_db_uow')
+        if uow is None:
+            uow = UnitOfWork()
+            g._db_uow = uow
+        return uow
+
+    return None
+
+
+def init_app(app):
+    """Give every request a single connection and a single transaction"""
+    app.extensions['db_unit_of_work'] = True
+
+    @app.after_request
+    def _commit_unit_of_work(response):
+        uow = g.get('_db_uow')
+        if uow is not None:
+            # Handlers turn exceptions into 5xx responses - treat those as failures
+            if response.status_code >= 500:
+                uow.rollback()
+            else:
+                uow.commit()
+        return response
+
+    @app.teardown_request
+    def _close_unit_of_work(error=None):
+        uow = g.pop('_db_uow', None)
+        if uow is not None:
+            uow.close(error)
+
+
 # Database helper class
 class db:
     @staticmethod
@@ -326,67 +678,224 @@ class db:
         if db_type == 'postgres':
             query = query.replace('?', '%s')
         
+        uow = _current_unit_of_work()
+        if uow is not None:
+            return db._execute(uow.connection(), query, params, fetch_one, fetch_all, db_type, uow)
+        
         with get_db_connection() as conn:
-            cursor = conn.cursor()
+            result = db._execute(conn, query, params, fetch_one, fetch_all, db_type)
+        _notify_table_writes(_written_tables(query))
+        return result
+    
+    @staticmethod
+    def _execute(conn, query, params, fetch_one, fetch_all, db_type, uow=None):
+        """Run one statement; commit immediately unless it belongs to a unit of work"""
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(query, params)
+        except Exception as e:
+            print(f"❌ Query Error: {e} | Query: {query}")
+            if uow is not None:
+                uow.failed = True
+            raise e
+        
+        # Determine if this is a write operation
+        is_write = query.strip().upper().startswith(('INSERT', 'UPDATE', 'DELETE', 'CREATE', 'ALTER', 'DROP'))
+        if uow is not None and is_write:
+            uow.has_writes = True
+            uow.written_tables.update(_written_tables(query))
+        
+        if fetch_one:
+            result = cursor.fetchone()
+            if is_write and uow is None:
+                conn.commit()
             
-            try:
-                cursor.execute(query, params)
-            except Exception as e:
-                print(f"❌ Query Error: {e} | Query: {query}")
-                raise e
+            # Normalize result (RealDictCursor returns dict, sqlite3.Row returns dict-like)
+            if result is None:
+                return None
+            return dict(result)
             
-            # Determine if this is a write operation
-            is_write = query.strip().upper().startswith(('INSERT', 'UPDATE', 'DELETE', 'CREATE', 'ALTER', 'DROP'))
+        elif fetch_all:
+            results = cursor.fetchall()
+            if is_write and uow is None:
+                conn.commit()
+            return [dict(row) for row in results]
             
-            if fetch_one:
-                result = cursor.fetchone()
-                if is_write:
-                    conn.commit()
-                
-                # Normalize result (RealDictCursor returns dict, sqlite3.Row returns dict-like)
-                if result is None:
-                    return None
-                return dict(result)
-                
-            elif fetch_all:
-                results = cursor.fetchall()
-                if is_write:
-                    conn.commit()
-                return [dict(row) for row in results]
-                
-            else:
-                # For INSERT/UPDATE/DELETE operations
-                # Handle returning ID differences
-                last_id = None
-                
-                if query.strip().upper().startswith('INSERT'):
-                    if db_type == 'postgres':
-                        # In Postgres, we need RETURNING id to get last_id if it wasn't there
-                        # But since we are modifying execute_query generic wrapper, we can't easily append RETURNING id
-                        # unless the query already has it.
-                        # LIMITATION: This simple adapter won't auto-return ID for PG unless query has RETURNING id.
-                        # We will rely on cursor.fetchone() if RETURNING is present.
-                         if 'RETURNING' in query.upper():
-                            res = cursor.fetchone()
-                            if res:
-                                try:
-                                    last_id = res['id']
-                                except:
-                                    pass
-                    else:
-                        last_id = cursor.lastrowid
-                        
+        else:
+            # For INSERT/UPDATE/DELETE operations
+            # Handle returning ID differences
+            last_id = None
+            
+            if query.strip().upper().startswith('INSERT'):
+                if db_type == 'postgres':
+                    # In Postgres, we need RETURNING id to get last_id if it wasn't there
+                    # But since we are modifying execute_query generic wrapper, we can't easily append RETURNING id
+                    # unless the query already has it.
+                    # LIMITATION: This simple adapter won't auto-return ID for PG unless query has RETURNING id.
+                    # We will rely on cursor.fetchone() if RETURNING is present.
+                     if 'RETURNING' in query.upper():
+                        res = cursor.fetchone()
+                        if res:
+                            try:
+                                last_id = res['id']
+                            except:
+                                pass
+                else:
+                    last_id = cursor.lastrowid
+                    
+            if uow is None:
                 conn.commit()
-                return last_id
+            return last_id
     
     @staticmethod
     def execute_many(query, params_list):
         """Execute multiple queries"""
+        db._write(query, params_list, many=True)
+    
+    @staticmethod
+    def execute_update(query, params=()):
+        """Run an UPDATE/DELETE and return how many rows it changed (e.g. for conditional claims)"""
+        return db._write(query, params)
+    
+    @staticmethod
+    def _write(query, params, many=False):
+        """Run a write statement (or executemany) and return the cursor's rowcount"""
         db_type = get_db_type()
         if db_type == 'postgres':
             query = query.replace('?', '%s')
+        
+        uow = _current_unit_of_work()
+        if uow is not None:
+            cursor = uow.connection().cursor()
+            try:
+                if many:
+                    cursor.executemany(query, params)
+                else:
+                    cursor.execute(query, params)
+            except Exception:
+                uow.failed = True
+                raise
+            uow.has_writes = True
+            uow.written_tables.update(_written_tables(query))
+            return cursor.rowcount
             
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.executemany(query, params_list)
+            if many:
+                cursor.executemany(query, params)
+            else:
+                cursor.execute(query, params)
+            rowcount = cursor.rowcount
             conn.commit()
+        _notify_table_writes(_written_tables(query))
+        return rowcount
+    
+    @staticmethod
+    def batch_load(query, parent_ids, key, params=(), chunk_size=500):
+        """
+        Fetch related rows for many parents with one IN query per chunk
+        instead of one query per parent.
+
+        ``query`` marks the IN list with ``{ids}``, e.g.
+        "SELECT * FROM student_domains WHERE student_id IN ({ids})";
+        ``params`` fill any placeholders before it. Returns
+        {parent_id: [rows]} grouped by the ``key`` column, in query order.
+        """
+        parent_ids = list(dict.fromkeys(parent_ids))
+        grouped = {}
+        for start in range(0, len(parent_ids), chunk_size):
+            chunk = parent_ids[start:start + chunk_size]
+            rows = db.execute_query(
+                query.format(ids=','.join('?' * len(chunk))),
+                tuple(params) + tuple(chunk),
+                fetch_all=True
+            )
+            for row in rows:
+                grouped.setdefault(row[key], []).append(row)
+        return grouped
+    
+    @staticmethod
+    def commit():
+        """Commit the current unit of work early (e.g. before sending email)"""
+        uow = _current_unit_of_work()
+        if uow is not None:
+            uow.commit()
+    
+    @staticmethod
+    def rollback():
+        """Discard uncommitted writes of the current unit of work"""
+        uow = _current_unit_of_work()
+        if uow is not None:
+            uow.rollback()
+    
+    @staticmethod
+    def lock_for_write():
+        """
+        SQLite: take the write lock now (BEGIN IMMEDIATE) so the reads that follow
+        cannot change before this unit of work's writes. Call it before the first
+        write; no-op on PostgreSQL, outside a unit of work or once a write was made.
+        """
+        uow = _current_unit_of_work()
+        if uow is None or get_db_type() != 'sqlite':
+            return
+        conn = uow.connection()
+        if not conn.in_transaction:
+            conn.execute('BEGIN IMMEDIATE')
+            uow.has_writes = True
+    
+    @staticmethod
+    def after_commit(callback):
+        """Run ``callback()`` once the current unit of work commits (immediately if there is none)"""
+        uow = _current_unit_of_work()
+        if uow is not None:
+            uow._after_commit.append(callback)
+        else:
+            _run_callback(callback)
+    
+    @staticmethod
+    def on_table_write(tables, callback):
+        """Call ``callback()`` after every commit that wrote to any of ``tables``"""
+        _table_write_listeners.append((frozenset(t.lower() for t in tables), callback))
+    
+    @staticmethod
+    @contextmanager
+    def savepoint():
+        """
+        Wrap statements whose failure the caller catches and recovers from, e.g.
+        ``with db.savepoint(): db.execute_query("INSERT ...")`` inside try/except.
+        Without a unit of work every statement commits on its own, so this is a no-op.
+        """
+        uow = _current_unit_of_work()
+        if uow is None:
+            yield
+            return
+        with uow.savepoint():
+            yield
+    
+    @staticmethod
+    @contextmanager
+    def transaction():
+        """
+        Run several execute_query calls on one connection and commit once.
+        Inside a request this joins the request's unit of work.
+        """
+        if _current_unit_of_work() is not None:
+            yield
+            return
+        
+        uow = UnitOfWork()
+        _local.uow = uow
+        try:
+            yield
+            uow.commit()
+        except Exception as e:
+            try:
+                uow.rollback()
+            except Exception:
+                pass
+            _local.uow = None
+            uow.close(e)
+            raise
+        _local.uow = None
+        uow.close()
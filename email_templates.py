@@ -0,0 +1,83 @@
+"""
+Email bodies rendered from the Jinja templates in templates/email/.
+
+The environment is standalone, so background senders and workers can render
+without a Flask app context. Templates are compiled once at import and only
+rendered per call - the variables (OTP codes, names, WAPL IDs) are unique per
+email and must not linger in a cache. The plain text part is generated from
+the HTML so each email is only written once.
+"""
+
+import os
+import re
+from html.parser import HTMLParser
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+
+EMAIL_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'email')
+
+_env = Environment(
+    loader=FileSystemLoader(EMAIL_TEMPLATE_DIR),
+    autoescape=select_autoescape(['html']),
+    auto_reload=False,  # compiled once; no stat() per render
+)
+
+# Compile every email template at startup so a broken template fails the deploy, not a send
+_templates = {
+    name: _env.get_template(name)
+    for name in sorted(os.listdir(EMAIL_TEMPLATE_DIR))
+    if name.endswith('.html') and name != 'base.html'
+}
+
+
+def render_email(name, **context):
+    """(html_body, text_body) of templates/email/<name> rendered with ``context``"""
+    html_body = _templates[name].render(**context)
+    return html_body, html_to_text(html_body)
+
+
+class _TextExtractor(HTMLParser):
+    """Collects readable text: block elements become line breaks, list items bullets, links keep their URL"""
+
+    _BLOCKS = {'p', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'tr', 'table', 'br'}
+    _SKIP = {'head', 'style', 'script', 'title'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skipping = 0
+        self._href = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skipping += 1
+        elif tag in self._BLOCKS:
+            self.parts.append('\n')
+        elif tag == 'li':
+            self.parts.append('\n- ')
+        elif tag == 'a':
+            self._href = dict(attrs).get('href')
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in self._BLOCKS:
+            self.parts.append('\n')
+        elif tag == 'a' and self._href:
+            self.parts.append(f' ({self._href})')
+            self._href = None
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(re.sub(r'\s+', ' ', data))
+
+
+def html_to_text(html_body):
+    """Plain-text alternative of an HTML email"""
+    extractor = _TextExtractor()
+    extractor.feed(html_body)
+    extractor.close()
+
+    lines = [line.strip() for line in ''.join(extractor.parts).split('\n')]
+    text = '\n'.join(lines)
+    return re.sub(r'\n{3,}', '\n\n', text).strip() + '\n'
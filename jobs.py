@@ -0,0 +1,310 @@
+"""
+Durable background job queue backed by the ``jobs`` / ``job_items`` tables.
+
+A job is enqueued with one item per unit of work (e.g. one student). Workers -
+threads inside each web process and/or ``python worker.py`` processes - claim
+items with a conditional UPDATE, so an item is only ever held by one worker.
+A claim is a lease: if the worker dies, the item becomes claimable again once
+``locked_until`` has passed. A failed attempt puts the item back to pending
+with ``locked_until`` set to an exponential backoff before the next claim.
+
+Handlers registered with ``batch_size > 1`` receive several items of the same
+job at once, so they can fan CPU-bound work (certificate rendering) out over a
+process pool and scale with the cores.
+"""
+
+import os
+import json
+import socket
+import logging
+import functools
+import threading
+import multiprocessing
+from datetime import datetime, timedelta
+from database import db, is_postgres
+
+logger = logging.getLogger(__name__)
+
+JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 300))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))
+JOB_RETRY_BASE_SECONDS = float(os.environ.get('JOB_RETRY_BASE_SECONDS', 10))
+JOB_RETRY_MAX_SECONDS = float(os.environ.get('JOB_RETRY_MAX_SECONDS', 600))
+
+_handlers = {}
+_wakeup = threading.Event()
+_worker_threads = []
+
+
+class JobItemError(Exception):
+    """Permanent failure of a single item (bad input) - recorded without retrying"""
+
+
+class _LeaseLost(Exception):
+    """The item's lease expired and another worker claimed it"""
+
+
+def register(job_type, batch_size=1):
+    """
+    Decorator registering the handler of a job type.
+
+    With ``batch_size == 1`` it is ``handler(item_key, payload) -> result``.
+    Otherwise it is ``handler(item_keys, payload) -> {item_key: outcome}``,
+    where an outcome is either an exception or a ``commit()`` callable that
+    performs the item's writes and returns its result. Either way an item's
+    writes commit in the same transaction as its 'done' mark.
+    """
+    def decorator(handler):
+        _handlers[job_type] = (handler, batch_size)
+        return handler
+    return decorator
+
+
+def enqueue(job_type, item_keys, payload=None, created_by_user_id=None):
+    """Create a job with one pending item per key and return its id"""
+    item_keys = [str(key) for key in dict.fromkeys(item_keys)]
+
+    with db.transaction():
+        insert_job_sql = "INSERT INTO jobs (job_type, payload, total_items, created_by_user_id) VALUES (?, ?, ?, ?)"
+        job_params = (job_type, json.dumps(payload or {}), len(item_keys), created_by_user_id)
+        if is_postgres():
+            job_id = db.execute_query(insert_job_sql + " RETURNING id", job_params, fetch_one=True)['id']
+        else:
+            job_id = db.execute_query(insert_job_sql, job_params)
+
+        db.execute_many(
+            "INSERT INTO job_items (job_id, item_key) VALUES (?, ?)",
+            [(job_id, key) for key in item_keys]
+        )
+
+        # Nudge idle in-process workers as soon as the job is visible
+        db.after_commit(_wakeup.set)
+
+    return job_id
+
+
+def claim_next(worker_id, job_id=None):
+    """Lease the oldest claimable item (of ``job_id``, if given) to this worker; None if there is none"""
+    now = datetime.now()
+    # A pending item's locked_until is its retry backoff; a running item's is its lease
+    query = """SELECT id FROM job_items
+               WHERE ((status = 'pending' AND (locked_until IS NULL OR locked_until < ?))
+                      OR (status = 'running' AND locked_until < ?))"""
+    params = [now, now]
+    if job_id is not None:
+        query += " AND job_id = ?"
+        params.append(job_id)
+    candidates = db.execute_query(query + " ORDER BY id LIMIT 10", tuple(params), fetch_all=True)
+
+    for candidate in candidates:
+        # Only one worker's UPDATE can match; the others see rowcount 0 and move on
+        claimed = db.execute_update(
+            """UPDATE job_items
+               SET status = 'running', locked_by = ?, locked_until = ?, attempts = attempts + 1, updated_at = ?
+               WHERE id = ? AND ((status = 'pending' AND (locked_until IS NULL OR locked_until < ?))
+                                 OR (status = 'running' AND locked_until < ?))""",
+            (worker_id, now + timedelta(seconds=JOB_LEASE_SECONDS), now, candidate['id'], now, now)
+        )
+        if claimed == 1:
+            return db.execute_query(
+                """SELECT ji.*, j.job_type, j.payload
+                   FROM job_items ji
+                   JOIN jobs j ON ji.job_id = j.id
+                   WHERE ji.id = ?""",
+                (candidate['id'],),
+                fetch_one=True
+            )
+
+    return None
+
+
+def retry_delay(attempts):
+    """Seconds before a failed item may be claimed again: exponential, capped, so a transient fault is not retried in a burst"""
+    return min(JOB_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)), JOB_RETRY_MAX_SECONDS)
+
+
+def _finish_item(item, worker_id, status, result=None, error=None):
+    """Record the outcome and bump the job counters; must run inside db.transaction()"""
+    now = datetime.now()
+    changed = db.execute_update(
+        """UPDATE job_items
+           SET status = ?, result = ?, error = ?, locked_by = NULL, locked_until = NULL, updated_at = ?
+           WHERE id = ? AND locked_by = ? AND status = 'running'""",
+        (status, json.dumps(result) if result is not None else None, error, now, item['id'], worker_id)
+    )
+    if changed != 1:
+        raise _LeaseLost()
+
+    counter = 'succeeded_items' if status == 'done' else 'failed_items'
+    db.execute_update(
+        f"UPDATE jobs SET processed_items = processed_items + 1, {counter} = {counter} + 1 WHERE id = ?",
+        (item['job_id'],)
+    )
+    db.execute_update(
+        """UPDATE jobs
+           SET status = CASE WHEN succeeded_items = 0 THEN 'failed' ELSE 'completed' END, finished_at = ?
+           WHERE id = ? AND processed_items >= total_items AND status IN ('queued', 'running')""",
+        (now, item['job_id'])
+    )
+
+
+def process_items(items, worker_id):
+    """Run the handler for claimed items of one job and record each outcome"""
+    job_id = items[0]['job_id']
+    job_type = items[0]['job_type']
+    payload = json.loads(items[0]['payload']) if items[0]['payload'] else {}
+
+    db.execute_update(
+        "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ? AND status = 'queued'",
+        (datetime.now(), job_id)
+    )
+
+    handler, batch_size = _handlers.get(job_type, (None, 1))
+    outcomes = {}
+    runnable = []
+    for item in items:
+        if handler is None:
+            outcomes[item['item_key']] = JobItemError(f"No handler registered for job type '{job_type}'")
+        elif item['attempts'] > JOB_MAX_ATTEMPTS:
+            outcomes[item['item_key']] = JobItemError(f"Gave up after {JOB_MAX_ATTEMPTS} attempts")
+        else:
+            runnable.append(item['item_key'])
+
+    if runnable and batch_size == 1:
+        for key in runnable:
+            outcomes[key] = functools.partial(handler, key, payload)
+    elif runnable:
+        try:
+            outcomes.update(handler(runnable, payload))
+        except Exception as e:
+            outcomes.update({key: e for key in runnable})
+
+    for item in items:
+        _complete_item(item, worker_id, outcomes.get(item['item_key'], RuntimeError('Handler returned no outcome')))
+
+
+def _complete_item(item, worker_id, outcome):
+    label = f"job {item['job_id']} item {item['item_key']}"
+
+    try:
+        if isinstance(outcome, Exception):
+            raise outcome
+
+        # The item's writes and its 'done' mark commit together
+        with db.transaction():
+            result = outcome()
+            _finish_item(item, worker_id, 'done', result=result)
+        print(f"✅ {label} done")
+
+    except _LeaseLost:
+        logger.warning(f"⚠️ {label}: lease expired before it finished, result discarded")
+
+    except JobItemError as e:
+        print(f"❌ {label} failed: {e}")
+        try:
+            with db.transaction():
+                _finish_item(item, worker_id, 'failed', error=str(e))
+        except _LeaseLost:
+            pass
+
+    except Exception as e:
+        if item['attempts'] < JOB_MAX_ATTEMPTS:
+            delay = retry_delay(item['attempts'])
+            logger.warning(f"⚠️ {label} attempt {item['attempts']} failed, retrying in {delay:.0f}s: {e}")
+            now = datetime.now()
+            db.execute_update(
+                """UPDATE job_items SET status = 'pending', locked_by = NULL, locked_until = ?, error = ?, updated_at = ?
+                   WHERE id = ? AND locked_by = ? AND status = 'running'""",
+                (now + timedelta(seconds=delay), str(e), now, item['id'], worker_id)
+            )
+        else:
+            print(f"❌ {label} failed after {item['attempts']} attempts: {e}")
+            try:
+                with db.transaction():
+                    _finish_item(item, worker_id, 'failed', error=str(e))
+            except _LeaseLost:
+                pass
+
+
+def get_job(job_id):
+    """Job progress plus per-item outcomes, or None if the job does not exist"""
+    job = db.execute_query("SELECT * FROM jobs WHERE id = ?", (job_id,), fetch_one=True)
+    if not job:
+        return None
+
+    items = db.execute_query(
+        "SELECT item_key, status, attempts, result, error FROM job_items WHERE job_id = ? ORDER BY id",
+        (job_id,),
+        fetch_all=True
+    )
+
+    total = job['total_items']
+    return {
+        'id': job['id'],
+        'job_type': job['job_type'],
+        'status': job['status'],
+        'total': total,
+        'processed': job['processed_items'],
+        'succeeded': job['succeeded_items'],
+        'failed': job['failed_items'],
+        'progress': round(100.0 * job['processed_items'] / total, 1) if total else 100.0,
+        'created_at': str(job['created_at']) if job['created_at'] else None,
+        'started_at': str(job['started_at']) if job['started_at'] else None,
+        'finished_at': str(job['finished_at']) if job['finished_at'] else None,
+        'items': [{
+            'key': item['item_key'],
+            'status': item['status'],
+            'attempts': item['attempts'],
+            'result': json.loads(item['result']) if item['result'] else None,
+            'error': item['error'] if item['status'] == 'failed' else None
+        } for item in items]
+    }
+
+
+def run_worker(worker_id=None, stop_event=None, poll_interval=JOB_POLL_INTERVAL):
+    """Claim and process items until ``stop_event`` is set"""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    stop_event = stop_event or threading.Event()
+
+    while not stop_event.is_set():
+        try:
+            item = claim_next(worker_id)
+        except Exception as e:
+            logger.error(f"❌ Job worker {worker_id} could not poll the queue: {e}")
+            stop_event.wait(poll_interval)
+            continue
+
+        if item is None:
+            _wakeup.wait(poll_interval)
+            _wakeup.clear()
+            continue
+
+        # Batch handlers get more items of the same job in one go
+        items = [item]
+        batch_size = _handlers.get(item['job_type'], (None, 1))[1]
+        while len(items) < batch_size:
+            try:
+                extra = claim_next(worker_id, job_id=item['job_id'])
+            except Exception:
+                break
+            if extra is None:
+                break
+            items.append(extra)
+
+        process_items(items, worker_id)
+
+
+def start_worker_threads(count):
+    """Run ``count`` daemon worker threads inside this process (once per process)"""
+    if count <= 0 or any(thread.is_alive() for thread in _worker_threads):
+        return
+    # Renderer / worker.py child processes re-import the app; they must not poll the queue too.
+    # parent_process() is still None while a spawned child imports __main__, its name is not.
+    if multiprocessing.current_process().name != 'MainProcess':
+        return
+
+    for index in range(count):
+        thread = threading.Thread(target=run_worker, name=f'job-worker-{index}', daemon=True)
+        thread.start()
+        _worker_threads.append(thread)
+    print(f"✅ Started {count} background job worker thread(s)")
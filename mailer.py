@@ -0,0 +1,361 @@
+"""
+Outgoing mail transports.
+
+Providers share one interface - ``send_batch(messages)`` taking dicts with
+to_email, subject, text_body and html_body and returning one exception-or-None
+per message - and ``send_with_providers`` tries them in order, handing each
+provider only what the previous ones could not deliver:
+
+* ResendProvider posts over one keep-alive ``requests.Session`` and uses
+  Resend's ``/emails/batch`` endpoint (100 messages per call) for fan-out.
+* SMTPProvider sends over pooled, logged-in SMTP sessions. Opening a Gmail
+  session costs a TCP connect, EHLO, STARTTLS and a login; the pool keeps
+  sessions open, NOOP-checks idle ones, replaces dropped ones and sends many
+  messages per session.
+
+``python resend_stub.py`` serves a local stand-in for the Resend API
+(point ``RESEND_API_URL`` at it).
+"""
+
+import os
+import time
+import socket
+import smtplib
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from email.mime.base import MIMEBase
+from email import encoders
+
+SMTP_HOST = os.environ.get('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', 587))
+SMTP_SSL_PORT = int(os.environ.get('SMTP_SSL_PORT', 465))
+SMTP_TIMEOUT = float(os.environ.get('SMTP_TIMEOUT', 30))
+SMTP_POOL_SIZE = int(os.environ.get('SMTP_POOL_SIZE', 2))
+# Idle sessions are NOOP-checked after this many seconds and dropped after SMTP_MAX_IDLE
+SMTP_NOOP_AFTER = float(os.environ.get('SMTP_NOOP_AFTER', 15))
+SMTP_MAX_IDLE = float(os.environ.get('SMTP_MAX_IDLE', 240))
+# Gmail drops sessions after ~100 messages; start a fresh one before that
+SMTP_MESSAGES_PER_SESSION = int(os.environ.get('SMTP_MESSAGES_PER_SESSION', 90))
+
+RESEND_API_URL = os.environ.get('RESEND_API_URL', 'https://api.resend.com').rstrip('/')
+RESEND_TIMEOUT = float(os.environ.get('RESEND_TIMEOUT', 30))
+# Resend accepts at most 100 emails per batch call
+RESEND_BATCH_SIZE = min(100, int(os.environ.get('RESEND_BATCH_SIZE', 100)))
+
+# The session is gone; reconnecting and resending is safe
+_DISCONNECTED = (smtplib.SMTPServerDisconnected, ConnectionError, socket.timeout, OSError)
+
+
+def build_message(sender, to_email, subject, text_body, html_body=None, attachment_path=None):
+    """MIME message with a plain-text part, an optional HTML alternative and an optional attachment"""
+    message = MIMEMultipart('alternative')
+    message['From'] = sender
+    message['To'] = to_email
+    message['Subject'] = subject
+
+    message.attach(MIMEText(text_body, 'plain'))
+    if html_body:
+        message.attach(MIMEText(html_body, 'html'))
+
+    if attachment_path and os.path.exists(attachment_path):
+        with open(attachment_path, 'rb') as attachment:
+            part = MIMEBase('application', 'octet-stream')
+            part.set_payload(attachment.read())
+            encoders.encode_base64(part)
+            part.add_header('Content-Disposition', f'attachment; filename= {os.path.basename(attachment_path)}')
+            message.attach(part)
+    return message
+
+
+class _Session:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.sent = 0
+
+
+class SMTPPool:
+    """Bounded pool of logged-in SMTP sessions, safe to share between threads"""
+
+    def __init__(self, user, password, host=SMTP_HOST, port=SMTP_PORT, ssl_port=SMTP_SSL_PORT,
+                 size=SMTP_POOL_SIZE, timeout=SMTP_TIMEOUT):
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = port
+        self.ssl_port = ssl_port
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._idle = []
+        self._open_count = 0
+
+    def _connect(self):
+        # Port 587 with STARTTLS first (more compatible with cloud platforms), then 465 over SSL
+        print(f"📧 Connecting to {self.host}:{self.port} (STARTTLS)...", flush=True)
+        try:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            smtp.ehlo()
+            smtp.starttls()
+            smtp.ehlo()
+        except Exception as e:
+            print(f"📧 Port {self.port} failed ({e}), trying port {self.ssl_port} (SSL)...", flush=True)
+            smtp = smtplib.SMTP_SSL(self.host, self.ssl_port, timeout=self.timeout)
+
+        try:
+            smtp.login(self.user, self.password)
+        except Exception:
+            self._quit(smtp)
+            raise
+        print(f"📧 SMTP session opened as {self.user}", flush=True)
+        return _Session(smtp)
+
+    @staticmethod
+    def _quit(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _is_usable(self, session):
+        idle = time.monotonic() - session.last_used
+        if idle > SMTP_MAX_IDLE or session.sent >= SMTP_MESSAGES_PER_SESSION:
+            return False
+        if idle > SMTP_NOOP_AFTER:
+            try:
+                return session.smtp.noop()[0] == 250
+            except Exception:
+                return False
+        return True
+
+    def acquire(self):
+        """Check out a logged-in session, opening one if the pool has room"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                if self._pid != os.getpid():
+                    # Inherited over fork - the sockets belong to the parent
+                    self._reset_state()
+                session = None
+                while True:
+                    if self._idle:
+                        session = self._idle.pop()
+                        break
+                    if self._open_count < self.size:
+                        self._open_count += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"Timed out waiting for an SMTP session (pool size {self.size})")
+                    self._cond.wait(remaining)
+
+            if session is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    self._forget()
+                    raise
+
+            if self._is_usable(session):
+                return session
+            self._quit(session.smtp)
+            self._forget()
+
+    def _forget(self):
+        with self._cond:
+            self._open_count -= 1
+            self._cond.notify()
+
+    def release(self, session, discard=False):
+        if self._pid != os.getpid():
+            return
+        if discard:
+            self._quit(session.smtp)
+            self._forget()
+            return
+        session.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(session)
+            self._cond.notify()
+
+    def send_many(self, messages):
+        """
+        Send MIME messages over pooled sessions; returns one exception-or-None per message.
+
+        A dropped session is replaced and the message resent once; a message the
+        server refuses fails on its own without affecting the rest of the batch.
+        """
+        results = []
+        session = None
+        try:
+            for message in messages:
+                for attempt in (1, 2):
+                    if session is None:
+                        try:
+                            session = self.acquire()
+                        except Exception as e:
+                            results.append(e)
+                            break
+                    try:
+                        session.smtp.send_message(message)
+                        session.sent += 1
+                        results.append(None)
+                        break
+                    except smtplib.SMTPRecipientsRefused as e:
+                        results.append(e)
+                        break
+                    except smtplib.SMTPResponseException as e:
+                        # 4xx/5xx for this message; 421 means the server is closing the session
+                        if e.smtp_code == 421 and attempt == 1:
+                            self.release(session, discard=True)
+                            session = None
+                            continue
+                        results.append(e)
+                        break
+                    except _DISCONNECTED as e:
+                        self.release(session, discard=True)
+                        session = None
+                        if attempt == 2:
+                            results.append(e)
+                if session is not None and session.sent >= SMTP_MESSAGES_PER_SESSION:
+                    self.release(session, discard=True)
+                    session = None
+        finally:
+            if session is not None:
+                self.release(session)
+        return results
+
+    def close_idle(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open_count -= len(idle)
+            self._cond.notify_all()
+        for session in idle:
+            self._quit(session.smtp)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_smtp_pool(user, password):
+    """Process-wide SMTP pool for these credentials"""
+    with _pools_lock:
+        pool = _pools.get((user, password))
+        if pool is None:
+            pool = _pools[(user, password)] = SMTPPool(user, password)
+        return pool
+
+
+# ==================== PROVIDERS ====================
+
+class EmailProviderError(Exception):
+    """The provider rejected or could not take a message"""
+
+
+class ResendProvider:
+    """Resend HTTP API over a pooled keep-alive session"""
+
+    name = 'resend'
+
+    def __init__(self, api_key, sender, api_url=RESEND_API_URL, timeout=RESEND_TIMEOUT, batch_size=RESEND_BATCH_SIZE):
+        self.sender = sender
+        self.api_url = api_url.rstrip('/')
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+        # Sender threads share the session; keep one connection per thread
+        self.session.mount(self.api_url, HTTPAdapter(pool_connections=1, pool_maxsize=8))
+
+    def _payload(self, message):
+        payload = {
+            "from": self.sender,
+            "to": [message['to_email']],
+            "subject": message['subject'],
+            "text": message['text_body'],
+        }
+        if message.get('html_body'):
+            payload["html"] = message['html_body']
+        return payload
+
+    def _post(self, path, body):
+        response = self.session.post(f"{self.api_url}{path}", json=body, timeout=self.timeout)
+        if response.status_code != 200:
+            raise EmailProviderError(f"Resend API error: {response.status_code} - {response.text}")
+        return response.json()
+
+    def send(self, message):
+        self._post('/emails', self._payload(message))
+
+    def send_batch(self, messages):
+        if len(messages) == 1:
+            try:
+                self.send(messages[0])
+                return [None]
+            except Exception as e:
+                return [e]
+
+        results = []
+        for start in range(0, len(messages), self.batch_size):
+            chunk = messages[start:start + self.batch_size]
+            try:
+                # A batch call is accepted or rejected as a whole
+                self._post('/emails/batch', [self._payload(message) for message in chunk])
+                results.extend([None] * len(chunk))
+            except Exception as e:
+                results.extend([e] * len(chunk))
+        return results
+
+
+class SMTPProvider:
+    """SMTP over pooled, logged-in sessions"""
+
+    name = 'smtp'
+
+    def __init__(self, user, password, sender):
+        self.sender = sender
+        self.pool = get_smtp_pool(user, password)
+
+    def send_batch(self, messages):
+        mime_messages = [
+            build_message(self.sender, message['to_email'], message['subject'], message['text_body'], message.get('html_body'))
+            for message in messages
+        ]
+        return self.pool.send_many(mime_messages)
+
+
+def send_with_providers(providers, messages):
+    """
+    Send through ``providers`` in order; each one only gets what the previous
+    ones failed to deliver. Returns one exception-or-None per message.
+    """
+    results = [EmailProviderError('No email provider configured')] * len(messages)
+    pending = list(range(len(messages)))
+    for provider in providers:
+        if not pending:
+            break
+        print(f"📧 Sending {len(pending)} email(s) via {provider.name}...", flush=True)
+        errors = provider.send_batch([messages[index] for index in pending])
+        still_pending = []
+        for index, error in zip(pending, errors):
+            results[index] = error
+            if error is not None:
+                print(f"❌ {provider.name} could not send to {messages[index]['to_email']}: {error}", flush=True)
+                still_pending.append(index)
+        pending = still_pending
+    return results
@@ -0,0 +1,49 @@
+"""
+Schema migration CLI - run once per deploy, before the web workers start.
+
+    python migrate.py                      # apply all pending migrations
+    python migrate.py upgrade [--target N]
+    python migrate.py status
+"""
+
+import sys
+import argparse
+from dotenv import load_dotenv
+
+# Load environment variables before database picks its backend
+load_dotenv()
+
+import migrations
+from database import get_db_type
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WAPL schema migrations')
+    parser.add_argument('command', nargs='?', default='upgrade', choices=['upgrade', 'status'])
+    parser.add_argument('--target', type=int, default=None, help='Stop after this migration version')
+    args = parser.parse_args()
+
+    print(f"🗄️  Database: {get_db_type().upper()}")
+
+    if args.command == 'status':
+        for migration in migrations.status():
+            mark = '✅' if migration['applied'] else '⏳'
+            applied_at = migration['applied_at'] or 'pending'
+            print(f"  {mark} {migration['version']:04d}_{migration['name']}  ({applied_at})")
+        print(f"Current version: {migrations.current_version()}")
+        return 0
+
+    applied = migrations.upgrade(target=args.target)
+    if applied:
+        print(f"✅ Applied {len(applied)} migration(s), now at version {migrations.current_version()}")
+    else:
+        print(f"✅ Schema already up to date (version {migrations.current_version()})")
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,169 @@
+"""
+Initial schema: every table the application uses.
+
+Uses CREATE TABLE IF NOT EXISTS so databases created before the migration
+engine existed are adopted as version 1 without changes.
+"""
+
+
+def upgrade(cursor, db_type):
+    if db_type == 'postgres':
+        pk_type = "SERIAL PRIMARY KEY"
+    else:
+        pk_type = "INTEGER PRIMARY KEY AUTOINCREMENT"
+    datetime_default = "DEFAULT CURRENT_TIMESTAMP"
+
+    # Users table
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS users (
+            id {pk_type},
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            role TEXT NOT NULL CHECK(role IN ('student', 'hr', 'admin')),
+            is_verified BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP {datetime_default},
+            last_login TIMESTAMP
+        )
+    ''')
+
+    # Domains table
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS domains (
+            id {pk_type},
+            domain_name TEXT NOT NULL UNIQUE,
+            is_active BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP {datetime_default},
+            created_by_admin_id INTEGER
+        )
+    ''')
+
+    # Admins table
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS admins (
+            id {pk_type},
+            user_id INTEGER NOT NULL,
+            full_name TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            is_super_admin INTEGER DEFAULT 0,
+            created_by_admin_id INTEGER,
+            created_at TIMESTAMP {datetime_default},
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (created_by_admin_id) REFERENCES admins(id)
+        )
+    ''')
+
+    # HRs table
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS hrs (
+            id {pk_type},
+            user_id INTEGER NOT NULL,
+            full_name TEXT NOT NULL,
+            company_name TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            designation TEXT NOT NULL,
+            created_by_admin_id INTEGER,
+            created_at TIMESTAMP {datetime_default},
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (created_by_admin_id) REFERENCES admins(id)
+        )
+    ''')
+
+    # Students table
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS students (
+            id {pk_type},
+            user_id INTEGER NOT NULL,
+            wapl_id TEXT UNIQUE NOT NULL,
+            full_name TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            profile_pic TEXT,
+            resume TEXT,
+            domain_id INTEGER,
+            registration_date TIMESTAMP {datetime_default},
+            certificate_issued_date TIMESTAMP,
+            certificate_expiry_date TIMESTAMP,
+            assigned_hr_id INTEGER,
+            address TEXT,
+            education_details TEXT,
+            skills TEXT,
+            projects TEXT,
+            account_status TEXT NOT NULL DEFAULT 'pending',
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (domain_id) REFERENCES domains(id),
+            FOREIGN KEY (assigned_hr_id) REFERENCES hrs(id)
+        )
+    ''')
+
+    # Student-Domain junction table (MANY-TO-MANY)
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS student_domains (
+            id {pk_type},
+            student_id INTEGER NOT NULL,
+            domain_id INTEGER NOT NULL,
+            created_at TIMESTAMP {datetime_default},
+            FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+            FOREIGN KEY (domain_id) REFERENCES domains(id) ON DELETE CASCADE,
+            UNIQUE(student_id, domain_id)
+        )
+    ''')
+
+    # OTP verifications table
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS otp_verifications (
+            id {pk_type},
+            user_id INTEGER NOT NULL,
+            otp_code TEXT NOT NULL,
+            purpose TEXT NOT NULL CHECK(purpose IN ('registration', 'login', 'password_reset')),
+            is_used BOOLEAN DEFAULT FALSE,
+            expires_at TIMESTAMP NOT NULL,
+            created_at TIMESTAMP {datetime_default},
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+
+    # Certificates table
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS certificates (
+            id {pk_type},
+            student_id INTEGER NOT NULL,
+            certificate_unique_id TEXT UNIQUE NOT NULL,
+            issue_date TIMESTAMP NOT NULL,
+            expiry_date TIMESTAMP NOT NULL,
+            qr_code TEXT NOT NULL,
+            pdf_path TEXT NOT NULL,
+            is_active BOOLEAN DEFAULT TRUE,
+            issued_by_hr_id INTEGER,
+            display_name TEXT,
+            FOREIGN KEY (student_id) REFERENCES students(id),
+            FOREIGN KEY (issued_by_hr_id) REFERENCES hrs(id)
+        )
+    ''')
+
+    # Recruitment status table
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS recruitment_status (
+            id {pk_type},
+            student_id INTEGER NOT NULL,
+            hr_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'viewed',
+            notes TEXT,
+            created_at TIMESTAMP {datetime_default},
+            updated_at TIMESTAMP {datetime_default},
+            FOREIGN KEY (student_id) REFERENCES students(id),
+            FOREIGN KEY (hr_id) REFERENCES hrs(id)
+        )
+    ''')
+
+    # Certificate audit table
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS certificate_audit (
+            id {pk_type},
+            certificate_id INTEGER NOT NULL,
+            action TEXT NOT NULL,
+            reason TEXT,
+            changed_by_admin_id INTEGER,
+            created_at TIMESTAMP {datetime_default},
+            FOREIGN KEY (certificate_id) REFERENCES certificates(id),
+            FOREIGN KEY (changed_by_admin_id) REFERENCES users(id)
+        )
+    ''')
@@ -0,0 +1,21 @@
+"""
+Secondary indexes for every column the routes filter or join on.
+"""
+
+INDEXES = [
+    ('idx_students_user_id', 'students', ('user_id',)),
+    ('idx_students_assigned_hr_id', 'students', ('assigned_hr_id',)),
+    ('idx_students_account_status', 'students', ('account_status',)),
+    ('idx_hrs_user_id', 'hrs', ('user_id',)),
+    ('idx_admins_user_id', 'admins', ('user_id',)),
+    ('idx_recruitment_status_student_hr', 'recruitment_status', ('student_id', 'hr_id')),
+    ('idx_recruitment_status_status', 'recruitment_status', ('status',)),
+    ('idx_certificates_student_active', 'certificates', ('student_id', 'is_active')),
+    ('idx_otp_user_purpose_used', 'otp_verifications', ('user_id', 'purpose', 'is_used')),
+    ('idx_student_domains_domain_id', 'student_domains', ('domain_id',)),
+]
+
+
+def upgrade(cursor, db_type):
+    for name, table, columns in INDEXES:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
@@ -0,0 +1,49 @@
+"""
+Default domains and the initial super admin account for an empty database.
+"""
+
+from werkzeug.security import generate_password_hash
+
+
+DEFAULT_DOMAINS = ['AI', 'ML', 'DevOps', 'Web Development', 'Data Science']
+
+
+def upgrade(cursor, db_type):
+    cursor.execute("SELECT COUNT(*) AS count FROM users")
+    if cursor.fetchone()['count'] > 0:
+        return
+
+    print("🆕 Empty database detected, initializing defaults...")
+
+    # Pre-populate domains
+    for domain in DEFAULT_DOMAINS:
+        if db_type == 'postgres':
+            cursor.execute('INSERT INTO domains (domain_name, is_active) VALUES (%s, TRUE) ON CONFLICT DO NOTHING', (domain,))
+        else:
+            cursor.execute('INSERT OR IGNORE INTO domains (domain_name, is_active) VALUES (?, 1)', (domain,))
+
+    # Create default SUPER admin account
+    admin_email = 'admin@wapl.com'
+    admin_password_hash = generate_password_hash('admin123')
+
+    if db_type == 'postgres':
+        cursor.execute(
+            "INSERT INTO users (email, password_hash, role, is_verified) VALUES (%s, %s, 'admin', TRUE) RETURNING id",
+            (admin_email, admin_password_hash)
+        )
+        admin_user_id = cursor.fetchone()['id']
+        cursor.execute(
+            "INSERT INTO admins (user_id, full_name, phone, is_super_admin) VALUES (%s, 'Super Admin', '1234567890', 1)",
+            (admin_user_id,)
+        )
+    else:
+        cursor.execute(
+            "INSERT INTO users (email, password_hash, role, is_verified) VALUES (?, ?, 'admin', 1)",
+            (admin_email, admin_password_hash)
+        )
+        cursor.execute(
+            "INSERT INTO admins (user_id, full_name, phone, is_super_admin) VALUES (?, 'Super Admin', '1234567890', 1)",
+            (cursor.lastrowid,)
+        )
+
+    print("✅ Default Super Admin created")
@@ -0,0 +1,7 @@
+"""
+Index backing keyset pagination of the admin student list on (registration_date, id).
+"""
+
+
+def upgrade(cursor, db_type):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_registration_date_id ON students (registration_date, id)")
@@ -0,0 +1,50 @@
+"""
+Durable background job queue: one jobs row per request, one job_items row per unit of work.
+"""
+
+
+def upgrade(cursor, db_type):
+    if db_type == 'postgres':
+        pk_type = "SERIAL PRIMARY KEY"
+    else:
+        pk_type = "INTEGER PRIMARY KEY AUTOINCREMENT"
+    datetime_default = "DEFAULT CURRENT_TIMESTAMP"
+
+    # Jobs table
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id {pk_type},
+            job_type TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued' CHECK(status IN ('queued', 'running', 'completed', 'failed')),
+            payload TEXT,
+            total_items INTEGER NOT NULL DEFAULT 0,
+            processed_items INTEGER NOT NULL DEFAULT 0,
+            succeeded_items INTEGER NOT NULL DEFAULT 0,
+            failed_items INTEGER NOT NULL DEFAULT 0,
+            created_by_user_id INTEGER,
+            created_at TIMESTAMP {datetime_default},
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            FOREIGN KEY (created_by_user_id) REFERENCES users(id)
+        )
+    ''')
+
+    # Job items table
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS job_items (
+            id {pk_type},
+            job_id INTEGER NOT NULL,
+            item_key TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'running', 'done', 'failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            locked_by TEXT,
+            locked_until TIMESTAMP,
+            result TEXT,
+            error TEXT,
+            updated_at TIMESTAMP {datetime_default},
+            FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE
+        )
+    ''')
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_job_items_status_lock ON job_items (status, locked_until)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_job_items_job_id ON job_items (job_id)")
@@ -0,0 +1,14 @@
+"""
+certificates.content_hash: hash of everything a rendered certificate depends on,
+so re-issuing an unchanged certificate can reuse the active one instead of re-rendering.
+"""
+
+
+def upgrade(cursor, db_type):
+    if db_type == 'postgres':
+        cursor.execute("ALTER TABLE certificates ADD COLUMN IF NOT EXISTS content_hash TEXT")
+        return
+
+    cursor.execute("PRAGMA table_info(certificates)")
+    if 'content_hash' not in [column['name'] for column in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE certificates ADD COLUMN content_hash TEXT")
@@ -0,0 +1,31 @@
+"""
+Transactional email outbox: handlers insert a row, background senders deliver it.
+"""
+
+
+def upgrade(cursor, db_type):
+    if db_type == 'postgres':
+        pk_type = "SERIAL PRIMARY KEY"
+    else:
+        pk_type = "INTEGER PRIMARY KEY AUTOINCREMENT"
+    datetime_default = "DEFAULT CURRENT_TIMESTAMP"
+
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id {pk_type},
+            to_email TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            text_body TEXT NOT NULL,
+            html_body TEXT,
+            status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'sending', 'sent', 'failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP {datetime_default},
+            locked_by TEXT,
+            locked_until TIMESTAMP,
+            last_error TEXT,
+            created_at TIMESTAMP {datetime_default},
+            sent_at TIMESTAMP
+        )
+    ''')
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_email_outbox_status_next_attempt ON email_outbox (status, next_attempt_at)")
@@ -0,0 +1,41 @@
+"""
+recruitment_rollup: per-HR funnel counters kept in step with recruitment_status
+(see recruitment.py), so the recruitment dashboards read one row per HR.
+"""
+
+
+def upgrade(cursor, db_type):
+    datetime_default = "DEFAULT CURRENT_TIMESTAMP"
+
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS recruitment_rollup (
+            hr_id INTEGER PRIMARY KEY,
+            total_actions INTEGER NOT NULL DEFAULT 0,
+            pipeline_students INTEGER NOT NULL DEFAULT 0,
+            viewed_count INTEGER NOT NULL DEFAULT 0,
+            shortlisted_count INTEGER NOT NULL DEFAULT 0,
+            interview_count INTEGER NOT NULL DEFAULT 0,
+            selected_count INTEGER NOT NULL DEFAULT 0,
+            rejected_count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP {datetime_default}
+        )
+    ''')
+
+    # Backfill in one pass; pipeline_students credits each student to the HR of their first status row
+    cursor.execute('DELETE FROM recruitment_rollup')
+    cursor.execute('''
+        INSERT INTO recruitment_rollup
+            (hr_id, total_actions, pipeline_students, viewed_count, shortlisted_count,
+             interview_count, selected_count, rejected_count)
+        SELECT
+            r.hr_id,
+            COUNT(*),
+            SUM(CASE WHEN r.id IN (SELECT MIN(id) FROM recruitment_status GROUP BY student_id) THEN 1 ELSE 0 END),
+            SUM(CASE WHEN r.status = 'viewed' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN r.status = 'shortlisted' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN r.status = 'interview_scheduled' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN r.status = 'selected' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN r.status = 'rejected' THEN 1 ELSE 0 END)
+        FROM recruitment_status r
+        GROUP BY r.hr_id
+    ''')
@@ -0,0 +1,26 @@
+"""
+recruitment_rollup.assigned_count: active students assigned to each HR, so the
+HR dashboard summary is a single primary-key read.
+"""
+
+
+def upgrade(cursor, db_type):
+    if db_type == 'postgres':
+        cursor.execute("ALTER TABLE recruitment_rollup ADD COLUMN IF NOT EXISTS assigned_count INTEGER NOT NULL DEFAULT 0")
+    else:
+        cursor.execute("PRAGMA table_info(recruitment_rollup)")
+        if 'assigned_count' not in [column['name'] for column in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE recruitment_rollup ADD COLUMN assigned_count INTEGER NOT NULL DEFAULT 0")
+
+    # Every HR gets a row, then one pass counts their active assigned students
+    cursor.execute('''
+        INSERT INTO recruitment_rollup (hr_id)
+        SELECT h.id FROM hrs h
+        WHERE NOT EXISTS (SELECT 1 FROM recruitment_rollup r WHERE r.hr_id = h.id)
+    ''')
+    cursor.execute('''
+        UPDATE recruitment_rollup SET assigned_count = (
+            SELECT COUNT(*) FROM students s
+            WHERE s.assigned_hr_id = recruitment_rollup.hr_id AND s.account_status = 'active'
+        )
+    ''')
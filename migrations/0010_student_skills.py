@@ -0,0 +1,56 @@
+"""
+student_skills: case-folded skill tokens per student (see skills.py), backfilled
+from the JSON lists in students.skills.
+"""
+
+import re
+import json
+
+# Frozen copy of skills.skill_tokens as of this migration
+_SPLIT = re.compile(r"[\s,;/|()]+")
+
+
+def _skill_tokens(skills):
+    tokens = {}
+    for skill in skills or []:
+        phrase = ' '.join(str(skill).split()).casefold()
+        if not phrase:
+            continue
+        tokens[phrase] = None
+        for word in _SPLIT.split(phrase):
+            if word:
+                tokens[word] = None
+    return list(tokens)
+
+
+def upgrade(cursor, db_type):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS student_skills (
+            student_id INTEGER NOT NULL,
+            skill TEXT NOT NULL,
+            PRIMARY KEY (student_id, skill),
+            FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
+        )
+    ''')
+    # Lookups go skill -> students; the primary key already covers student -> skills
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_student_skills_skill ON student_skills (skill, student_id)")
+
+    placeholder = '%s' if db_type == 'postgres' else '?'
+    cursor.execute("SELECT id, skills FROM students WHERE skills IS NOT NULL AND skills <> ''")
+    rows = []
+    for student in cursor.fetchall():
+        try:
+            skills = json.loads(student['skills'])
+        except (TypeError, ValueError):
+            continue
+        if isinstance(skills, str):
+            skills = [skills]
+        if isinstance(skills, list):
+            rows.extend((student['id'], token) for token in _skill_tokens(skills))
+
+    cursor.execute('DELETE FROM student_skills')
+    if rows:
+        cursor.executemany(
+            f'INSERT INTO student_skills (student_id, skill) VALUES ({placeholder}, {placeholder})',
+            rows
+        )
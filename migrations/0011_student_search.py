@@ -0,0 +1,72 @@
+"""
+student_search: full-text index over student profiles (see search.py) -
+an FTS5 table on SQLite, a weighted tsvector with a GIN index on PostgreSQL -
+backfilled from the existing students.
+"""
+
+import json
+
+_FIELDS = ('full_name', 'wapl_id', 'email', 'phone', 'skills', 'projects', 'education')
+_LABELS = ('A', 'A', 'B', 'B', 'B', 'C', 'C')
+
+
+# Frozen copy of search._flatten as of this migration
+def _flatten(value):
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return value
+    return _text(value)
+
+
+def _text(value):
+    if isinstance(value, dict):
+        return ' '.join(_text(item) for item in value.values() if item not in (None, ''))
+    if isinstance(value, (list, tuple)):
+        return ' '.join(_text(item) for item in value if item not in (None, ''))
+    return '' if value is None else str(value)
+
+
+def upgrade(cursor, db_type):
+    if db_type == 'postgres':
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS student_search (
+                student_id INTEGER PRIMARY KEY REFERENCES students(id) ON DELETE CASCADE,
+                document TSVECTOR NOT NULL
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_student_search_document ON student_search USING GIN (document)")
+        vector = ' || '.join(f"setweight(to_tsvector('simple', %s), '{label}')" for label in _LABELS)
+        insert_sql = f"INSERT INTO student_search (student_id, document) VALUES (%s, {vector})"
+    else:
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS student_search USING fts5(
+                {', '.join(_FIELDS)},
+                tokenize = "unicode61 remove_diacritics 2",
+                prefix = '2 3'
+            )
+        ''')
+        insert_sql = f"INSERT INTO student_search (rowid, {', '.join(_FIELDS)}) VALUES (?{', ?' * len(_FIELDS)})"
+
+    cursor.execute('DELETE FROM student_search')
+    cursor.execute('''
+        SELECT s.id, s.full_name, s.wapl_id, u.email, s.phone, s.skills, s.projects, s.education_details
+        FROM students s
+        LEFT JOIN users u ON s.user_id = u.id
+    ''')
+    rows = [
+        (
+            student['id'],
+            student['full_name'] or '',
+            student['wapl_id'] or '',
+            student['email'] or '',
+            student['phone'] or '',
+            _flatten(student['skills']),
+            _flatten(student['projects']),
+            _flatten(student['education_details']),
+        )
+        for student in cursor.fetchall()
+    ]
+    if rows:
+        cursor.executemany(insert_sql, rows)
@@ -0,0 +1,55 @@
+"""
+One recruitment_status row per (student, HR): drop duplicate rows, keeping the
+most recently updated one, and make idx_recruitment_status_student_hr UNIQUE
+so the HR student list's LEFT JOIN can never return a student twice.
+"""
+
+# Frozen copy of recruitment.ROLLUP_COLUMNS as of this migration
+_ROLLUP_COLUMNS = {
+    'viewed': 'viewed_count',
+    'shortlisted': 'shortlisted_count',
+    'interview_scheduled': 'interview_count',
+    'selected': 'selected_count',
+    'rejected': 'rejected_count',
+}
+
+
+def upgrade(cursor, db_type):
+    # Rows that have a sibling updated later, then exact ties by id
+    cursor.execute('''
+        DELETE FROM recruitment_status
+        WHERE EXISTS (
+            SELECT 1 FROM recruitment_status newer
+            WHERE newer.student_id = recruitment_status.student_id
+              AND newer.hr_id = recruitment_status.hr_id
+              AND newer.updated_at > recruitment_status.updated_at
+        )
+    ''')
+    removed = cursor.rowcount
+    cursor.execute('''
+        DELETE FROM recruitment_status
+        WHERE id NOT IN (SELECT MAX(id) FROM recruitment_status GROUP BY student_id, hr_id)
+    ''')
+    removed += cursor.rowcount
+
+    cursor.execute("DROP INDEX IF EXISTS idx_recruitment_status_student_hr")
+    cursor.execute("CREATE UNIQUE INDEX idx_recruitment_status_student_hr ON recruitment_status (student_id, hr_id)")
+
+    if removed > 0:
+        # The funnel counters counted the removed rows; recount them (assigned_count is unaffected)
+        status_counts = ',\n'.join(
+            f"{column} = (SELECT COUNT(*) FROM recruitment_status r "
+            f"WHERE r.hr_id = recruitment_rollup.hr_id AND r.status = '{status}')"
+            for status, column in _ROLLUP_COLUMNS.items()
+        )
+        cursor.execute(f'''
+            UPDATE recruitment_rollup SET
+                total_actions = (SELECT COUNT(*) FROM recruitment_status r WHERE r.hr_id = recruitment_rollup.hr_id),
+                pipeline_students = (
+                    SELECT COUNT(*) FROM recruitment_status r
+                    WHERE r.hr_id = recruitment_rollup.hr_id
+                      AND r.id IN (SELECT MIN(id) FROM recruitment_status GROUP BY student_id)
+                ),
+                {status_counts}
+        ''')
+        print(f"🧹 Removed {removed} duplicate recruitment_status row(s)")
@@ -0,0 +1,14 @@
+"""
+Keyset pagination of the admin student list sorts on
+COALESCE(registration_date, '1970-01-01 00:00:00'), so rows without a date
+stay reachable after page 1 and sort the same on SQLite and PostgreSQL.
+The index is rebuilt on that expression.
+"""
+
+
+def upgrade(cursor, db_type):
+    cursor.execute("DROP INDEX IF EXISTS idx_students_registration_date_id")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_students_registration_sort "
+        "ON students ((COALESCE(registration_date, '1970-01-01 00:00:00')), id)"
+    )
@@ -0,0 +1,65 @@
+"""
+Rebuild the PostgreSQL student_search tsvectors from text split into word terms
+(see search._words), so emails and phone numbers match the terms a query is
+split into. SQLite's FTS5 tokenizer already splits them; nothing to do there.
+"""
+
+import re
+import json
+
+_LABELS = ('A', 'A', 'B', 'B', 'B', 'C', 'C')
+# Frozen copy of search._WORD as of this migration
+_WORD = re.compile(r'[^\W_]+')
+
+
+# Frozen copy of search._flatten as of this migration
+def _flatten(value):
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return value
+    return _text(value)
+
+
+def _text(value):
+    if isinstance(value, dict):
+        return ' '.join(_text(item) for item in value.values() if item not in (None, ''))
+    if isinstance(value, (list, tuple)):
+        return ' '.join(_text(item) for item in value if item not in (None, ''))
+    return '' if value is None else str(value)
+
+
+def _words(text):
+    return ' '.join(_WORD.findall(text))
+
+
+def upgrade(cursor, db_type):
+    if db_type != 'postgres':
+        return
+
+    cursor.execute('''
+        SELECT s.id, s.full_name, s.wapl_id, u.email, s.phone, s.skills, s.projects, s.education_details
+        FROM students s
+        LEFT JOIN users u ON s.user_id = u.id
+    ''')
+    rows = [
+        (
+            student['id'],
+            _words(student['full_name'] or ''),
+            _words(student['wapl_id'] or ''),
+            _words(student['email'] or ''),
+            _words(student['phone'] or ''),
+            _words(_flatten(student['skills'])),
+            _words(_flatten(student['projects'])),
+            _words(_flatten(student['education_details'])),
+        )
+        for student in cursor.fetchall()
+    ]
+    vector = ' || '.join(f"setweight(to_tsvector('simple', %s), '{label}')" for label in _LABELS)
+    cursor.execute('DELETE FROM student_search')
+    if rows:
+        cursor.executemany(
+            f"INSERT INTO student_search (student_id, document) VALUES (%s, {vector})",
+            rows
+        )
@@ -0,0 +1,139 @@
+"""
+Versioned schema migrations.
+
+Each migration is a module named ``NNNN_description.py`` in this package that
+exposes ``upgrade(cursor, db_type)``. Applied versions are recorded in the
+``schema_version`` table, and ``python migrate.py`` applies the pending ones
+once per deploy - web workers only check the version at startup.
+"""
+
+import os
+import re
+import importlib
+from database import get_db_connection, get_db_type
+
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+_MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.py$')
+
+# Arbitrary key for pg_advisory_lock, shared by every process migrating this database
+ADVISORY_LOCK_KEY = 7240531
+
+
+def discover():
+    """Return [(version, name, module)] for every migration file, ordered by version"""
+    found = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = _MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        module = importlib.import_module(f"{__name__}.{filename[:-3]}")
+        found.append((int(match.group(1)), match.group(2), module))
+
+    versions = [version for version, _, _ in found]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {MIGRATIONS_DIR}")
+    return found
+
+
+def _version_table_exists(cursor, db_type):
+    if db_type == 'postgres':
+        cursor.execute("SELECT to_regclass('schema_version') AS name")
+    else:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'")
+    row = cursor.fetchone()
+    return bool(row and row['name'])
+
+
+def _applied(cursor, db_type):
+    """{version: applied_at} for every applied migration"""
+    if not _version_table_exists(cursor, db_type):
+        return {}
+    cursor.execute("SELECT version, applied_at FROM schema_version")
+    return {row['version']: row['applied_at'] for row in cursor.fetchall()}
+
+
+def status():
+    """List every known migration with whether (and when) it was applied"""
+    db_type = get_db_type()
+    with get_db_connection() as conn:
+        applied = _applied(conn.cursor(), db_type)
+
+    return [{
+        'version': version,
+        'name': name,
+        'applied': version in applied,
+        'applied_at': str(applied[version]) if version in applied else None,
+    } for version, name, _ in discover()]
+
+
+def current_version():
+    applied = [m['version'] for m in status() if m['applied']]
+    return max(applied) if applied else 0
+
+
+def pending():
+    """Migrations that have not been applied yet, in order"""
+    return [m for m in status() if not m['applied']]
+
+
+def upgrade(target=None):
+    """
+    Apply pending migrations up to ``target`` (default: all), each in its own
+    transaction together with its schema_version row. Concurrent runs are
+    serialised with an advisory lock (PostgreSQL) or BEGIN IMMEDIATE (SQLite),
+    and every migration is re-checked under the lock so it runs exactly once.
+    Returns the list of versions applied by this call.
+    """
+    db_type = get_db_type()
+    placeholder = '%s' if db_type == 'postgres' else '?'
+    applied_now = []
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
+        if db_type == 'postgres':
+            cursor.execute("SELECT pg_advisory_lock(%s)", (ADVISORY_LOCK_KEY,))
+
+        try:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.commit()
+
+            for version, name, module in discover():
+                if target is not None and version > target:
+                    break
+
+                if db_type == 'sqlite':
+                    cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute(f"SELECT 1 FROM schema_version WHERE version = {placeholder}", (version,))
+                if cursor.fetchone():
+                    conn.rollback()
+                    continue
+
+                print(f"⏳ Applying migration {version:04d}_{name}...")
+                try:
+                    module.upgrade(cursor, db_type)
+                    cursor.execute(
+                        f"INSERT INTO schema_version (version, name) VALUES ({placeholder}, {placeholder})",
+                        (version, name)
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    print(f"❌ Migration {version:04d}_{name} failed, rolled back")
+                    raise
+
+                applied_now.append(version)
+                print(f"✅ Applied migration {version:04d}_{name}")
+        finally:
+            if db_type == 'postgres':
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_KEY,))
+                conn.commit()
+
+    return applied_now
@@ -0,0 +1,226 @@
+"""
+Transactional outbox for outgoing email.
+
+Handlers never talk to Resend or Gmail: ``enqueue_email`` inserts a row into
+``email_outbox`` inside the current transaction, so a request that rolls back
+sends nothing and a committed one is never lost. Sender threads in each web
+process (``EMAIL_SENDER_THREADS``) and ``python worker.py`` claim rows with a
+lease, the same way ``jobs`` claims job items, and retry failed sends with
+exponential backoff until ``EMAIL_MAX_ATTEMPTS``.
+
+Serverless deployments (Vercel) have no long-lived threads, so there
+``EMAIL_DELIVERY=inline`` (the default when ``VERCEL`` is set) also sends the
+queued rows right after the transaction commits, still inside the request.
+Failed inline sends stay in the outbox for a worker to retry.
+"""
+
+import os
+import socket
+import random
+import logging
+import threading
+import multiprocessing
+from datetime import datetime, timedelta
+from database import db, is_postgres
+
+logger = logging.getLogger(__name__)
+
+EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', 6))
+EMAIL_RETRY_BASE_SECONDS = float(os.environ.get('EMAIL_RETRY_BASE_SECONDS', 30))
+EMAIL_RETRY_MAX_SECONDS = float(os.environ.get('EMAIL_RETRY_MAX_SECONDS', 3600))
+EMAIL_LEASE_SECONDS = int(os.environ.get('EMAIL_LEASE_SECONDS', 120))
+EMAIL_BATCH_SIZE = int(os.environ.get('EMAIL_BATCH_SIZE', 20))
+EMAIL_POLL_INTERVAL = float(os.environ.get('EMAIL_POLL_INTERVAL', 5))
+# 'outbox': background senders only; 'inline': also send right after commit, inside the request
+EMAIL_DELIVERY = os.environ.get('EMAIL_DELIVERY', 'inline' if os.environ.get('VERCEL') else 'outbox').lower()
+
+_wakeup = threading.Event()
+_sender_threads = []
+
+
+class EmailDeliveryError(Exception):
+    """The provider did not accept the message; it will be retried"""
+
+
+def _insert(to_email, subject, text_body, html_body):
+    insert_sql = "INSERT INTO email_outbox (to_email, subject, text_body, html_body, next_attempt_at) VALUES (?, ?, ?, ?, ?)"
+    params = (to_email, subject, text_body, html_body, datetime.now())
+    if is_postgres():
+        return db.execute_query(insert_sql + " RETURNING id", params, fetch_one=True)['id']
+    return db.execute_query(insert_sql, params)
+
+
+def enqueue_email(to_email, subject, text_body, html_body=None):
+    """Queue an email for delivery after the current transaction commits; returns the outbox id"""
+    outbox_id = _insert(to_email, subject, text_body, html_body)
+
+    # Wake an idle sender as soon as the row is visible
+    db.after_commit(_wakeup.set)
+    if EMAIL_DELIVERY == 'inline':
+        db.after_commit(lambda: deliver_now([outbox_id]))
+    return outbox_id
+
+
+def enqueue_emails(messages):
+    """Queue many emails (dicts with to_email, subject, text_body, html_body) in one statement; returns the count"""
+    if not messages:
+        return 0
+    if EMAIL_DELIVERY == 'inline':
+        # Inline delivery needs the row ids; the send itself is still one batch
+        outbox_ids = [
+            _insert(message['to_email'], message['subject'], message['text_body'], message.get('html_body'))
+            for message in messages
+        ]
+        db.after_commit(lambda: deliver_now(outbox_ids))
+        return len(messages)
+
+    now = datetime.now()
+    db.execute_many(
+        "INSERT INTO email_outbox (to_email, subject, text_body, html_body, next_attempt_at) VALUES (?, ?, ?, ?, ?)",
+        [(message['to_email'], message['subject'], message['text_body'], message.get('html_body'), now) for message in messages]
+    )
+    db.after_commit(_wakeup.set)
+    return len(messages)
+
+
+def claim_batch(worker_id, limit=EMAIL_BATCH_SIZE, outbox_ids=None):
+    """Lease up to ``limit`` due messages (only ``outbox_ids``, if given) to this sender"""
+    now = datetime.now()
+    query = """SELECT id FROM email_outbox
+               WHERE ((status = 'pending' AND next_attempt_at <= ?) OR (status = 'sending' AND locked_until < ?))"""
+    params = [now, now]
+    if outbox_ids is not None:
+        query += f" AND id IN ({','.join('?' * len(outbox_ids))})"
+        params.extend(outbox_ids)
+    candidates = db.execute_query(query + " ORDER BY id LIMIT ?", (*params, limit), fetch_all=True)
+
+    claimed = []
+    for candidate in candidates:
+        # Only one sender's UPDATE can match; the others see rowcount 0 and move on
+        changed = db.execute_update(
+            """UPDATE email_outbox
+               SET status = 'sending', locked_by = ?, locked_until = ?, attempts = attempts + 1
+               WHERE id = ? AND ((status = 'pending' AND next_attempt_at <= ?) OR (status = 'sending' AND locked_until < ?))""",
+            (worker_id, now + timedelta(seconds=EMAIL_LEASE_SECONDS), candidate['id'], now, now)
+        )
+        if changed == 1:
+            claimed.append(candidate['id'])
+
+    if not claimed:
+        return []
+    placeholders = ','.join('?' * len(claimed))
+    return db.execute_query(
+        f"SELECT * FROM email_outbox WHERE id IN ({placeholders}) ORDER BY id",
+        tuple(claimed),
+        fetch_all=True
+    )
+
+
+def retry_delay(attempts):
+    """Seconds before attempt ``attempts + 1``: exponential, capped, with jitter so a backlog does not retry in lockstep"""
+    delay = min(EMAIL_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)), EMAIL_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _deliver(messages):
+    """Deliver a batch; returns one exception-or-None per message"""
+    from utils import RESEND_API_KEY, GMAIL_EMAIL, GMAIL_PASSWORD, send_email_batch, send_email_simulation
+
+    if not RESEND_API_KEY and not (GMAIL_EMAIL and GMAIL_PASSWORD):
+        # Nothing configured (local development) - log them instead of retrying forever
+        for message in messages:
+            send_email_simulation(message['to_email'], message['subject'], message['text_body'])
+        return [None] * len(messages)
+
+    sent = send_email_batch([dict(message) for message in messages])
+    return [None if ok else EmailDeliveryError(f"Could not deliver email to {message['to_email']}")
+            for message, ok in zip(messages, sent)]
+
+
+def _mark_sent(message, worker_id):
+    db.execute_update(
+        """UPDATE email_outbox
+           SET status = 'sent', sent_at = ?, locked_by = NULL, locked_until = NULL, last_error = NULL
+           WHERE id = ? AND locked_by = ?""",
+        (datetime.now(), message['id'], worker_id)
+    )
+
+
+def _mark_failed(message, worker_id, error):
+    if message['attempts'] >= EMAIL_MAX_ATTEMPTS:
+        logger.error(f"❌ Email {message['id']} to {message['to_email']} failed after {message['attempts']} attempts: {error}")
+        status, next_attempt_at = 'failed', None
+    else:
+        delay = retry_delay(message['attempts'])
+        logger.warning(f"⚠️ Email {message['id']} attempt {message['attempts']} failed, retrying in {delay:.0f}s: {error}")
+        status, next_attempt_at = 'pending', datetime.now() + timedelta(seconds=delay)
+
+    db.execute_update(
+        """UPDATE email_outbox
+           SET status = ?, next_attempt_at = ?, last_error = ?, locked_by = NULL, locked_until = NULL
+           WHERE id = ? AND locked_by = ?""",
+        (status, next_attempt_at, str(error), message['id'], worker_id)
+    )
+
+
+def send_batch(messages, worker_id):
+    """Deliver claimed messages in one go (one SMTP login for the batch) and record each outcome"""
+    try:
+        errors = _deliver(messages)
+    except Exception as e:
+        errors = [e] * len(messages)
+
+    for message, error in zip(messages, errors):
+        if error is None:
+            _mark_sent(message, worker_id)
+        else:
+            _mark_failed(message, worker_id, error)
+
+
+def deliver_now(outbox_ids):
+    """Send these queued messages right away (EMAIL_DELIVERY=inline) and commit their outcome"""
+    if not outbox_ids:
+        return
+    worker_id = f"inline:{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    messages = claim_batch(worker_id, limit=len(outbox_ids), outbox_ids=outbox_ids)
+    if messages:
+        send_batch(messages, worker_id)
+    # Runs as an after-commit callback, so these writes need their own commit
+    db.commit()
+
+
+def run_sender(worker_id=None, stop_event=None, poll_interval=EMAIL_POLL_INTERVAL):
+    """Deliver queued email until ``stop_event`` is set"""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    stop_event = stop_event or threading.Event()
+
+    while not stop_event.is_set():
+        try:
+            messages = claim_batch(worker_id)
+        except Exception as e:
+            logger.error(f"❌ Email sender {worker_id} could not poll the outbox: {e}")
+            stop_event.wait(poll_interval)
+            continue
+
+        if not messages:
+            _wakeup.wait(poll_interval)
+            _wakeup.clear()
+            continue
+
+        send_batch(messages, worker_id)
+
+
+def start_sender_threads(count):
+    """Run ``count`` daemon email sender threads inside this process (once per process)"""
+    if count <= 0 or any(thread.is_alive() for thread in _sender_threads):
+        return
+    # Renderer / worker.py child processes re-import the app; they must not poll the outbox too.
+    # parent_process() is still None while a spawned child imports __main__, its name is not.
+    if multiprocessing.current_process().name != 'MainProcess':
+        return
+
+    for index in range(count):
+        thread = threading.Thread(target=run_sender, name=f'email-sender-{index}', daemon=True)
+        thread.start()
+        _sender_threads.append(thread)
+    print(f"✅ Started {count} email sender thread(s)")
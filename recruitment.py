@@ -0,0 +1,227 @@
+"""
+Recruitment status writes and the per-HR funnel rollup.
+
+Every change to ``recruitment_status`` goes through ``upsert_recruitment_status``,
+which adjusts the HR's ``recruitment_rollup`` row in the same transaction. The
+recruitment dashboards then read one row per HR instead of counting status rows.
+
+``assigned_count`` (active students assigned to the HR) is recounted for the
+affected HRs whenever an assignment or an assigned student's status changes.
+``reconcile_recruitment_rollup`` rebuilds every counter from the source tables
+and repairs rows that drifted (run as the ``reconcile_recruitment_rollup`` job).
+"""
+
+import sqlite3
+import psycopg2
+from database import db, is_postgres
+
+
+# status -> rollup counter column
+ROLLUP_COLUMNS = {
+    'viewed': 'viewed_count',
+    'shortlisted': 'shortlisted_count',
+    'interview_scheduled': 'interview_count',
+    'selected': 'selected_count',
+    'rejected': 'rejected_count',
+}
+RECRUITMENT_STATUSES = list(ROLLUP_COLUMNS)
+ROLLUP_COUNTERS = ('total_actions', 'pipeline_students') + tuple(ROLLUP_COLUMNS.values())
+# Maintained by recount (refresh_assigned_counts) rather than by deltas
+ASSIGNED_COUNTER = 'assigned_count'
+
+
+def _ensure_rollup_rows(hr_ids):
+    if is_postgres():
+        sql = "INSERT INTO recruitment_rollup (hr_id) VALUES (?) ON CONFLICT DO NOTHING"
+    else:
+        sql = "INSERT OR IGNORE INTO recruitment_rollup (hr_id) VALUES (?)"
+    if len(hr_ids) == 1:
+        db.execute_query(sql, (hr_ids[0],))
+    else:
+        db.execute_many(sql, [(hr_id,) for hr_id in hr_ids])
+
+
+def bump_rollup(hr_id, **deltas):
+    """Add ``deltas`` ({counter column: n}) to the HR's rollup row, creating it if needed"""
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    unknown = set(deltas) - set(ROLLUP_COUNTERS)
+    if unknown:
+        raise ValueError(f"Unknown rollup counters: {', '.join(sorted(unknown))}")
+
+    _ensure_rollup_rows([hr_id])
+    assignments = ', '.join(f"{column} = {column} + ?" for column in deltas)
+    db.execute_query(
+        f"UPDATE recruitment_rollup SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE hr_id = ?",
+        (*deltas.values(), hr_id)
+    )
+
+
+def upsert_recruitment_status(student_id, hr_id, status, notes):
+    """Set this HR's status for the student and keep the rollup in step"""
+    if status not in ROLLUP_COLUMNS:
+        raise ValueError(f"Invalid recruitment status: {status}")
+
+    # The UPDATE only matches the status we read, so a concurrent change is never counted twice
+    for _ in range(3):
+        existing = db.execute_query(
+            'SELECT id, status FROM recruitment_status WHERE student_id = ? AND hr_id = ?',
+            (student_id, hr_id),
+            fetch_one=True
+        )
+
+        if existing:
+            changed = db.execute_update(
+                '''UPDATE recruitment_status
+                   SET status = ?, notes = ?, updated_at = CURRENT_TIMESTAMP
+                   WHERE id = ? AND status = ?''',
+                (status, notes, existing['id'], existing['status'])
+            )
+            if not changed:
+                continue
+            if existing['status'] != status:
+                deltas = {ROLLUP_COLUMNS[status]: 1}
+                if existing['status'] in ROLLUP_COLUMNS:
+                    deltas[ROLLUP_COLUMNS[existing['status']]] = -1
+                bump_rollup(hr_id, **deltas)
+            return
+
+        first_for_student = not db.execute_query(
+            'SELECT 1 FROM recruitment_status WHERE student_id = ? LIMIT 1',
+            (student_id,),
+            fetch_one=True
+        )
+        try:
+            with db.savepoint():
+                db.execute_query(
+                    '''INSERT INTO recruitment_status (student_id, hr_id, status, notes)
+                       VALUES (?, ?, ?, ?)''',
+                    (student_id, hr_id, status, notes)
+                )
+        except (sqlite3.IntegrityError, psycopg2.IntegrityError):
+            # A concurrent request created the row first (unique per student and HR) - update it instead
+            continue
+        bump_rollup(hr_id, total_actions=1, pipeline_students=1 if first_for_student else 0, **{ROLLUP_COLUMNS[status]: 1})
+        return
+
+    raise RuntimeError(f"Recruitment status for student {student_id} kept changing; try again")
+
+
+def refresh_assigned_counts(hr_ids):
+    """Recount active assigned students for these HRs (one indexed COUNT each, one statement)"""
+    hr_ids = sorted({hr_id for hr_id in hr_ids if hr_id is not None})
+    if not hr_ids:
+        return
+    _ensure_rollup_rows(hr_ids)
+    placeholders = ','.join('?' * len(hr_ids))
+    db.execute_query(f"""
+        UPDATE recruitment_rollup SET assigned_count = (
+            SELECT COUNT(*) FROM students s
+            WHERE s.assigned_hr_id = recruitment_rollup.hr_id AND s.account_status = 'active'
+        ), updated_at = CURRENT_TIMESTAMP
+        WHERE hr_id IN ({placeholders})
+    """, tuple(hr_ids))
+
+
+def assigned_hr_ids(student_ids):
+    """HRs the given students are currently assigned to"""
+    if not student_ids:
+        return set()
+    placeholders = ','.join('?' * len(student_ids))
+    rows = db.execute_query(
+        f"SELECT DISTINCT assigned_hr_id FROM students WHERE id IN ({placeholders}) AND assigned_hr_id IS NOT NULL",
+        tuple(student_ids),
+        fetch_all=True
+    )
+    return {row['assigned_hr_id'] for row in rows}
+
+
+def hr_recruitment_counters(user_id):
+    """The rollup row of the HR with this user id (zeros if it has none yet); None if there is no HR profile"""
+    counters = ', '.join(f"COALESCE(r.{column}, 0) as {column}" for column in (ASSIGNED_COUNTER,) + ROLLUP_COUNTERS)
+    return db.execute_query(f"""
+        SELECT h.id as hr_id, {counters}
+        FROM hrs h
+        LEFT JOIN recruitment_rollup r ON r.hr_id = h.id
+        WHERE h.user_id = ?
+    """, (user_id,), fetch_one=True)
+
+
+def reconcile_recruitment_rollup():
+    """
+    Rebuild every HR's counters from recruitment_status and students and fix the rows
+    that drifted. Returns {hr_id: {counter: (stored, actual)}} for the repaired rows.
+    """
+    status_sums = ',\n'.join(
+        f"SUM(CASE WHEN r.status = '{status}' THEN 1 ELSE 0 END) as {column}"
+        for status, column in ROLLUP_COLUMNS.items()
+    )
+    actual = {}
+    for row in db.execute_query(f"""
+        SELECT
+            r.hr_id,
+            COUNT(*) as total_actions,
+            SUM(CASE WHEN r.id IN (SELECT MIN(id) FROM recruitment_status GROUP BY student_id) THEN 1 ELSE 0 END) as pipeline_students,
+            {status_sums}
+        FROM recruitment_status r
+        GROUP BY r.hr_id
+    """, fetch_all=True):
+        actual[row['hr_id']] = {column: int(row[column] or 0) for column in ROLLUP_COUNTERS}
+
+    for row in db.execute_query("""
+        SELECT assigned_hr_id, COUNT(*) as assigned_count FROM students
+        WHERE assigned_hr_id IS NOT NULL AND account_status = 'active'
+        GROUP BY assigned_hr_id
+    """, fetch_all=True):
+        actual.setdefault(row['assigned_hr_id'], {})[ASSIGNED_COUNTER] = int(row['assigned_count'])
+
+    columns = (ASSIGNED_COUNTER,) + ROLLUP_COUNTERS
+    stored = {
+        row['hr_id']: row
+        for row in db.execute_query(f"SELECT hr_id, {', '.join(columns)} FROM recruitment_rollup", fetch_all=True)
+    }
+
+    repaired = {}
+    for hr_id in set(actual) | set(stored):
+        expected = {column: actual.get(hr_id, {}).get(column, 0) for column in columns}
+        current = stored.get(hr_id)
+        drift = {
+            column: (current[column] if current else None, value)
+            for column, value in expected.items()
+            if current is None or current[column] != value
+        }
+        if not drift:
+            continue
+        if current is None:
+            _ensure_rollup_rows([hr_id])
+        assignments = ', '.join(f"{column} = ?" for column in columns)
+        db.execute_query(
+            f"UPDATE recruitment_rollup SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE hr_id = ?",
+            (*expected.values(), hr_id)
+        )
+        repaired[hr_id] = drift
+
+    return repaired
+
+
+def recruitment_funnel():
+    """
+    Global and per-HR funnel counts from the rollup, in one O(#HRs) query.
+
+    Counters of deleted HRs still count towards the totals, as their status rows did.
+    """
+    counters = ', '.join(f"COALESCE(r.{column}, 0) as {column}" for column in ROLLUP_COUNTERS)
+    rows = db.execute_query(f"""
+        SELECT h.id, h.full_name, h.company_name, {counters}
+        FROM hrs h
+        LEFT JOIN recruitment_rollup r ON r.hr_id = h.id
+        UNION ALL
+        SELECT r.hr_id, NULL, NULL, {counters}
+        FROM recruitment_rollup r
+        WHERE NOT EXISTS (SELECT 1 FROM hrs h WHERE h.id = r.hr_id)
+    """, fetch_all=True)
+
+    totals = {column: sum(row[column] for row in rows) for column in ROLLUP_COUNTERS}
+    by_hr = sorted((row for row in rows if row['full_name'] is not None), key=lambda row: -row['total_actions'])
+    return totals, by_hr
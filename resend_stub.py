@@ -0,0 +1,98 @@
+"""
+Local stand-in for the Resend API, for development and tests.
+
+    python resend_stub.py --port 8025
+    RESEND_API_URL=http://127.0.0.1:8025 RESEND_API_KEY=test python app.py
+
+Accepts POST /emails and POST /emails/batch like Resend, prints each email
+and answers with generated ids. GET /emails lists what it has received.
+Recipients containing "reject" make the request fail with 422.
+"""
+
+import json
+import uuid
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ResendStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+    received = []
+    lock = threading.Lock()
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path != '/emails':
+            return self._reply(404, {'message': 'Not found'})
+        with self.lock:
+            return self._reply(200, {'data': list(self.received)})
+
+    def do_POST(self):
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self._reply(401, {'message': 'Missing API key'})
+
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b'null')
+        except ValueError:
+            return self._reply(400, {'message': 'Invalid JSON'})
+
+        if self.path == '/emails':
+            emails = [body]
+        elif self.path == '/emails/batch':
+            if not isinstance(body, list) or not 1 <= len(body) <= 100:
+                return self._reply(422, {'message': 'Batch must contain 1-100 emails'})
+            emails = body
+        else:
+            return self._reply(404, {'message': 'Not found'})
+
+        for email in emails:
+            if not isinstance(email, dict) or not email.get('to') or not email.get('from') or not email.get('subject'):
+                return self._reply(422, {'message': 'from, to and subject are required'})
+            if any('reject' in recipient for recipient in email['to']):
+                return self._reply(422, {'message': f"Recipient rejected: {email['to']}"})
+
+        ids = [{'id': str(uuid.uuid4())} for _ in emails]
+        with self.lock:
+            for email, email_id in zip(emails, ids):
+                self.received.append(dict(email, id=email_id['id']))
+        for email in emails:
+            print(f"📧 [resend stub] {email['to']} - {email['subject']}", flush=True)
+
+        return self._reply(200, ids[0] if self.path == '/emails' else {'data': ids})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host='127.0.0.1', port=8025):
+    """Start the stub in a background thread and return the server (call .shutdown() to stop)"""
+    server = ThreadingHTTPServer((host, port), ResendStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Resend API stub')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), ResendStubHandler)
+    print(f"📮 Resend stub listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,18 @@
 from flask import Blueprint, request, jsonify, session, redirect, url_for, render_template, send_file
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
-from database import db, get_db_type, get_agg_func, is_postgres
-from utils import generate_wapl_id, sanitize_input, send_account_activation_email
+from database import db, get_db_type, get_agg_func, is_postgres, index_usage_report, SQLITE_HAS_RETURNING
+from utils import generate_wapl_id, sanitize_input, send_account_activation_email, send_account_activation_emails, encode_cursor, decode_cursor, generate_qr_code, certificate_verify_url
+from cache import TTLCache
+from jobs import enqueue, get_job
+from search import index_students, remove_students, matching_condition, search_students, search_results, search_terms, SEARCH_PAGE_SIZE, SEARCH_PAGE_MAX
+from verification import invalidate_certificates, invalidate_active_certificates
+from recruitment import recruitment_funnel, refresh_assigned_counts, assigned_hr_ids
 from functools import wraps
+from io import BytesIO
 import json
 import os
+import heapq
 
 
 admin_bp = Blueprint('admin', __name__)
@@ -212,68 +219,62 @@ def check_super_admin():
     return jsonify({'is_super_admin': session.get('is_super_admin', False)}), 200
 
 
+# Dashboard counters are polled often; serve them from a short-lived per-process snapshot
+DASHBOARD_STATS_TTL = float(os.environ.get('DASHBOARD_STATS_TTL', 15))
+_dashboard_stats_cache = TTLCache(ttl=DASHBOARD_STATS_TTL, maxsize=1)
+db.on_table_write(('students', 'hrs', 'certificates', 'domains'), _dashboard_stats_cache.clear)
+
+
+def _load_dashboard_stats():
+    """All dashboard counters in one statement: one pass over students plus three small counts"""
+    is_active_val = "TRUE" if is_postgres() else "1"
+    stats = db.execute_query(f"""
+        SELECT
+            COUNT(*) as total_students,
+            COALESCE(SUM(CASE WHEN account_status = 'active' THEN 1 ELSE 0 END), 0) as active_students,
+            COALESCE(SUM(CASE WHEN account_status = 'pending' THEN 1 ELSE 0 END), 0) as pending_students,
+            COALESCE(SUM(CASE WHEN account_status = 'suspended' THEN 1 ELSE 0 END), 0) as suspended_students,
+            COALESCE(SUM(CASE WHEN assigned_hr_id IS NOT NULL THEN 1 ELSE 0 END), 0) as assigned_students,
+            (SELECT COUNT(*) FROM hrs) as total_hrs,
+            (SELECT COUNT(*) FROM certificates) as total_certificates,
+            (SELECT COUNT(*) FROM domains WHERE is_active = {is_active_val}) as total_domains
+        FROM students
+    """, fetch_one=True)
+
+    return {
+        'total_students': int(stats['total_students']),
+        'active_students': int(stats['active_students']),
+        'pending_students': int(stats['pending_students']),
+        'suspended_students': int(stats['suspended_students']),
+        'total_hrs': int(stats['total_hrs']),
+        'total_certificates': int(stats['total_certificates']),
+        'total_domains': int(stats['total_domains']),
+        'assigned_students': int(stats['assigned_students'])
+    }
+
+
 @admin_bp.route('/api/admin/dashboard/stats', methods=['GET'])
 @require_admin_auth
 def get_dashboard_stats():
     """Get dashboard statistics"""
     try:
-        total_students = db.execute_query(
-            "SELECT COUNT(*) as count FROM students",
-            fetch_one=True
-        )
-        
-        active_students = db.execute_query(
-            "SELECT COUNT(*) as count FROM students WHERE account_status = 'active'",
-            fetch_one=True
-        )
-        
-        pending_students = db.execute_query(
-            "SELECT COUNT(*) as count FROM students WHERE account_status = 'pending'",
-            fetch_one=True
-        )
-        
-        suspended_students = db.execute_query(
-            "SELECT COUNT(*) as count FROM students WHERE account_status = 'suspended'",
-            fetch_one=True
-        )
-        
-        total_hrs = db.execute_query(
-            "SELECT COUNT(*) as count FROM hrs",
-            fetch_one=True
-        )
-        
-        total_certificates = db.execute_query(
-            "SELECT COUNT(*) as count FROM certificates",
-            fetch_one=True
-        )
-        
-        is_active_val = "TRUE" if is_postgres() else "1"
-        total_domains = db.execute_query(
-            f"SELECT COUNT(*) as count FROM domains WHERE is_active = {is_active_val}",
-            fetch_one=True
-        )
-        
-        assigned_students = db.execute_query(
-            "SELECT COUNT(*) as count FROM students WHERE assigned_hr_id IS NOT NULL",
-            fetch_one=True
-        )
-        
-        return jsonify({
-            'total_students': total_students['count'] if total_students else 0,
-            'active_students': active_students['count'] if active_students else 0,
-            'pending_students': pending_students['count'] if pending_students else 0,
-            'suspended_students': suspended_students['count'] if suspended_students else 0,
-            'total_hrs': total_hrs['count'] if total_hrs else 0,
-            'total_certificates': total_certificates['count'] if total_certificates else 0,
-            'total_domains': total_domains['count'] if total_domains else 0,
-            'assigned_students': assigned_students['count'] if assigned_students else 0
-        }), 200
+        return jsonify(_dashboard_stats_cache.get_or_set('stats', _load_dashboard_stats)), 200
         
     except Exception as e:
         print(f"Error getting dashboard stats: {e}")
         return jsonify({'error': str(e)}), 500
 
 
+@admin_bp.route('/api/admin/db/index-report', methods=['GET'])
+@require_super_admin_auth
+def get_index_report():
+    """Show which secondary index each hot query's plan uses"""
+    try:
+        return jsonify(index_usage_report()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 # ==================== ADMIN MANAGEMENT ROUTES ====================
 
 
@@ -376,18 +377,110 @@ def delete_admin(admin_id):
 # ==================== STUDENT MANAGEMENT ROUTES ====================
 
 
+STUDENTS_PAGE_SIZE = 50
+STUDENTS_PAGE_MAX = 200
+_STUDENT_LIST_ARGS = ('limit', 'cursor', 'order', 'status', 'domain_id', 'hr_id', 'q')
+# Keyset sort key: students without a registration date sort as the oldest on both backends
+# (must match the idx_students_registration_sort expression, migration 0013)
+STUDENT_SORT_DATE = "COALESCE(s.registration_date, '1970-01-01 00:00:00')"
+
+
+def _decode_student_cursor(cursor):
+    registration_date, student_id = decode_cursor(cursor, 2)
+    return str(registration_date), int(student_id)
+
+
+def _domain_names_by_student(student_ids):
+    """{student_id: 'AI, ML'} for the given students"""
+    domains = db.batch_load("""
+        SELECT sd.student_id, d.domain_name
+        FROM student_domains sd
+        JOIN domains d ON sd.domain_id = d.id
+        WHERE sd.student_id IN ({ids})
+        ORDER BY d.domain_name
+    """, student_ids, key='student_id')
+    return {student_id: ', '.join(row['domain_name'] for row in rows) for student_id, rows in domains.items()}
+
+
+def _student_list_filters(args):
+    """WHERE clause and params for the status / domain / HR / search filters"""
+    where = " WHERE 1=1"
+    params = []
+
+    status = args.get('status', '').strip()
+    if status:
+        where += " AND s.account_status = ?"
+        params.append(status)
+
+    domain_id = args.get('domain_id', '').strip()
+    if domain_id:
+        where += " AND EXISTS (SELECT 1 FROM student_domains sdf WHERE sdf.student_id = s.id AND sdf.domain_id = ?)"
+        params.append(int(domain_id))
+
+    hr_id = args.get('hr_id', '').strip()
+    if hr_id == 'none':
+        where += " AND s.assigned_hr_id IS NULL"
+    elif hr_id:
+        where += " AND s.assigned_hr_id = ?"
+        params.append(int(hr_id))
+
+    # Answered from the full-text index (prefix match on every word)
+    terms = search_terms(args.get('q', ''))
+    if terms:
+        condition, condition_params = matching_condition(terms)
+        where += f" AND {condition}"
+        params.extend(condition_params)
+
+    return where, params
+
+
+def _estimate_student_total(where, params, filtered):
+    """Exact COUNT for filtered lists; planner estimate for the whole table on PostgreSQL"""
+    if not filtered and is_postgres():
+        estimate = db.execute_query(
+            "SELECT reltuples::bigint as estimate FROM pg_class WHERE relname = 'students'",
+            fetch_one=True
+        )
+        # reltuples is -1 / 0 until the table has been analyzed
+        if estimate and estimate['estimate'] > 0:
+            return int(estimate['estimate']), True
+
+    total = db.execute_query(f"""
+        SELECT COUNT(*) as count
+        FROM students s
+        LEFT JOIN users u ON s.user_id = u.id
+        {where}
+    """, tuple(params), fetch_one=True)
+    return int(total['count']), False
+
+
 @admin_bp.route('/api/admin/students', methods=['GET'])
 @require_admin_auth
 def get_students():
-    """Get all students"""
+    """
+    Get students, newest first.
+
+    Without query parameters this returns the full list (legacy callers).
+    With any of limit / cursor / order / status / domain_id / hr_id / q it
+    returns one keyset page on (registration_date, id) plus next_cursor
+    (students without a registration date come last, newest first),
+    and on the first page a total (estimated when unfiltered on PostgreSQL).
+    """
     try:
-        # Database compatibility for string aggregation
-        # Force check environment directly to avoid import issues
-        is_postgres = bool(os.environ.get('DATABASE_URL'))
-        agg_func = "STRING_AGG(d.domain_name, ', ')" if is_postgres else "GROUP_CONCAT(d.domain_name, ', ')"
-        print(f"DEBUG: Executing get_students with is_postgres={is_postgres} agg_func={agg_func[:10]}...")
-        
-        students = db.execute_query(f"""
+        paginated = any(arg in request.args for arg in _STUDENT_LIST_ARGS)
+
+        try:
+            where, params = _student_list_filters(request.args)
+            limit = int(request.args.get('limit', STUDENTS_PAGE_SIZE))
+            cursor = request.args.get('cursor')
+            position = _decode_student_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({'error': f'Invalid parameter: {e}'}), 400
+        limit = max(1, min(limit, STUDENTS_PAGE_MAX))
+        descending = request.args.get('order', 'desc').lower() != 'asc'
+        direction = 'DESC' if descending else 'ASC'
+
+        query = f"""
             SELECT 
                 s.id,
                 s.user_id,
@@ -398,6 +491,7 @@ def get_students():
                 s.resume,
                 s.domain_id,
                 s.registration_date,
+                {STUDENT_SORT_DATE} as sort_date,
                 s.certificate_issued_date,
                 s.certificate_expiry_date,
                 s.assigned_hr_id,
@@ -408,27 +502,104 @@ def get_students():
                 s.account_status,
                 u.email,
                 h.full_name as assigned_hr_name,
-                h.company_name as hr_company,
-                {agg_func} as domain_names
+                h.company_name as hr_company
             FROM students s
             LEFT JOIN users u ON s.user_id = u.id
             LEFT JOIN hrs h ON s.assigned_hr_id = h.id
-            LEFT JOIN student_domains sd ON s.id = sd.student_id
-            LEFT JOIN domains d ON sd.domain_id = d.id
-            GROUP BY s.id, u.email, h.full_name, h.company_name, u.email, 
-                     s.user_id, s.wapl_id, s.full_name, s.phone, s.profile_pic, 
-                     s.resume, s.domain_id, s.registration_date, s.certificate_issued_date, 
-                     s.certificate_expiry_date, s.assigned_hr_id, s.address, 
-                     s.education_details, s.skills, s.projects, s.account_status
-            ORDER BY s.registration_date DESC
-        """, fetch_all=True)
-        
-        return jsonify(students), 200
+            {where}
+        """
+        page_params = list(params)
+
+        if paginated and position:
+            query += f" AND ({STUDENT_SORT_DATE}, s.id) {'<' if descending else '>'} (?, ?)"
+            page_params.extend(position)
+
+        query += f" ORDER BY {STUDENT_SORT_DATE} {direction}, s.id {direction}"
+
+        if paginated:
+            # One extra row tells us whether another page exists
+            query += " LIMIT ?"
+            page_params.append(limit + 1)
+
+        students = db.execute_query(query, tuple(page_params), fetch_all=True)
+
+        has_more = paginated and len(students) > limit
+        students = students[:limit] if paginated else students
+        last_sort_date = students[-1]['sort_date'] if students else None
+        for student in students:
+            del student['sort_date']
+
+        domain_names = _domain_names_by_student(s['id'] for s in students)
+        for student in students:
+            student['domain_names'] = domain_names.get(student['id'])
+
+        if not paginated:
+            return jsonify(students), 200
+
+        response = {
+            'students': students,
+            'limit': limit,
+            'has_more': has_more,
+            'next_cursor': encode_cursor(last_sort_date, students[-1]['id']) if has_more else None
+        }
+
+        # The total only matters for the first page; later pages skip the count
+        if not position:
+            filtered = any(request.args.get(arg, '').strip() for arg in ('status', 'domain_id', 'hr_id', 'q'))
+            response['total'], response['total_is_estimate'] = _estimate_student_total(where, params, filtered)
+
+        return jsonify(response), 200
     except Exception as e:
         print(f"Error getting students: {e}")
         return jsonify({'error': str(e)}), 500
 
 
+@admin_bp.route('/api/admin/students/search', methods=['GET'])
+@require_admin_auth
+def search_students_route():
+    """
+    Ranked full-text search over student profiles (name, WAPL ID, email, phone,
+    skills, projects, education). Every word is a prefix match and all must match.
+    Optional status / hr_id narrow the results; page with limit and next_cursor.
+    """
+    try:
+        text = request.args.get('q', '')
+        try:
+            limit = max(1, min(int(request.args.get('limit', SEARCH_PAGE_SIZE)), SEARCH_PAGE_MAX))
+            cursor = request.args.get('cursor')
+            offset = max(0, int(decode_cursor(cursor, 1)[0])) if cursor else 0
+        except ValueError as e:
+            return jsonify({'error': f'Invalid parameter: {e}'}), 400
+        
+        if not search_terms(text):
+            return jsonify({'error': 'Search text (q) required'}), 400
+        
+        where = ""
+        params = []
+        status = request.args.get('status', '').strip()
+        if status:
+            where += " AND s.account_status = ?"
+            params.append(status)
+        hr_id = request.args.get('hr_id', '').strip()
+        if hr_id == 'none':
+            where += " AND s.assigned_hr_id IS NULL"
+        elif hr_id:
+            where += " AND s.assigned_hr_id = ?"
+            params.append(int(hr_id))
+        
+        hits, has_more = search_students(text, limit, offset, where, params)
+        
+        return jsonify({
+            'students': search_results(hits),
+            'limit': limit,
+            'has_more': has_more,
+            'next_cursor': encode_cursor(offset + limit) if has_more else None
+        }), 200
+    except Exception as e:
+        print(f"Error searching students: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @admin_bp.route('/api/admin/student/<int:student_id>', methods=['GET'])
 @require_admin_auth
 def get_student_detail(student_id):
@@ -521,6 +692,8 @@ def create_student():
         
         if not domain_ids or len(domain_ids) == 0:
             return jsonify({'error': 'Please select at least one domain'}), 400
+        # A domain picked twice would hit UNIQUE(student_id, domain_id) on insert
+        domain_ids = list(dict.fromkeys(domain_ids))
         
         if len(password) < 6:
             return jsonify({'error': 'Password must be at least 6 characters'}), 400
@@ -582,24 +755,24 @@ def create_student():
         
         # Create student record
         try:
-            # Try new schema with address
             # Try new schema with address
             insert_student_sql = '''INSERT INTO students 
                    (user_id, wapl_id, full_name, phone, address, account_status, registration_date)
                    VALUES (?, ?, ?, ?, ?, ?, ?)'''
                    
-            if get_db_type() == 'postgres':
-                insert_student_sql += " RETURNING id"
-                student_id = db.execute_query(
-                    insert_student_sql,
-                    (user_id, wapl_id, full_name, phone, address or '', 'active', datetime.now()),
-                    fetch_one=True
-                )['id']
-            else:
-                student_id = db.execute_query(
-                    insert_student_sql,
-                    (user_id, wapl_id, full_name, phone, address or '', 'active', datetime.now())
-                )
+            with db.savepoint():
+                if get_db_type() == 'postgres':
+                    insert_student_sql += " RETURNING id"
+                    student_id = db.execute_query(
+                        insert_student_sql,
+                        (user_id, wapl_id, full_name, phone, address or '', 'active', datetime.now()),
+                        fetch_one=True
+                    )['id']
+                else:
+                    student_id = db.execute_query(
+                        insert_student_sql,
+                        (user_id, wapl_id, full_name, phone, address or '', 'active', datetime.now())
+                    )
             print(f"✅ Student profile created with ID: {student_id}")
         except Exception as schema_error:
             print(f"⚠️ New schema failed, trying old schema: {schema_error}")
@@ -614,11 +787,12 @@ def create_student():
         
         # Assign domains
         try:
-            for domain_id in domain_ids:
-                db.execute_query(
-                    "INSERT INTO student_domains (student_id, domain_id) VALUES (?, ?)",
-                    (student_id, domain_id)
-                )
+            with db.savepoint():
+                for domain_id in domain_ids:
+                    db.execute_query(
+                        "INSERT INTO student_domains (student_id, domain_id) VALUES (?, ?)",
+                        (student_id, domain_id)
+                    )
             print(f"✅ Assigned {len(domain_ids)} domains via junction table")
         except Exception as domain_error:
             print(f"⚠️ Junction table failed, using old domain_id column: {domain_error}")
@@ -629,6 +803,8 @@ def create_student():
             )
             print(f"✅ Assigned domain {domain_ids[0]} via domain_id column")
         
+        index_students([student_id])
+        
         print(f"✅✅ Student created successfully: {email} (WAPL ID: {wapl_id})")
         
         return jsonify({
@@ -658,6 +834,7 @@ def update_student_status(student_id):
             return jsonify({'error': 'Invalid status'}), 400
         
         db.execute_query("UPDATE students SET account_status = ? WHERE id = ?", (status, student_id))
+        refresh_assigned_counts(assigned_hr_ids([student_id]))
         
         print(f"Student {student_id} status changed to {status}")
         return jsonify({'message': 'Student status updated'}), 200
@@ -689,18 +866,15 @@ def approve_student(student_id):
             "UPDATE students SET account_status = ? WHERE id = ?",
             ('active', student_id)
         )
+        refresh_assigned_counts(assigned_hr_ids([student_id]))
         
-        # Send approval email
-        try:
-            send_account_activation_email(
-                to_email=student['email'],
-                full_name=student['full_name'],
-                wapl_id=student['wapl_id']
-            )
-            print(f"✅ Approval email sent to {student['email']}")
-        except Exception as email_error:
-            print(f"⚠️ Warning: Could not send approval email: {str(email_error)}")
-            # Don't fail the approval if email fails
+        # Queue approval email; it goes out once the approval commits
+        send_account_activation_email(
+            to_email=student['email'],
+            full_name=student['full_name'],
+            wapl_id=student['wapl_id']
+        )
+        print(f"✅ Approval email queued for {student['email']}")
         
         print(f"Student {student_id} approved")
         return jsonify({'message': 'Student approved successfully'}), 200
@@ -730,6 +904,7 @@ def suspend_student(student_id):
             "UPDATE students SET account_status = ? WHERE id = ?",
             ('suspended', student_id)
         )
+        refresh_assigned_counts(assigned_hr_ids([student_id]))
         
         print(f"Student {student_id} suspended")
         return jsonify({'message': 'Student suspended successfully'}), 200
@@ -759,6 +934,7 @@ def activate_student(student_id):
             "UPDATE students SET account_status = ? WHERE id = ?",
             ('active', student_id)
         )
+        refresh_assigned_counts(assigned_hr_ids([student_id]))
         
         print(f"Student {student_id} activated")
         return jsonify({'message': 'Student activated successfully'}), 200
@@ -767,6 +943,138 @@ def activate_student(student_id):
         return jsonify({'error': str(e)}), 500
 
 
+# Bulk status transitions: action -> (new status, statuses it may start from; None = any other status)
+BULK_STATUS_ACTIONS = {
+    'approve': ('active', ('pending',)),
+    'activate': ('active', None),
+    'suspend': ('suspended', None),
+}
+BULK_STATUS_MAX_IDS = 1000
+BULK_STATUS_CHUNK = 500  # keeps IN (...) under SQLite's bound-parameter limit
+
+
+def _bulk_transition(ids, new_status, from_statuses):
+    """Set-based guarded UPDATE; returns the ids it actually changed"""
+    placeholders = ','.join('?' * len(ids))
+    if from_statuses:
+        guard = f"account_status IN ({','.join('?' * len(from_statuses))})"
+        guard_params = tuple(from_statuses)
+    else:
+        guard = "(account_status IS NULL OR account_status <> ?)"
+        guard_params = (new_status,)
+    sql = f"UPDATE students SET account_status = ? WHERE id IN ({placeholders}) AND {guard}"
+
+    if is_postgres() or SQLITE_HAS_RETURNING:
+        rows = db.execute_query(sql + " RETURNING id", (new_status, *ids, *guard_params), fetch_all=True)
+        return {row['id'] for row in rows}
+
+    # Older SQLite: hold the write lock, then read exactly the rows the UPDATE will change
+    db.lock_for_write()
+    rows = db.execute_query(
+        f"SELECT id FROM students WHERE id IN ({placeholders}) AND {guard}",
+        (*ids, *guard_params),
+        fetch_all=True
+    )
+    changed = [row['id'] for row in rows]
+    if changed:
+        db.execute_update(
+            f"UPDATE students SET account_status = ? WHERE id IN ({','.join('?' * len(changed))})",
+            (new_status, *changed)
+        )
+    return set(changed)
+
+
+@admin_bp.route('/api/admin/students/status', methods=['POST'])
+@require_admin_auth
+def bulk_update_student_status():
+    """
+    Approve, activate or suspend many students at once.
+
+    Body: {"action": "approve" | "activate" | "suspend", "studentIds": [...]}.
+    Applies the same rules as the single-student endpoints with one UPDATE per
+    500 ids, queues approval emails in one outbox insert and returns an outcome
+    per id: updated, skipped (with the reason) or not_found.
+    """
+    try:
+        data = request.get_json() or {}
+        action = data.get('action')
+        student_ids = data.get('studentIds', [])
+
+        if action not in BULK_STATUS_ACTIONS:
+            return jsonify({'error': f"Invalid action. Must be one of: {', '.join(BULK_STATUS_ACTIONS)}"}), 400
+        if not student_ids:
+            return jsonify({'error': 'Student IDs required'}), 400
+        try:
+            student_ids = list(dict.fromkeys(int(student_id) for student_id in student_ids))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Student IDs must be integers'}), 400
+        if len(student_ids) > BULK_STATUS_MAX_IDS:
+            return jsonify({'error': f'At most {BULK_STATUS_MAX_IDS} students per request'}), 400
+
+        new_status, from_statuses = BULK_STATUS_ACTIONS[action]
+
+        students = {}
+        for start in range(0, len(student_ids), BULK_STATUS_CHUNK):
+            chunk = student_ids[start:start + BULK_STATUS_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            rows = db.execute_query(
+                f"""SELECT s.id, s.account_status, s.full_name, s.wapl_id, u.email
+                    FROM students s JOIN users u ON s.user_id = u.id
+                    WHERE s.id IN ({placeholders})""",
+                tuple(chunk),
+                fetch_all=True
+            )
+            students.update((row['id'], row) for row in rows)
+
+        results = {}
+        eligible = []
+        for student_id in student_ids:
+            student = students.get(student_id)
+            if not student:
+                results[student_id] = {'id': student_id, 'status': 'not_found', 'error': 'Student not found'}
+            elif from_statuses and student['account_status'] not in from_statuses:
+                results[student_id] = {'id': student_id, 'status': 'skipped',
+                                       'error': f'Only pending students can be approved. Current status: {student["account_status"]}'}
+            elif not from_statuses and student['account_status'] == new_status:
+                results[student_id] = {'id': student_id, 'status': 'skipped', 'error': f'Student is already {new_status}'}
+            else:
+                eligible.append(student_id)
+
+        updated = set()
+        for start in range(0, len(eligible), BULK_STATUS_CHUNK):
+            updated |= _bulk_transition(eligible[start:start + BULK_STATUS_CHUNK], new_status, from_statuses)
+
+        for student_id in eligible:
+            if student_id in updated:
+                results[student_id] = {'id': student_id, 'status': 'updated', 'previous_status': students[student_id]['account_status']}
+            else:
+                results[student_id] = {'id': student_id, 'status': 'skipped', 'error': 'Status changed concurrently'}
+
+        # Moving assigned students in or out of 'active' changes their HRs' assigned_count
+        changed_ids = sorted(updated)
+        touched_hrs = set()
+        for start in range(0, len(changed_ids), BULK_STATUS_CHUNK):
+            touched_hrs |= assigned_hr_ids(changed_ids[start:start + BULK_STATUS_CHUNK])
+        refresh_assigned_counts(touched_hrs)
+
+        emails_queued = 0
+        if action == 'approve' and updated:
+            # One outbox insert for the whole batch; delivered once the transaction commits
+            emails_queued = send_account_activation_emails([students[student_id] for student_id in eligible if student_id in updated])
+            print(f"✅ {emails_queued} approval email(s) queued")
+
+        print(f"Bulk {action}: {len(updated)} of {len(student_ids)} student(s) updated")
+        return jsonify({
+            'action': action,
+            'updated': len(updated),
+            'emailsQueued': emails_queued,
+            'results': [results[student_id] for student_id in student_ids]
+        }), 200
+    except Exception as e:
+        print(f"Error updating student statuses: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @admin_bp.route('/api/admin/student/<int:student_id>', methods=['DELETE'])
 @require_admin_auth
 def delete_student(student_id):
@@ -776,8 +1084,14 @@ def delete_student(student_id):
         if not student:
             return jsonify({'error': 'Student not found'}), 404
         
+        previous_hrs = assigned_hr_ids([student_id])
+        # Cached verification results of their certificates go once this commits
+        invalidate_active_certificates(student_id)
+        db.execute_query("DELETE FROM student_skills WHERE student_id = ?", (student_id,))
         db.execute_query("DELETE FROM students WHERE id = ?", (student_id,))
         db.execute_query("DELETE FROM users WHERE id = ?", (student['user_id'],))
+        refresh_assigned_counts(previous_hrs)
+        remove_students([student_id])
         
         print(f"Student {student_id} deleted")
         return jsonify({'message': 'Student deleted successfully'}), 200
@@ -924,27 +1238,142 @@ def get_hr_students(hr_id):
 # ==================== STUDENT ASSIGNMENT ROUTES ====================
 
 
+ASSIGNMENT_CHUNK = 500  # keeps IN (...) under SQLite's bound-parameter limit
+
+
+def _parse_ids(raw_ids):
+    """Distinct integer ids in request order; raises ValueError on junk"""
+    return list(dict.fromkeys(int(student_id) for student_id in raw_ids))
+
+
+def _set_assigned_hr(student_ids, hr_id, only_unassigned=False):
+    """
+    Point ``student_ids`` at ``hr_id`` (None unassigns) with one UPDATE per chunk.
+    Rows already in that state are not touched; returns how many actually changed.
+    The old and new HRs' assigned_count is recounted in the same transaction.
+    """
+    changed = 0
+    touched_hrs = {hr_id}
+    for start in range(0, len(student_ids), ASSIGNMENT_CHUNK):
+        chunk = student_ids[start:start + ASSIGNMENT_CHUNK]
+        placeholders = ','.join('?' * len(chunk))
+        touched_hrs |= assigned_hr_ids(chunk)
+        if hr_id is None:
+            changed += db.execute_update(
+                f"UPDATE students SET assigned_hr_id = NULL WHERE id IN ({placeholders}) AND assigned_hr_id IS NOT NULL",
+                tuple(chunk)
+            )
+        elif only_unassigned:
+            changed += db.execute_update(
+                f"UPDATE students SET assigned_hr_id = ? WHERE id IN ({placeholders}) AND assigned_hr_id IS NULL",
+                (hr_id, *chunk)
+            )
+        else:
+            changed += db.execute_update(
+                f"UPDATE students SET assigned_hr_id = ? WHERE id IN ({placeholders}) AND (assigned_hr_id IS NULL OR assigned_hr_id <> ?)",
+                (hr_id, *chunk, hr_id)
+            )
+    if changed:
+        refresh_assigned_counts(touched_hrs)
+    return changed
+
+
+def _rebalance_assignments(student_ids=None, hr_ids=None):
+    """
+    Spread active, unassigned students over HRs: each student goes to the HR with
+    the fewest assigned students so far (ties to the lowest id). Returns {hr_id: assigned}.
+    """
+    hr_where = ""
+    hr_params = ()
+    if hr_ids:
+        hr_where = f"WHERE h.id IN ({','.join('?' * len(hr_ids))})"
+        hr_params = tuple(hr_ids)
+    loads = db.execute_query(f"""
+        SELECT h.id, COUNT(s.id) as assigned_count
+        FROM hrs h
+        LEFT JOIN students s ON s.assigned_hr_id = h.id
+        {hr_where}
+        GROUP BY h.id
+    """, hr_params, fetch_all=True)
+    if not loads:
+        return {}
+
+    student_where = "assigned_hr_id IS NULL AND account_status = 'active'"
+    if student_ids:
+        # Chunked like _set_assigned_hr so a large selection stays under the bind-parameter limit
+        candidates = []
+        for start in range(0, len(student_ids), ASSIGNMENT_CHUNK):
+            chunk = student_ids[start:start + ASSIGNMENT_CHUNK]
+            candidates += db.execute_query(
+                f"SELECT id FROM students WHERE {student_where} AND id IN ({','.join('?' * len(chunk))})",
+                tuple(chunk),
+                fetch_all=True
+            )
+        candidates.sort(key=lambda row: row['id'])
+    else:
+        candidates = db.execute_query(
+            f"SELECT id FROM students WHERE {student_where} ORDER BY id",
+            fetch_all=True
+        )
+
+    heap = [(row['assigned_count'], row['id']) for row in loads]
+    heapq.heapify(heap)
+    planned = {}
+    for candidate in candidates:
+        load, hr_id = heapq.heappop(heap)
+        planned.setdefault(hr_id, []).append(candidate['id'])
+        heapq.heappush(heap, (load + 1, hr_id))
+
+    # One set-based UPDATE per HR; the IS NULL guard skips anyone assigned meanwhile
+    return {hr_id: _set_assigned_hr(ids, hr_id, only_unassigned=True) for hr_id, ids in planned.items()}
+
+
 @admin_bp.route('/api/admin/assign-students', methods=['POST'])
 @require_admin_auth
 def assign_students():
-    """Assign students to HR"""
+    """
+    Assign students to HR.
+
+    With {"mode": "rebalance"} active unassigned students (optionally limited to
+    studentIds) are spread across HRs (optionally limited to hrIds) by current load.
+    """
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
+
+        if data.get('mode') == 'rebalance':
+            try:
+                student_ids = _parse_ids(data.get('studentIds') or [])
+                hr_ids = _parse_ids(data.get('hrIds') or [])
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Student and HR IDs must be integers'}), 400
+
+            per_hr = _rebalance_assignments(student_ids, hr_ids)
+            changed = sum(per_hr.values())
+            print(f"{changed} unassigned students balanced across {len(per_hr)} HR(s)")
+            return jsonify({
+                'message': f'{changed} students assigned across {len(per_hr)} HR(s)',
+                'changed': changed,
+                'assignments': [{'hrId': hr_id, 'assigned': count} for hr_id, count in sorted(per_hr.items())]
+            }), 200
+
         hr_id = data.get('hrId')
         student_ids = data.get('studentIds', [])
         
         if not hr_id or not student_ids:
             return jsonify({'error': 'HR ID and student IDs required'}), 400
+        try:
+            student_ids = _parse_ids(student_ids)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Student IDs must be integers'}), 400
         
         hr = db.execute_query("SELECT id FROM hrs WHERE id = ?", (hr_id,), fetch_one=True)
         if not hr:
             return jsonify({'error': 'HR not found'}), 404
         
-        for student_id in student_ids:
-            db.execute_query("UPDATE students SET assigned_hr_id = ? WHERE id = ?", (hr_id, student_id))
+        changed = _set_assigned_hr(student_ids, hr['id'])
         
-        print(f"{len(student_ids)} students assigned to HR {hr_id}")
-        return jsonify({'message': f'{len(student_ids)} students assigned successfully'}), 200
+        print(f"{changed} of {len(student_ids)} students assigned to HR {hr_id}")
+        return jsonify({'message': f'{changed} students assigned successfully', 'changed': changed}), 200
     except Exception as e:
         print(f"Error assigning students: {e}")
         return jsonify({'error': str(e)}), 500
@@ -960,12 +1389,15 @@ def unassign_students():
         
         if not student_ids:
             return jsonify({'error': 'Student IDs required'}), 400
+        try:
+            student_ids = _parse_ids(student_ids)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Student IDs must be integers'}), 400
         
-        for student_id in student_ids:
-            db.execute_query("UPDATE students SET assigned_hr_id = NULL WHERE id = ?", (student_id,))
+        changed = _set_assigned_hr(student_ids, None)
         
-        print(f"{len(student_ids)} students unassigned")
-        return jsonify({'message': f'{len(student_ids)} students unassigned successfully'}), 200
+        print(f"{changed} of {len(student_ids)} students unassigned")
+        return jsonify({'message': f'{changed} students unassigned successfully', 'changed': changed}), 200
     except Exception as e:
         print(f"Error unassigning students: {e}")
         return jsonify({'error': str(e)}), 500
@@ -1159,145 +1591,65 @@ def get_certificates():
             ORDER BY c.issue_date DESC
         """, fetch_all=True)
         
+        for cert in certificates:
+            cert['qr_code_path'] = f"/api/admin/certificates/{cert['certificate_unique_id']}/qr.png"
+        
         return jsonify(certificates), 200
     except Exception as e:
         print(f"Error getting certificates: {e}")
         return jsonify({'error': str(e)}), 500
 
 
+@admin_bp.route('/api/admin/certificates/<cert_unique_id>/qr.png', methods=['GET'])
+@require_admin_auth
+def get_certificate_qr(cert_unique_id):
+    """QR code PNG of a certificate, rendered on request instead of kept on disk"""
+    cert = db.execute_query(
+        "SELECT id FROM certificates WHERE certificate_unique_id = ?",
+        (cert_unique_id,),
+        fetch_one=True
+    )
+    if not cert:
+        return jsonify({'error': 'Certificate not found'}), 404
+    
+    base_domain = os.environ.get('APP_DOMAIN', request.host_url.rstrip('/'))
+    png = generate_qr_code(certificate_verify_url(base_domain, cert_unique_id))
+    response = send_file(BytesIO(png), mimetype='image/png', download_name=f'{cert_unique_id}_qr.png')
+    response.headers['Cache-Control'] = 'private, max-age=86400'
+    return response
+
+
 @admin_bp.route('/api/admin/certificates/issue', methods=['POST'])
 @require_admin_auth
 def issue_certificates():
-    """Issue certificates to students with QR code and PDF generation"""
+    """Queue certificate issuance; progress is served by /api/admin/jobs/<job_id>"""
     try:
-        from utils import generate_certificate_id, generate_qr_code, generate_certificate_pdf
-        
         data = request.get_json()
         student_ids = data.get('studentIds', [])
         
         if not student_ids:
             return jsonify({'error': 'Student IDs required'}), 400
         
-        # Create directories if they don't exist
-        os.makedirs('uploads/certificates', exist_ok=True)
-        os.makedirs('uploads/qr_codes', exist_ok=True)
-        
-        issued_count = 0
-        errors = []
-        agg_func = get_agg_func()
-        is_active_val = "TRUE" if is_postgres() else "1"
-        
-        for student_id in student_ids:
-            try:
-                # Get student details with domains
-                student = db.execute_query(f"""
-                    SELECT 
-                        s.*,
-                        u.email,
-                        {agg_func} as domain_names
-                    FROM students s
-                    LEFT JOIN users u ON s.user_id = u.id
-                    LEFT JOIN student_domains sd ON s.id = sd.student_id
-                    LEFT JOIN domains d ON sd.domain_id = d.id
-                    WHERE s.id = ?
-                    GROUP BY s.id, u.email
-                """, (student_id,), fetch_one=True)
-                
-                if not student:
-                    errors.append(f"Student ID {student_id} not found")
-                    continue
-                
-                # Check if already has active certificate
-                existing_cert = db.execute_query(
-                    f"SELECT id FROM certificates WHERE student_id = ? AND is_active = {is_active_val}",
-                    (student_id,),
-                    fetch_one=True
-                )
-                
-                if existing_cert:
-                    errors.append(f"{student['full_name']} already has an active certificate")
-                    continue
-                
-                # Generate unique certificate ID
-                cert_unique_id = generate_certificate_id()
-                
-                # Set dates
-                issue_date = datetime.now()
-                expiry_date = issue_date + timedelta(days=365)
-                
-                # Format dates for display
-                issue_date_str = issue_date.strftime('%d %B %Y')
-                expiry_date_str = expiry_date.strftime('%d %B %Y')
-                
-                # Generate QR code
-                # Use environment variable for domain, fallback to request host
-                base_domain = os.environ.get('APP_DOMAIN', request.host_url.rstrip('/'))
-                qr_data = f"{base_domain}/verify-certificate/{cert_unique_id}"
-                qr_code_path = f'uploads/qr_codes/{cert_unique_id}_qr.png'
-                generate_qr_code(qr_data, qr_code_path)
-                
-                # Generate PDF certificate using your template
-                pdf_path = f'uploads/certificates/{cert_unique_id}.pdf'
-                
-                domain_display = student['domain_names'] if student['domain_names'] else 'General Training'
-                
-                generate_certificate_pdf(
-                    student_name=student['full_name'],
-                    wapl_id=student['wapl_id'],
-                    domain_name=domain_display,
-                    issue_date=issue_date_str,
-                    expiry_date=expiry_date_str,
-                    qr_code_path=qr_code_path,
-                    output_path=pdf_path,
-                    hr_name=None,
-                    certificate_text=f"This certificate recognizes the candidate's hands-on experience in {domain_display} and successful assessment by WAPL."
-                )
-                
-                # Insert certificate into database
-                is_active_val = "TRUE" if is_postgres() else "1"
-                db.execute_query(f"""
-                    INSERT INTO certificates 
-                    (student_id, certificate_unique_id, issue_date, expiry_date, 
-                     qr_code, pdf_path, is_active, display_name) 
-                    VALUES (?, ?, ?, ?, ?, ?, {is_active_val}, ?)
-                """, (
-                    student_id,
-                    cert_unique_id,
-                    issue_date,
-                    expiry_date,
-                    qr_code_path,
-                    pdf_path,
-                    student['full_name']
-                ))
-                
-                # Update student record
-                db.execute_query("""
-                    UPDATE students 
-                    SET certificate_issued_date = ?, certificate_expiry_date = ? 
-                    WHERE id = ?
-                """, (issue_date, expiry_date, student_id))
-                
-                issued_count += 1
-                print(f"✅ Certificate {cert_unique_id} issued to {student['full_name']}")
-                
-            except Exception as student_error:
-                error_msg = f"Error for {student.get('full_name', f'student {student_id}') if 'student' in locals() else f'student {student_id}'}: {str(student_error)}"
-                errors.append(error_msg)
-                print(f"❌ {error_msg}")
+        try:
+            student_ids = [int(student_id) for student_id in student_ids]
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Student IDs must be integers'}), 400
         
-        # Prepare response message
-        if issued_count == 0 and errors:
-            return jsonify({'error': '; '.join(errors)}), 400
+        # Workers have no request - capture the public domain for the QR codes now
+        base_domain = os.environ.get('APP_DOMAIN', request.host_url.rstrip('/'))
         
-        message = f'{issued_count} certificate(s) issued successfully'
-        if errors:
-            message += f'. Warnings: {"; ".join(errors)}'
+        job_id = enqueue(
+            'issue_certificates',
+            student_ids,
+            payload={'base_domain': base_domain},
+            created_by_user_id=session.get('user_id')
+        )
         
         return jsonify({
-            'message': message, 
-            'issued_count': issued_count,
-            'errors': errors if errors else None
-        }), 201
+            'message': f'Certificate issuance queued for {len(set(student_ids))} student(s)',
+            'job_id': job_id,
+            'status_url': url_for('admin.get_job_status', job_id=job_id)
+        }), 202
         
     except Exception as e:
         print(f"❌ Error issuing certificates: {e}")
@@ -1306,20 +1658,29 @@ def issue_certificates():
         return jsonify({'error': str(e)}), 500
 
 
+@admin_bp.route('/api/admin/jobs/<int:job_id>', methods=['GET'])
+@require_admin_auth
+def get_job_status(job_id):
+    """Progress and per-item outcome of a background job"""
+    try:
+        job = get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @admin_bp.route('/api/admin/certificate/regenerate/<int:student_id>', methods=['POST'])
 @require_admin_auth
 def regenerate_certificate(student_id):
     """Regenerate certificate for a student"""
     try:
-        from utils import generate_certificate_id, generate_qr_code, generate_certificate_pdf
+        from utils import generate_certificate_id, generate_certificate_pdf, certificate_content_hash
+        from tasks import reusable_certificates
         
-        # Deactivate old certificate
         is_active_val = "TRUE" if is_postgres() else "1"
         is_inactive_val = "FALSE" if is_postgres() else "0"
-        db.execute_query(
-            f"UPDATE certificates SET is_active = {is_inactive_val} WHERE student_id = ? AND is_active = {is_active_val}",
-            (student_id,)
-        )
         
         # Get student details
         agg_func = get_agg_func()
@@ -1339,26 +1700,36 @@ def regenerate_certificate(student_id):
         if not student:
             return jsonify({'error': 'Student not found'}), 404
         
-        # Create directories
-        os.makedirs('uploads/certificates', exist_ok=True)
-        os.makedirs('uploads/qr_codes', exist_ok=True)
-        
-        # Generate new certificate
-        cert_unique_id = generate_certificate_id()
         issue_date = datetime.now()
         expiry_date = issue_date + timedelta(days=365)
         issue_date_str = issue_date.strftime('%d %B %Y')
         expiry_date_str = expiry_date.strftime('%d %B %Y')
         
-        # Generate QR code and PDF
         # Use environment variable for domain, fallback to request host
         base_domain = os.environ.get('APP_DOMAIN', request.host_url.rstrip('/'))
-        qr_data = f"{base_domain}/verify-certificate/{cert_unique_id}"
-        qr_code_path = f'uploads/qr_codes/{cert_unique_id}_qr.png'
-        generate_qr_code(qr_data, qr_code_path)
+        domain_display = student['domain_names'] if student['domain_names'] else 'General Training'
+        certificate_text = f"This certificate recognizes the candidate's hands-on experience in {domain_display} and successful assessment by WAPL."
+        content_hash = certificate_content_hash(
+            base_domain, student['full_name'], student['wapl_id'], domain_display,
+            issue_date_str, expiry_date_str, None, certificate_text
+        )
+        
+        # Nothing on the certificate would change - keep the active one
+        reusable = reusable_certificates({student_id: content_hash}).get(student_id)
+        if reusable:
+            return jsonify({
+                'message': 'Certificate is already up to date',
+                'certificate_id': reusable['certificate_unique_id'],
+                'reused': True
+            }), 200
         
+        # Create directories
+        os.makedirs('uploads/certificates', exist_ok=True)
+        
+        # Generate new certificate; the QR code is drawn from its data, no PNG is written
+        cert_unique_id = generate_certificate_id()
+        qr_data = certificate_verify_url(base_domain, cert_unique_id)
         pdf_path = f'uploads/certificates/{cert_unique_id}.pdf'
-        domain_display = student['domain_names'] if student['domain_names'] else 'General Training'
         
         generate_certificate_pdf(
             student_name=student['full_name'],
@@ -1366,26 +1737,35 @@ def regenerate_certificate(student_id):
             domain_name=domain_display,
             issue_date=issue_date_str,
             expiry_date=expiry_date_str,
-            qr_code_path=qr_code_path,
+            qr_code_path=None,
             output_path=pdf_path,
             hr_name=None,
-            certificate_text=f"This certificate recognizes the candidate's hands-on experience in {domain_display} and successful assessment by WAPL."
+            certificate_text=certificate_text,
+            qr_data=qr_data
+        )
+        
+        # Deactivate old certificate; its cached verification result goes once this commits
+        invalidate_active_certificates(student_id)
+        db.execute_query(
+            f"UPDATE certificates SET is_active = {is_inactive_val} WHERE student_id = ? AND is_active = {is_active_val}",
+            (student_id,)
         )
         
         # Insert new certificate
-        db.execute_query("""
+        db.execute_query(f"""
             INSERT INTO certificates 
             (student_id, certificate_unique_id, issue_date, expiry_date, 
-             qr_code, pdf_path, is_active, display_name) 
-            VALUES (?, ?, ?, ?, ?, ?, TRUE, ?)
+             qr_code, pdf_path, is_active, display_name, content_hash) 
+            VALUES (?, ?, ?, ?, ?, ?, {is_active_val}, ?, ?)
         """, (
             student_id,
             cert_unique_id,
             issue_date,
             expiry_date,
-            qr_code_path,
+            qr_data,
             pdf_path,
-            student['full_name']
+            student['full_name'],
+            content_hash
         ))
         
         # Update student record
@@ -1409,6 +1789,48 @@ def regenerate_certificate(student_id):
         return jsonify({'error': str(e)}), 500
 
 
+@admin_bp.route('/api/admin/certificates/regenerate', methods=['POST'])
+@require_admin_auth
+def regenerate_certificates():
+    """Queue a regeneration sweep for the given students (or every certified student with all=true)"""
+    try:
+        data = request.get_json() or {}
+        
+        if data.get('all'):
+            is_active_val = "TRUE" if is_postgres() else "1"
+            rows = db.execute_query(
+                f"SELECT DISTINCT student_id FROM certificates WHERE is_active = {is_active_val}",
+                fetch_all=True
+            )
+            student_ids = [row['student_id'] for row in rows]
+        else:
+            try:
+                student_ids = [int(student_id) for student_id in data.get('studentIds', [])]
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Student IDs must be integers'}), 400
+        
+        if not student_ids:
+            return jsonify({'error': 'No students to regenerate certificates for'}), 400
+        
+        base_domain = os.environ.get('APP_DOMAIN', request.host_url.rstrip('/'))
+        job_id = enqueue(
+            'regenerate_certificates',
+            student_ids,
+            payload={'base_domain': base_domain},
+            created_by_user_id=session.get('user_id')
+        )
+        
+        return jsonify({
+            'message': f'Certificate regeneration queued for {len(set(student_ids))} student(s)',
+            'job_id': job_id,
+            'status_url': url_for('admin.get_job_status', job_id=job_id)
+        }), 202
+        
+    except Exception as e:
+        print(f"❌ Error queueing certificate regeneration: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @admin_bp.route('/download/certificate/<string:cert_id>', methods=['GET'])
 @require_admin_auth
 def download_certificate_admin(cert_id):
@@ -1456,6 +1878,7 @@ def delete_certificate(cert_id):
             f"UPDATE certificates SET is_active = {is_inactive_val} WHERE id = ?",
             (cert_id,)
         )
+        invalidate_certificates([cert['certificate_unique_id']])
         
         # Log audit trail
         db.execute_query("""
@@ -1503,56 +1926,16 @@ def get_recruitment_stats():
 @admin_bp.route('/api/admin/recruitment/summary', methods=['GET'])
 @require_admin_auth
 def get_recruitment_summary():
-    """Get overall recruitment summary"""
+    """Get overall recruitment summary from the per-HR rollup (one row per HR)"""
     try:
-        total_assignments = db.execute_query(
-            'SELECT COUNT(DISTINCT student_id) as count FROM recruitment_status',
-            fetch_one=True
-        )
-        
-        shortlisted = db.execute_query(
-            "SELECT COUNT(*) as count FROM recruitment_status WHERE status = 'shortlisted'",
-            fetch_one=True
-        )
-        
-        interviews = db.execute_query(
-            "SELECT COUNT(*) as count FROM recruitment_status WHERE status = 'interview_scheduled'",
-            fetch_one=True
-        )
-        
-        selected = db.execute_query(
-            "SELECT COUNT(*) as count FROM recruitment_status WHERE status = 'selected'",
-            fetch_one=True
-        )
-        
-        rejected = db.execute_query(
-            "SELECT COUNT(*) as count FROM recruitment_status WHERE status = 'rejected'",
-            fetch_one=True
-        )
-        
-        # Get breakdown by HR
-        by_hr = db.execute_query("""
-            SELECT 
-                h.id,
-                h.full_name,
-                h.company_name,
-                COUNT(r.id) as total_actions,
-                SUM(CASE WHEN r.status = 'shortlisted' THEN 1 ELSE 0 END) as shortlisted_count,
-                SUM(CASE WHEN r.status = 'interview_scheduled' THEN 1 ELSE 0 END) as interview_count,
-                SUM(CASE WHEN r.status = 'selected' THEN 1 ELSE 0 END) as selected_count,
-                SUM(CASE WHEN r.status = 'rejected' THEN 1 ELSE 0 END) as rejected_count
-            FROM hrs h
-            LEFT JOIN recruitment_status r ON h.id = r.hr_id
-            GROUP BY h.id
-            ORDER BY total_actions DESC
-        """, fetch_all=True)
+        totals, by_hr = recruitment_funnel()
         
         return jsonify({
-            'total_students_in_pipeline': total_assignments['count'] if total_assignments else 0,
-            'shortlisted': shortlisted['count'] if shortlisted else 0,
-            'interviews_scheduled': interviews['count'] if interviews else 0,
-            'selected': selected['count'] if selected else 0,
-            'rejected': rejected['count'] if rejected else 0,
+            'total_students_in_pipeline': totals['pipeline_students'],
+            'shortlisted': totals['shortlisted_count'],
+            'interviews_scheduled': totals['interview_count'],
+            'selected': totals['selected_count'],
+            'rejected': totals['rejected_count'],
             'by_hr': by_hr
         }), 200
     except Exception as e:
@@ -1560,6 +1943,22 @@ def get_recruitment_summary():
         return jsonify({'error': str(e)}), 500
 
 
+@admin_bp.route('/api/admin/recruitment/reconcile', methods=['POST'])
+@require_admin_auth
+def reconcile_recruitment():
+    """Queue a rebuild of the recruitment rollup counters; progress at /api/admin/jobs/<job_id>"""
+    try:
+        job_id = enqueue('reconcile_recruitment_rollup', ['all'], created_by_user_id=session.get('user_id'))
+        return jsonify({
+            'message': 'Recruitment counter reconciliation queued',
+            'job_id': job_id,
+            'status_url': url_for('admin.get_job_status', job_id=job_id)
+        }), 202
+    except Exception as e:
+        print(f"Error queueing recruitment reconciliation: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @admin_bp.route('/api/admin/recruitment/filter', methods=['GET'])
 @require_admin_auth
 def filter_recruitment():
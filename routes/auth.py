@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify, session, redirect, url_for, rende
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 from database import db, get_db_type, is_postgres
+from search import index_students
 from utils import generate_otp, send_otp_email, send_registration_confirmation_email, sanitize_input, generate_wapl_id, debug_gmail_connection
 import secrets
 
@@ -40,6 +41,8 @@ def register():
         
         if not domain_ids or len(domain_ids) == 0:
             return jsonify({'error': 'Please select at least one domain'}), 400
+        # A domain picked twice would hit UNIQUE(student_id, domain_id) on insert
+        domain_ids = list(dict.fromkeys(domain_ids))
         
         if len(password) < 6:
             return jsonify({'error': 'Password must be at least 6 characters'}), 400
@@ -124,7 +127,7 @@ def register():
             (user_id, otp_code, 'registration', expires_at)
         )
         
-        # Send OTP email via Gmail
+        # Queue OTP email; it is sent once the account has committed
         send_otp_email(email, otp_code, full_name)
         
         print(f"🔐 OTP for {email}: {otp_code}")  # Console log for testing
@@ -220,11 +223,13 @@ def verify_otp():
                     (student_id, domain_id)
                 )
             
+            index_students([student_id])
+            
             # Get user email
             email = registration_data.get('email', '')
             full_name = registration_data.get('full_name', '')
             
-            # Send confirmation email via Gmail
+            # Queue confirmation email; it commits together with the student, domains and OTP state
             if email:
                 send_registration_confirmation_email(email, full_name, wapl_id)
             
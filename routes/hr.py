@@ -1,7 +1,11 @@
 from flask import Blueprint, request, jsonify, session, redirect, url_for, send_file
 from datetime import datetime
 from database import db, get_db_type, get_agg_func, is_postgres
-from utils import sanitize_input, generate_certificate_id, generate_qr_code, generate_certificate_pdf
+from utils import sanitize_input, generate_certificate_id, generate_certificate_pdf, certificate_verify_url, certificate_content_hash, encode_cursor, decode_cursor
+from tasks import reusable_certificates, certificate_pdf_url
+from recruitment import upsert_recruitment_status, hr_recruitment_counters, RECRUITMENT_STATUSES
+from skills import parse_skill_terms, skills_condition
+from search import search_students, search_results, search_terms, SEARCH_PAGE_SIZE, SEARCH_PAGE_MAX
 from storage import Storage
 import json
 import os
@@ -21,9 +25,15 @@ def require_hr_auth(f):
     wrapper.__name__ = f.__name__
     return wrapper
 
+HR_STUDENTS_PAGE_MAX = 200
+
 @hr_bp.route('/api/hr/students', methods=['GET'])
 @require_hr_auth
 def get_students():
+    """
+    Students assigned to this HR with their recruitment status, in one query.
+    Pass limit (and the returned next_cursor) to page through them by name.
+    """
     try:
         user_id = session['user_id']
         
@@ -38,39 +48,62 @@ def get_students():
             return jsonify({'error': 'HR profile not found'}), 404
         
         hr_id = hr['id']
-        
-        # Get assigned students
-        students = db.execute_query(
-            '''SELECT s.*, d.domain_name, u.email 
+        paginated = 'limit' in request.args or 'cursor' in request.args
+        
+        try:
+            limit = max(1, min(int(request.args.get('limit', 50)), HR_STUDENTS_PAGE_MAX))
+            cursor = request.args.get('cursor')
+            position = decode_cursor(cursor, 2) if cursor else None
+        except ValueError as e:
+            return jsonify({'error': f'Invalid parameter: {e}'}), 400
+        
+        # Assigned students joined with this HR's recruitment status
+        query = '''SELECT s.*, d.domain_name, u.email,
+                      r.status as recruitment_status, r.notes as recruitment_notes
                FROM students s
                LEFT JOIN domains d ON s.domain_id = d.id
                LEFT JOIN users u ON s.user_id = u.id
-               WHERE s.assigned_hr_id = ? AND s.account_status = 'active'
-               ORDER BY s.full_name''',
-            (hr_id,),
-            fetch_all=True
-        )
+               LEFT JOIN recruitment_status r ON r.student_id = s.id AND r.hr_id = ?
+               WHERE s.assigned_hr_id = ? AND s.account_status = 'active' '''
+        params = [hr_id, hr_id]
+        
+        if position:
+            query += " AND (s.full_name, s.id) > (?, ?)"
+            params.extend([str(position[0]), int(position[1])])
+        
+        query += " ORDER BY s.full_name, s.id"
         
-        # Parse JSON fields and get recruitment status
+        if paginated:
+            query += " LIMIT ?"
+            params.append(limit + 1)
+        
+        students = db.execute_query(query, tuple(params), fetch_all=True)
+        
+        has_more = paginated and len(students) > limit
+        if paginated:
+            students = students[:limit]
+        
+        # Parse JSON fields
         result = []
         for student in students:
             student_dict = dict(student)
             student_dict['education_details'] = json.loads(student['education_details']) if student['education_details'] else []
             student_dict['skills'] = json.loads(student['skills']) if student['skills'] else []
             student_dict['projects'] = json.loads(student['projects']) if student['projects'] else []
-            
-            # Get recruitment status
-            status = db.execute_query(
-                'SELECT status, notes FROM recruitment_status WHERE student_id = ? AND hr_id = ?',
-                (student['id'], hr_id),
-                fetch_one=True
-            )
-            student_dict['recruitment_status'] = status['status'] if status else 'viewed'
-            student_dict['recruitment_notes'] = status['notes'] if status else ''
+            student_dict['recruitment_status'] = student['recruitment_status'] or 'viewed'
+            student_dict['recruitment_notes'] = student['recruitment_notes'] or ''
             
             result.append(student_dict)
         
-        return jsonify(result), 200
+        if not paginated:
+            return jsonify(result), 200
+        
+        return jsonify({
+            'students': result,
+            'limit': limit,
+            'has_more': has_more,
+            'next_cursor': encode_cursor(students[-1]['full_name'], students[-1]['id']) if has_more else None
+        }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -131,10 +164,21 @@ def get_student(student_id):
 @hr_bp.route('/api/hr/students/filter', methods=['GET'])
 @require_hr_auth
 def filter_students():
+    """
+    Assigned students filtered by skills and/or domain.
+
+    skills is a comma-separated list matched against the normalized
+    student_skills index; match=all (default) keeps students with every skill,
+    match=any with at least one. domain_id filters through student_domains.
+    """
     try:
         user_id = session['user_id']
         domain_id = request.args.get('domain_id')
-        skills_filter = request.args.get('skills', '')
+        skill_terms = parse_skill_terms(request.args.get('skills', ''))
+        match = request.args.get('match', 'all')
+        
+        if match not in ('all', 'any'):
+            return jsonify({'error': 'match must be all or any'}), 400
         
         # Get HR ID
         hr = db.execute_query(
@@ -149,29 +193,43 @@ def filter_students():
         hr_id = hr['id']
         
         # Build query
-        query = '''SELECT s.*, d.domain_name, u.email 
+        query = '''SELECT s.*, u.email 
                    FROM students s
-                   LEFT JOIN domains d ON s.domain_id = d.id
                    LEFT JOIN users u ON s.user_id = u.id
                WHERE s.assigned_hr_id = ? AND s.account_status = 'active' '''
         params = [hr_id]
         
         if domain_id:
-            query += ' AND s.domain_id = ?'
+            try:
+                domain_id = int(domain_id)
+            except ValueError:
+                return jsonify({'error': 'Invalid domain_id'}), 400
+            query += ' AND EXISTS (SELECT 1 FROM student_domains sd WHERE sd.student_id = s.id AND sd.domain_id = ?)'
             params.append(domain_id)
         
-        if skills_filter:
-            query += ' AND s.skills LIKE ?'
-            params.append(f'%{skills_filter}%')
+        if skill_terms:
+            condition, condition_params = skills_condition(skill_terms, match)
+            query += f' AND {condition}'
+            params.extend(condition_params)
         
         query += ' ORDER BY s.full_name'
         
         students = db.execute_query(query, tuple(params), fetch_all=True)
         
+        domains = db.batch_load(
+            """SELECT sd.student_id, d.domain_name FROM student_domains sd
+               JOIN domains d ON sd.domain_id = d.id
+               WHERE sd.student_id IN ({ids})
+               ORDER BY d.domain_name""",
+            [student['id'] for student in students],
+            key='student_id'
+        )
+        
         # Parse JSON fields
         result = []
         for student in students:
             student_dict = dict(student)
+            student_dict['domain_name'] = ', '.join(row['domain_name'] for row in domains.get(student['id'], [])) or None
             student_dict['education_details'] = json.loads(student['education_details']) if student['education_details'] else []
             student_dict['skills'] = json.loads(student['skills']) if student['skills'] else []
             student_dict['projects'] = json.loads(student['projects']) if student['projects'] else []
@@ -182,6 +240,49 @@ def filter_students():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@hr_bp.route('/api/hr/students/search', methods=['GET'])
+@require_hr_auth
+def search_students_route():
+    """Ranked full-text search over this HR's active assigned students; page with limit and next_cursor"""
+    try:
+        user_id = session['user_id']
+        text = request.args.get('q', '')
+        
+        try:
+            limit = max(1, min(int(request.args.get('limit', SEARCH_PAGE_SIZE)), SEARCH_PAGE_MAX))
+            cursor = request.args.get('cursor')
+            offset = max(0, int(decode_cursor(cursor, 1)[0])) if cursor else 0
+        except ValueError as e:
+            return jsonify({'error': f'Invalid parameter: {e}'}), 400
+        
+        if not search_terms(text):
+            return jsonify({'error': 'Search text (q) required'}), 400
+        
+        # Get HR ID
+        hr = db.execute_query(
+            'SELECT id FROM hrs WHERE user_id = ?',
+            (user_id,),
+            fetch_one=True
+        )
+        
+        if not hr:
+            return jsonify({'error': 'HR profile not found'}), 404
+        
+        hits, has_more = search_students(
+            text, limit, offset,
+            " AND s.assigned_hr_id = ? AND s.account_status = 'active'", [hr['id']]
+        )
+        
+        return jsonify({
+            'students': search_results(hits),
+            'limit': limit,
+            'has_more': has_more,
+            'next_cursor': encode_cursor(offset + limit) if has_more else None
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @hr_bp.route('/api/hr/student/<int:student_id>/resume/download', methods=['GET'])
 @require_hr_auth
 def download_student_resume(student_id):
@@ -278,8 +379,7 @@ def update_student_recruitment_status(student_id):
         status = sanitize_input(data.get('status', ''))
         notes = sanitize_input(data.get('notes', ''))
         
-        valid_statuses = ['viewed', 'shortlisted', 'interview_scheduled', 'selected', 'rejected']
-        if status not in valid_statuses:
+        if status not in RECRUITMENT_STATUSES:
             return jsonify({'error': 'Invalid status'}), 400
         
         # Get HR ID
@@ -304,28 +404,7 @@ def update_student_recruitment_status(student_id):
         if not student:
             return jsonify({'error': 'Student not found or not assigned to you'}), 404
         
-        # Check if status record exists
-        existing = db.execute_query(
-            'SELECT id FROM recruitment_status WHERE student_id = ? AND hr_id = ?',
-            (student_id, hr_id),
-            fetch_one=True
-        )
-        
-        if existing:
-            # Update existing record
-            db.execute_query(
-                '''UPDATE recruitment_status 
-                   SET status = ?, notes = ?, updated_at = CURRENT_TIMESTAMP
-                   WHERE student_id = ? AND hr_id = ?''',
-                (status, notes, student_id, hr_id)
-            )
-        else:
-            # Create new record
-            db.execute_query(
-                '''INSERT INTO recruitment_status (student_id, hr_id, status, notes)
-                   VALUES (?, ?, ?, ?)''',
-                (student_id, hr_id, status, notes)
-            )
+        upsert_recruitment_status(student_id, hr_id, status, notes)
         
         return jsonify({'message': 'Status updated successfully'}), 200
         
@@ -363,27 +442,8 @@ def shortlist_student(student_id):
         if not student:
             return jsonify({'error': 'Student not found or not assigned to you'}), 404
         
-        # Update or create recruitment status
-        existing = db.execute_query(
-            'SELECT id FROM recruitment_status WHERE student_id = ? AND hr_id = ?',
-            (student_id, hr_id),
-            fetch_one=True
-        )
-        
-        if existing:
-            db.execute_query(
-                '''UPDATE recruitment_status 
-                   SET status = ?, notes = ?, updated_at = CURRENT_TIMESTAMP
-                   WHERE student_id = ? AND hr_id = ?''',
-                (
-'shortlisted', notes, student_id, hr_id)
-            )
-        else:
-            db.execute_query(
-                '''INSERT INTO recruitment_status (student_id, hr_id, status, notes)
-                   VALUES (?, ?, ?, ?)''',
-                (student_id, hr_id, 'shortlisted', notes)
-            )
+        # Update or create recruitment status (and the HR's funnel counters)
+        upsert_recruitment_status(student_id, hr_id, 'shortlisted', notes)
         
         print(f"✅ Student {student_id} shortlisted by HR {hr_id}")
         return jsonify({'message': 'Student shortlisted successfully'}), 200
@@ -436,25 +496,7 @@ def schedule_interview(student_id):
         if notes:
             interview_details += f". Notes: {notes}"
         
-        existing = db.execute_query(
-            'SELECT id FROM recruitment_status WHERE student_id = ? AND hr_id = ?',
-            (student_id, hr_id),
-            fetch_one=True
-        )
-        
-        if existing:
-            db.execute_query(
-                '''UPDATE recruitment_status 
-                   SET status = ?, notes = ?, updated_at = CURRENT_TIMESTAMP
-                   WHERE student_id = ? AND hr_id = ?''',
-                ('interview_scheduled', interview_details, student_id, hr_id)
-            )
-        else:
-            db.execute_query(
-                '''INSERT INTO recruitment_status (student_id, hr_id, status, notes)
-                   VALUES (?, ?, ?, ?)''',
-                (student_id, hr_id, 'interview_scheduled', interview_details)
-            )
+        upsert_recruitment_status(student_id, hr_id, 'interview_scheduled', interview_details)
         
         print(f"✅ Interview scheduled for student {student_id} by HR {hr_id}")
         return jsonify({'message': 'Interview scheduled successfully'}), 200
@@ -499,25 +541,7 @@ def reject_student(student_id):
         if reason:
             rejection_notes += f": {reason}"
         
-        existing = db.execute_query(
-            'SELECT id FROM recruitment_status WHERE student_id = ? AND hr_id = ?',
-            (student_id, hr_id),
-            fetch_one=True
-        )
-        
-        if existing:
-            db.execute_query(
-                '''UPDATE recruitment_status 
-                   SET status = ?, notes = ?, updated_at = CURRENT_TIMESTAMP
-                   WHERE student_id = ? AND hr_id = ?''',
-                ('rejected', rejection_notes, student_id, hr_id)
-            )
-        else:
-            db.execute_query(
-                '''INSERT INTO recruitment_status (student_id, hr_id, status, notes)
-                   VALUES (?, ?, ?, ?)''',
-                (student_id, hr_id, 'rejected', rejection_notes)
-            )
+        upsert_recruitment_status(student_id, hr_id, 'rejected', rejection_notes)
         
         print(f"❌ Student {student_id} rejected by HR {hr_id}")
         return jsonify({'message': 'Student rejected successfully'}), 200
@@ -562,25 +586,7 @@ def select_student(student_id):
         if offer_notes:
             selection_notes += f". Offer details: {offer_notes}"
         
-        existing = db.execute_query(
-            'SELECT id FROM recruitment_status WHERE student_id = ? AND hr_id = ?',
-            (student_id, hr_id),
-            fetch_one=True
-        )
-        
-        if existing:
-            db.execute_query(
-                '''UPDATE recruitment_status 
-                   SET status = ?, notes = ?, updated_at = CURRENT_TIMESTAMP
-                   WHERE student_id = ? AND hr_id = ?''',
-                ('selected', selection_notes, student_id, hr_id)
-            )
-        else:
-            db.execute_query(
-                '''INSERT INTO recruitment_status (student_id, hr_id, status, notes)
-                   VALUES (?, ?, ?, ?)''',
-                (student_id, hr_id, 'selected', selection_notes)
-            )
+        upsert_recruitment_status(student_id, hr_id, 'selected', selection_notes)
         
         print(f"✅ Student {student_id} selected by HR {hr_id}")
         return jsonify({'message': 'Student selected successfully'}), 200
@@ -592,67 +598,20 @@ def select_student(student_id):
 @hr_bp.route('/api/hr/recruitment-summary', methods=['GET'])
 @require_hr_auth
 def get_recruitment_summary():
-    """Get recruitment summary for HR"""
+    """Get recruitment summary for HR - one read of the HR's recruitment_rollup row"""
     try:
-        user_id = session['user_id']
-        
-        # Get HR ID
-        hr = db.execute_query(
-            'SELECT id FROM hrs WHERE user_id = ?',
-            (user_id,),
-            fetch_one=True
-        )
+        counters = hr_recruitment_counters(session['user_id'])
         
-        if not hr:
+        if not counters:
             return jsonify({'error': 'HR profile not found'}), 404
         
-        hr_id = hr['id']
-        
-        # Get recruitment statistics
-        total = db.execute_query(
-            'SELECT COUNT(*) as count FROM students WHERE assigned_hr_id = ? AND account_status = "active"',
-            (hr_id,),
-            fetch_one=True
-        )
-        
-        viewed = db.execute_query(
-            '''SELECT COUNT(*) as count FROM recruitment_status 
-               WHERE hr_id = ? AND status IN ('viewed', 'shortlisted', 'interview_scheduled', 'selected', 'rejected')''',
-            (hr_id,),
-            fetch_one=True
-        )
-        
-        shortlisted = db.execute_query(
-            "SELECT COUNT(*) as count FROM recruitment_status WHERE hr_id = ? AND status = 'shortlisted'",
-            (hr_id,),
-            fetch_one=True
-        )
-        
-        interviews = db.execute_query(
-            "SELECT COUNT(*) as count FROM recruitment_status WHERE hr_id = ? AND status = 'interview_scheduled'",
-            (hr_id,),
-            fetch_one=True
-        )
-        
-        selected = db.execute_query(
-            "SELECT COUNT(*) as count FROM recruitment_status WHERE hr_id = ? AND status = 'selected'",
-            (hr_id,),
-            fetch_one=True
-        )
-        
-        rejected = db.execute_query(
-            "SELECT COUNT(*) as count FROM recruitment_status WHERE hr_id = ? AND status = 'rejected'",
-            (hr_id,),
-            fetch_one=True
-        )
-        
         return jsonify({
-            'total_assigned': total['count'] if total else 0,
-            'total_viewed': viewed['count'] if viewed else 0,
-            'total_shortlisted': shortlisted['count'] if shortlisted else 0,
-            'total_interviews': interviews['count'] if interviews else 0,
-            'total_selected': selected['count'] if selected else 0,
-            'total_rejected': rejected['count'] if rejected else 0
+            'total_assigned': counters['assigned_count'],
+            'total_viewed': counters['total_actions'],
+            'total_shortlisted': counters['shortlisted_count'],
+            'total_interviews': counters['interview_count'],
+            'total_selected': counters['selected_count'],
+            'total_rejected': counters['rejected_count']
         }), 200
         
     except Exception as e:
@@ -747,30 +706,46 @@ def issue_certificate(student_id):
         if not student:
             return jsonify({'error': 'Student not found or not assigned to you'}), 404
         
+        # Students pick domains through student_domains; students.domain_id is legacy
+        domains = db.execute_query(
+            '''SELECT d.domain_name FROM student_domains sd
+               JOIN domains d ON sd.domain_id = d.id
+               WHERE sd.student_id = ?
+               ORDER BY d.domain_name''',
+            (student_id,),
+            fetch_all=True
+        )
+        domain_name = ', '.join(row['domain_name'] for row in domains) or student['domain_name']
+        
         # Validate certificate data
         certificate_text = sanitize_input(data.get('certificate_text', ''))
         if not certificate_text:
             return jsonify({'error': 'Certificate text is required'}), 400
         
-        # Generate certificate
-        cert_unique_id = generate_certificate_id()
         issue_date = datetime.now()
         expiry_date = issue_date.replace(year=issue_date.year + 1)
+        issue_date_str = issue_date.strftime('%Y-%m-%d')
+        expiry_date_str = expiry_date.strftime('%Y-%m-%d')
+        content_hash = certificate_content_hash(
+            request.host_url, student['full_name'], student['wapl_id'], domain_name,
+            issue_date_str, expiry_date_str, hr_name, certificate_text
+        )
+        
+        # Re-issuing an identical certificate returns the active one instead of rendering again
+        reusable = reusable_certificates({student_id: content_hash}).get(student_id)
+        if reusable:
+            return jsonify({
+                'message': 'Certificate is already up to date',
+                'certificate_id': reusable['certificate_unique_id'],
+                'pdf_url': certificate_pdf_url(reusable['pdf_path']),
+                'reused': True
+            }), 200
         
-        # Generate QR code
-        qr_data = f"{request.host_url}verify-certificate/{cert_unique_id}"
-        qr_subfolder = 'uploads/qr_codes'
-        qr_filename = f'{cert_unique_id}.png'
-        
-        # Local path for generation (ensure dir exists)
-        local_qr_dir = os.path.join(os.getcwd(), qr_subfolder)
-        os.makedirs(local_qr_dir, exist_ok=True)
-        local_qr_path = os.path.join(local_qr_dir, qr_filename)
-        
-        generate_qr_code(qr_data, local_qr_path)
+        # Generate certificate
+        cert_unique_id = generate_certificate_id()
         
-        # Upload QR to Storage
-        qr_code_path = Storage.upload_local_file(local_qr_path, subfolder='qr_codes')
+        # QR code is drawn into the PDF from its data; no PNG is written
+        qr_data = certificate_verify_url(request.host_url, cert_unique_id)
         
         # Generate PDF certificate with custom text and HR name
         cert_subfolder = 'uploads/certificates'
@@ -784,13 +759,14 @@ def issue_certificate(student_id):
         generate_certificate_pdf(
             student['full_name'],
             student['wapl_id'],
-            student['domain_name'],
-            issue_date.strftime('%Y-%m-%d'),
-            expiry_date.strftime('%Y-%m-%d'),
-            local_qr_path, # Use local path for embedding in PDF
+            domain_name,
+            issue_date_str,
+            expiry_date_str,
+            None,
             local_cert_path,
             hr_name=hr_name,
-            certificate_text=certificate_text
+            certificate_text=certificate_text,
+            qr_data=qr_data
         )
         
         # Upload Certificate to Storage
@@ -799,16 +775,17 @@ def issue_certificate(student_id):
         # Create certificate record
         db.execute_query(
             '''INSERT INTO certificates 
-               (student_id, certificate_unique_id, issue_date, expiry_date, qr_code, pdf_path, issued_by_hr_id)
-               VALUES (?, ?, ?, ?, ?, ?, ?)''',
+               (student_id, certificate_unique_id, issue_date, expiry_date, qr_code, pdf_path, issued_by_hr_id, content_hash)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
             (
                 student_id,
                 cert_unique_id,
                 issue_date,
                 expiry_date,
-                qr_code_path, # URL or relative path
+                qr_data,     # Verification URL encoded in the QR code
                 pdf_path,    # URL or relative path
-                hr_id
+                hr_id,
+                content_hash
             )
         )
         
@@ -1,47 +1,51 @@
-from flask import Blueprint, request, jsonify, render_template
-from datetime import datetime
-from database import db, is_postgres
+from flask import Blueprint, request, jsonify, render_template, make_response
+from verification import get_verification
 
 public_bp = Blueprint('public', __name__)
 
+
+def _cacheable(response, result):
+    """Let browsers and CDNs reuse the verification result for as long as our cache would"""
+    response.set_etag(result['etag'])
+    response.cache_control.public = True
+    response.cache_control.max_age = result['max_age']
+    return response
+
+
+def _not_modified(result):
+    """304 for a client that already holds this exact result; None otherwise"""
+    if result['etag'] in request.if_none_match:
+        return _cacheable(make_response('', 304), result)
+    return None
+
+
 @public_bp.route('/verify-certificate/<cert_id>', methods=['GET'])
 def verify_certificate(cert_id):
     try:
-        # Get certificate
-        certificate = db.execute_query(
-            '''SELECT c.*, s.full_name, s.wapl_id, d.domain_name
-               FROM certificates c
-               LEFT JOIN students s ON c.student_id = s.id
-               LEFT JOIN domains d ON s.domain_id = d.id
-               WHERE c.certificate_unique_id = ?''',
-            (cert_id,),
-            fetch_one=True
-        )
+        result = get_verification(cert_id)
+        not_modified = _not_modified(result)
+        if not_modified:
+            return not_modified
         
-        if not certificate:
-            return render_template('verify_certificate.html', 
+        if result['status'] == 'not_found':
+            page = render_template('verify_certificate.html', 
                                  valid=False, 
                                  message='Certificate not found')
-        
-        cert_dict = dict(certificate)
-        is_expired = datetime.fromisoformat(str(cert_dict['expiry_date'])) < datetime.now()
-        # Handle both boolean (PostgreSQL) and integer (SQLite) for is_active
-        is_active = cert_dict['is_active'] in (True, 1)
-        
-        if not is_active:
-            return render_template('verify_certificate.html',
+        elif result['status'] == 'revoked':
+            page = render_template('verify_certificate.html',
                                  valid=False,
                                  message='Certificate has been revoked')
-        
-        if is_expired:
-            return render_template('verify_certificate.html',
+        elif result['status'] == 'expired':
+            page = render_template('verify_certificate.html',
                                  valid=False,
                                  message='Certificate has expired',
-                                 certificate=cert_dict)
+                                 certificate=result['certificate'])
+        else:
+            page = render_template('verify_certificate.html',
+                                 valid=True,
+                                 certificate=result['certificate'])
         
-        return render_template('verify_certificate.html',
-                             valid=True,
-                             certificate=cert_dict)
+        return _cacheable(make_response(page), result)
         
     except Exception as e:
         return render_template('verify_certificate.html',
@@ -51,36 +55,24 @@ def verify_certificate(cert_id):
 @public_bp.route('/api/verify-certificate/<cert_id>', methods=['GET'])
 def verify_certificate_api(cert_id):
     try:
-        certificate = db.execute_query(
-            '''SELECT c.*, s.full_name, s.wapl_id, d.domain_name
-               FROM certificates c
-               LEFT JOIN students s ON c.student_id = s.id
-               LEFT JOIN domains d ON s.domain_id = d.id
-               WHERE c.certificate_unique_id = ?''',
-            (cert_id,),
-            fetch_one=True
-        )
-        
-        if not certificate:
-            return jsonify({'valid': False, 'message': 'Certificate not found'}), 404
-        
-        cert_dict = dict(certificate)
-        # Handle datetime parsing for both PostgreSQL and SQLite
-        expiry_date = cert_dict['expiry_date']
-        if isinstance(expiry_date, str):
-            expiry_date = datetime.fromisoformat(expiry_date.replace('Z', '+00:00'))
-        is_expired = expiry_date < datetime.now() if expiry_date else False
-        # Handle both boolean (PostgreSQL) and integer (SQLite) for is_active
-        is_active = cert_dict['is_active'] in (True, 1)
+        result = get_verification(cert_id)
+        not_modified = _not_modified(result)
+        if not_modified:
+            return not_modified
         
-        if not is_active:
-            return jsonify({'valid': False, 'message': 'Certificate has been revoked'}), 400
+        if result['status'] == 'not_found':
+            response = make_response(jsonify({'valid': False, 'message': 'Certificate not found'}), 404)
+        elif result['status'] == 'revoked':
+            response = make_response(jsonify({'valid': False, 'message': 'Certificate has been revoked'}), 400)
+        else:
+            is_expired = result['status'] == 'expired'
+            response = make_response(jsonify({
+                'valid': not is_expired,
+                'expired': is_expired,
+                'certificate': result['certificate']
+            }), 200)
         
-        return jsonify({
-            'valid': not is_expired,
-            'expired': is_expired,
-            'certificate': cert_dict
-        }), 200
+        return _cacheable(response, result)
         
     except Exception as e:
         return jsonify({'valid': False, 'message': str(e)}), 500
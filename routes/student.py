@@ -8,6 +8,8 @@ from utils import (
     generate_certificate_pdf, send_email_simulation, sanitize_input,
     allowed_file, save_uploaded_file
 )
+from skills import set_student_skills
+from search import index_students
 from storage import Storage
 import os
 import json
@@ -204,13 +206,15 @@ def student_register():
                 # Assign domains (multiple domains)
                 for domain_id in reg_data['domain_ids']:
                     try:
-                        db.execute_query(
-                            "INSERT INTO student_domains (student_id, domain_id) VALUES (?, ?)",
-                            (student_id, domain_id)
-                        )
+                        with db.savepoint():
+                            db.execute_query(
+                                "INSERT INTO student_domains (student_id, domain_id) VALUES (?, ?)",
+                                (student_id, domain_id)
+                            )
                     except (sqlite3.IntegrityError, psycopg2.IntegrityError) as e:
                         print(f"Domain assignment IntegrityError: {e}")
                         # Continue assigning other domains, but skip duplicates
+                index_students([student_id])
                 # Clear registration data from session
                 session.pop('registration_data', None)
                 # Print success message to console
@@ -366,16 +370,28 @@ def update_profile():
             query = f"UPDATE students SET {', '.join(updates)} WHERE user_id = ?"
             db.execute_query(query, tuple(params))
         
-        # Handle domain updates (multiple domains)
-        if 'domain_ids' in data:
-            domain_ids = data['domain_ids']
-            
+        student = None
+        indexed_fields = ('full_name', 'phone', 'education_details', 'skills', 'projects')
+        reindex = any(field in data for field in indexed_fields)
+        if reindex or 'domain_ids' in data:
             # Get student ID
             student = db.execute_query(
                 'SELECT id FROM students WHERE user_id = ?',
                 (user_id,),
                 fetch_one=True
             )
+        
+        # Keep the normalized skills index (student_skills) in step with the profile
+        if 'skills' in data and student:
+            set_student_skills(student['id'], data['skills'])
+        
+        # Refresh the student's full-text search document in the same transaction
+        if reindex and student:
+            index_students([student['id']])
+        
+        # Handle domain updates (multiple domains)
+        if 'domain_ids' in data:
+            domain_ids = data['domain_ids']
             
             if student:
                 # Delete existing domain associations
@@ -0,0 +1,206 @@
+"""
+Full-text search over student profiles.
+
+The index holds one document per student built from full_name, wapl_id, email,
+phone, skills, projects and education_details. On SQLite it is an FTS5 table
+(``student_search``, rowid = student id) ranked with bm25; on PostgreSQL a
+``student_search`` table with a weighted ``tsvector`` and a GIN index, ranked
+with ts_rank_cd. Every search term is a prefix match and all terms must match.
+
+Queries are split into word terms with ``_WORD``. PostgreSQL's parser would keep
+an email or a phone number like 555-0100 as tokens no query term can match, so
+the tsvector is built from text already split the same way.
+
+Writers call ``index_students`` / ``remove_students`` in the same transaction
+as the profile change, so the index never lags behind a committed write.
+"""
+
+import re
+import json
+from database import db, is_postgres
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_PAGE_MAX = 100
+_CHUNK = 500
+
+# Indexed fields in index column order, with their weight: bm25 column weight (SQLite) / tsvector label (PostgreSQL)
+SEARCH_FIELDS = (
+    ('full_name', 10.0, 'A'),
+    ('wapl_id', 10.0, 'A'),
+    ('email', 5.0, 'B'),
+    ('phone', 5.0, 'B'),
+    ('skills', 3.0, 'B'),
+    ('projects', 1.0, 'C'),
+    ('education', 1.0, 'C'),
+)
+_COLUMNS = [name for name, _, _ in SEARCH_FIELDS]
+# Letters and digits; '_' separates like every other symbol, as in FTS5's unicode61 tokenizer
+_WORD = re.compile(r'[^\W_]+')
+
+
+def _flatten(value):
+    """Text of a JSON profile field (lists/dicts of strings), space separated"""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return value
+    return _text(value)
+
+
+def _text(value):
+    if isinstance(value, dict):
+        return ' '.join(_text(item) for item in value.values() if item not in (None, ''))
+    if isinstance(value, (list, tuple)):
+        return ' '.join(_text(item) for item in value if item not in (None, ''))
+    return '' if value is None else str(value)
+
+
+def _documents(student_ids):
+    """{student_id: (field texts in SEARCH_FIELDS order)} for the students that exist"""
+    documents = {}
+    for start in range(0, len(student_ids), _CHUNK):
+        chunk = student_ids[start:start + _CHUNK]
+        placeholders = ','.join('?' * len(chunk))
+        rows = db.execute_query(f"""
+            SELECT s.id, s.full_name, s.wapl_id, u.email, s.phone, s.skills, s.projects, s.education_details
+            FROM students s
+            LEFT JOIN users u ON s.user_id = u.id
+            WHERE s.id IN ({placeholders})
+        """, tuple(chunk), fetch_all=True)
+        for row in rows:
+            documents[row['id']] = (
+                row['full_name'] or '',
+                row['wapl_id'] or '',
+                row['email'] or '',
+                row['phone'] or '',
+                _flatten(row['skills']),
+                _flatten(row['projects']),
+                _flatten(row['education_details']),
+            )
+    return documents
+
+
+def _words(text):
+    """``text`` as space-separated word terms, split the way search_terms splits a query"""
+    return ' '.join(_WORD.findall(text))
+
+
+def remove_students(student_ids):
+    """Drop students from the index"""
+    student_ids = list(dict.fromkeys(student_ids))
+    key = 'student_id' if is_postgres() else 'rowid'
+    for start in range(0, len(student_ids), _CHUNK):
+        chunk = student_ids[start:start + _CHUNK]
+        db.execute_query(
+            f"DELETE FROM student_search WHERE {key} IN ({','.join('?' * len(chunk))})",
+            tuple(chunk)
+        )
+
+
+def index_students(student_ids):
+    """(Re)index these students from their current rows; missing students are dropped"""
+    student_ids = list(dict.fromkeys(student_ids))
+    if not student_ids:
+        return
+    documents = _documents(student_ids)
+    remove_students(student_ids)
+    if not documents:
+        return
+
+    if is_postgres():
+        vector = ' || '.join(f"setweight(to_tsvector('simple', ?), '{label}')" for _, _, label in SEARCH_FIELDS)
+        db.execute_many(
+            f"INSERT INTO student_search (student_id, document) VALUES (?, {vector})",
+            [(student_id, *map(_words, fields)) for student_id, fields in documents.items()]
+        )
+    else:
+        db.execute_many(
+            f"INSERT INTO student_search (rowid, {', '.join(_COLUMNS)}) VALUES (?{', ?' * len(_COLUMNS)})",
+            [(student_id, *fields) for student_id, fields in documents.items()]
+        )
+
+
+def search_terms(text):
+    """Case-folded word terms of a search box string; punctuation only separates terms"""
+    return _WORD.findall((text or '').casefold())[:16]
+
+
+def match_expression(terms):
+    """Prefix-match-all query for the backend: FTS5 MATCH string or to_tsquery text"""
+    if is_postgres():
+        return ' & '.join(f"{term}:*" for term in terms)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def matching_condition(terms, student_column='s.id'):
+    """SQL condition (and params) keeping students whose document matches every term"""
+    if is_postgres():
+        return (f"{student_column} IN (SELECT student_id FROM student_search WHERE document @@ to_tsquery('simple', ?))",
+                [match_expression(terms)])
+    return (f"{student_column} IN (SELECT rowid FROM student_search WHERE student_search MATCH ?)",
+            [match_expression(terms)])
+
+
+def search_students(text, limit=SEARCH_PAGE_SIZE, offset=0, where='', params=()):
+    """
+    Ranked matches for ``text``: ([{'id', 'score'}], has_more), best first.
+
+    ``where``/``params`` narrow the results with extra conditions on students ``s``
+    (e.g. " AND s.assigned_hr_id = ?"). Scores are higher-is-better on both backends.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return [], False
+
+    if is_postgres():
+        query = f"""
+            SELECT s.id, ts_rank_cd(ss.document, q.query) as score
+            FROM student_search ss
+            JOIN students s ON s.id = ss.student_id
+            CROSS JOIN (SELECT to_tsquery('simple', ?) as query) q
+            WHERE ss.document @@ q.query {where}
+            ORDER BY score DESC, s.id
+            LIMIT ? OFFSET ?
+        """
+    else:
+        weights = ', '.join(str(weight) for _, weight, _ in SEARCH_FIELDS)
+        # bm25 is lower-is-better; negate so both backends sort the same way
+        query = f"""
+            SELECT s.id, -bm25(student_search, {weights}) as score
+            FROM student_search
+            JOIN students s ON s.id = student_search.rowid
+            WHERE student_search MATCH ? {where}
+            ORDER BY score DESC, s.id
+            LIMIT ? OFFSET ?
+        """
+
+    rows = db.execute_query(query, (match_expression(terms), *params, limit + 1, offset), fetch_all=True)
+    return [{'id': row['id'], 'score': float(row['score'])} for row in rows[:limit]], len(rows) > limit
+
+
+def search_results(hits):
+    """Profile rows for ``search_students`` hits, in rank order, with the score attached"""
+    if not hits:
+        return []
+    placeholders = ','.join('?' * len(hits))
+    rows = db.execute_query(f"""
+        SELECT s.id, s.wapl_id, s.full_name, s.phone, s.profile_pic, s.account_status,
+               s.assigned_hr_id, s.skills, u.email, h.full_name as assigned_hr_name
+        FROM students s
+        LEFT JOIN users u ON s.user_id = u.id
+        LEFT JOIN hrs h ON s.assigned_hr_id = h.id
+        WHERE s.id IN ({placeholders})
+    """, tuple(hit['id'] for hit in hits), fetch_all=True)
+    by_id = {row['id']: row for row in rows}
+
+    results = []
+    for hit in hits:
+        row = by_id.get(hit['id'])
+        if row is None:
+            continue
+        row = dict(row)
+        row['skills'] = json.loads(row['skills']) if row['skills'] else []
+        row['score'] = round(hit['score'], 4)
+        results.append(row)
+    return results
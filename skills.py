@@ -0,0 +1,65 @@
+"""
+Normalized student skills.
+
+``students.skills`` keeps the profile's JSON list as entered; ``student_skills``
+holds one case-folded token per (student, skill) so HR filters are index lookups
+instead of LIKE scans over every profile. A multi-word skill is stored whole and
+word by word ("Machine Learning" -> "machine learning", "machine", "learning").
+"""
+
+import re
+from database import db
+
+# Word separators inside a skill; keeps tokens like "c++", "c#" and "node.js" intact
+_SPLIT = re.compile(r"[\s,;/|()]+")
+
+
+def normalize_skill(skill):
+    """Case-folded skill with runs of whitespace collapsed"""
+    return ' '.join(str(skill).split()).casefold()
+
+
+def skill_tokens(skills):
+    """Distinct tokens for a list of skills (or a single skill string), in first-seen order"""
+    if isinstance(skills, str):
+        skills = [skills]
+    tokens = {}
+    for skill in skills or []:
+        phrase = normalize_skill(skill)
+        if not phrase:
+            continue
+        tokens[phrase] = None
+        for word in _SPLIT.split(phrase):
+            if word:
+                tokens[word] = None
+    return list(tokens)
+
+
+def parse_skill_terms(raw):
+    """Search terms from a comma-separated query string ("python, sql")"""
+    return list(dict.fromkeys(term for term in (normalize_skill(part) for part in raw.split(',')) if term))
+
+
+def set_student_skills(student_id, skills):
+    """Replace the student's skill tokens; runs in the caller's transaction"""
+    db.execute_query('DELETE FROM student_skills WHERE student_id = ?', (student_id,))
+    tokens = skill_tokens(skills)
+    if tokens:
+        db.execute_many(
+            'INSERT INTO student_skills (student_id, skill) VALUES (?, ?)',
+            [(student_id, token) for token in tokens]
+        )
+
+
+def skills_condition(terms, match='all', student_column='s.id'):
+    """
+    SQL condition (and its params) keeping students with all / any of ``terms``,
+    answered from the (skill, student_id) index.
+    """
+    placeholders = ','.join('?' * len(terms))
+    if match == 'any' or len(terms) == 1:
+        return (f"{student_column} IN (SELECT student_id FROM student_skills WHERE skill IN ({placeholders}))",
+                list(terms))
+    return (f"""{student_column} IN (SELECT student_id FROM student_skills WHERE skill IN ({placeholders})
+                GROUP BY student_id HAVING COUNT(*) = ?)""",
+            list(terms) + [len(terms)])
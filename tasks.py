@@ -0,0 +1,229 @@
+"""
+Background job handlers. Importing this module registers them with ``jobs``.
+
+Certificate handlers are batch handlers: they read a batch of students in a
+couple of queries, render every certificate in parallel on the process pool
+(utils.render_certificates) and hand back one commit step per student.
+"""
+
+import os
+import functools
+from datetime import datetime, timedelta
+from database import db, is_postgres
+from utils import generate_certificate_id, certificate_render_job, render_certificates, CERTIFICATE_RENDER_PROCESSES
+from jobs import register, JobItemError
+from recruitment import reconcile_recruitment_rollup
+from verification import invalidate_active_certificates
+
+
+# Students claimed per batch - enough to keep every renderer process busy
+CERTIFICATE_BATCH_SIZE = int(os.environ.get('CERTIFICATE_BATCH_SIZE', max(1, CERTIFICATE_RENDER_PROCESSES * 2)))
+
+
+def _load_students(student_ids):
+    """{student_id: student} with a display string of the student's domains"""
+    placeholders = ','.join('?' * len(student_ids))
+    students = db.execute_query(
+        f"SELECT id, full_name, wapl_id FROM students WHERE id IN ({placeholders})",
+        tuple(student_ids),
+        fetch_all=True
+    )
+    domains = db.batch_load(
+        """SELECT sd.student_id, d.domain_name FROM student_domains sd
+           JOIN domains d ON sd.domain_id = d.id
+           WHERE sd.student_id IN ({ids})
+           ORDER BY d.domain_name""",
+        student_ids,
+        key='student_id'
+    )
+
+    loaded = {}
+    for student in students:
+        names = [row['domain_name'] for row in domains.get(student['id'], [])]
+        student['domain_display'] = ', '.join(names) or 'General Training'
+        loaded[student['id']] = student
+    return loaded
+
+
+def _has_active_certificate(student_ids):
+    is_active_val = "TRUE" if is_postgres() else "1"
+    placeholders = ','.join('?' * len(student_ids))
+    rows = db.execute_query(
+        f"SELECT DISTINCT student_id FROM certificates WHERE student_id IN ({placeholders}) AND is_active = {is_active_val}",
+        tuple(student_ids),
+        fetch_all=True
+    )
+    return {row['student_id'] for row in rows}
+
+
+def _pdf_available(pdf_path):
+    """Local PDFs must still be on disk; storage URLs are trusted"""
+    return bool(pdf_path) and (pdf_path.startswith(('http://', 'https://')) or os.path.exists(pdf_path))
+
+
+def certificate_pdf_url(pdf_path):
+    """Link to a stored certificate PDF: storage URLs as they are, local paths served from /uploads"""
+    if pdf_path.startswith(('http://', 'https://')):
+        return pdf_path
+    return '/' + pdf_path.replace('\\', '/').lstrip('/')
+
+
+def reusable_certificates(content_hashes):
+    """
+    {student_id: active certificate} for the students in ``{student_id: content_hash}``
+    whose active certificate was rendered from the same inputs and still has its PDF
+    """
+    if not content_hashes:
+        return {}
+
+    is_active_val = "TRUE" if is_postgres() else "1"
+    student_ids = list(content_hashes)
+    placeholders = ','.join('?' * len(student_ids))
+    rows = db.execute_query(
+        f"""SELECT id, student_id, certificate_unique_id, pdf_path, content_hash FROM certificates
+            WHERE student_id IN ({placeholders}) AND is_active = {is_active_val} AND content_hash IS NOT NULL""",
+        tuple(student_ids),
+        fetch_all=True
+    )
+    return {
+        row['student_id']: row for row in rows
+        if row['content_hash'] == content_hashes[row['student_id']] and _pdf_available(row['pdf_path'])
+    }
+
+
+def _reuse_certificate(student, certificate):
+    """Commit step of a render cache hit - the active certificate already matches"""
+    return {'certificate_id': certificate['certificate_unique_id'], 'student_name': student['full_name'], 'reused': True}
+
+
+def _record_certificate(student, cert_unique_id, job, issue_date, expiry_date, replace_active):
+    """Commit step of one rendered certificate; runs in the item's transaction"""
+    is_active_val = "TRUE" if is_postgres() else "1"
+    is_inactive_val = "FALSE" if is_postgres() else "0"
+
+    if replace_active:
+        # Deactivate old certificate; its cached verification result goes once this commits
+        invalidate_active_certificates(student['id'])
+        db.execute_query(
+            f"UPDATE certificates SET is_active = {is_inactive_val} WHERE student_id = ? AND is_active = {is_active_val}",
+            (student['id'],)
+        )
+    elif _has_active_certificate([student['id']]):
+        raise JobItemError(f"{student['full_name']} already has an active certificate")
+
+    # Insert certificate into database
+    db.execute_query(f"""
+        INSERT INTO certificates
+        (student_id, certificate_unique_id, issue_date, expiry_date,
+         qr_code, pdf_path, is_active, display_name, content_hash)
+        VALUES (?, ?, ?, ?, ?, ?, {is_active_val}, ?, ?)
+    """, (
+        student['id'],
+        cert_unique_id,
+        issue_date,
+        expiry_date,
+        job['qr_data'],
+        job['certificate']['output_path'],
+        student['full_name'],
+        job['content_hash']
+    ))
+
+    # Update student record
+    db.execute_query("""
+        UPDATE students
+        SET certificate_issued_date = ?, certificate_expiry_date = ?
+        WHERE id = ?
+    """, (issue_date, expiry_date, student['id']))
+
+    return {'certificate_id': cert_unique_id, 'student_name': student['full_name']}
+
+
+def _render_and_record(pending, payload, replace_active):
+    """Render certificates for [(item_key, student)] in parallel; return {item_key: outcome}"""
+    issue_date = datetime.now()
+    expiry_date = issue_date + timedelta(days=365)
+
+    prepared = []
+    for key, student in pending:
+        cert_unique_id = generate_certificate_id()
+        job = certificate_render_job(
+            cert_unique_id,
+            payload['base_domain'],
+            student_name=student['full_name'],
+            wapl_id=student['wapl_id'],
+            domain_name=student['domain_display'],
+            issue_date=issue_date,
+            expiry_date=expiry_date,
+            certificate_text=f"This certificate recognizes the candidate's hands-on experience in {student['domain_display']} and successful assessment by WAPL."
+        )
+        prepared.append((key, student, cert_unique_id, job))
+
+    outcomes = {}
+    if replace_active:
+        # Render cache: skip students whose active certificate was rendered from the same inputs
+        reusable = reusable_certificates({student['id']: job['content_hash'] for _, student, _, job in prepared})
+        for key, student, _, _ in prepared:
+            if student['id'] in reusable:
+                outcomes[key] = functools.partial(_reuse_certificate, student, reusable[student['id']])
+        prepared = [entry for entry in prepared if entry[0] not in outcomes]
+
+    rendered = render_certificates([job for _, _, _, job in prepared])
+
+    for (key, student, cert_unique_id, job), result in zip(prepared, rendered):
+        if result['ok']:
+            outcomes[key] = functools.partial(
+                _record_certificate, student, cert_unique_id, job, issue_date, expiry_date, replace_active
+            )
+        else:
+            outcomes[key] = RuntimeError(f"Rendering failed for {student['full_name']}: {result['error']}")
+    return outcomes
+
+
+@register('issue_certificates', batch_size=CERTIFICATE_BATCH_SIZE)
+def issue_certificates_task(student_keys, payload):
+    """Issue certificates to students that do not have an active one"""
+    student_ids = [int(key) for key in student_keys]
+    students = _load_students(student_ids)
+    already_issued = _has_active_certificate(student_ids)
+
+    outcomes = {}
+    pending = []
+    for key, student_id in zip(student_keys, student_ids):
+        student = students.get(student_id)
+        if not student:
+            outcomes[key] = JobItemError(f"Student ID {student_id} not found")
+        elif student_id in already_issued:
+            outcomes[key] = JobItemError(f"{student['full_name']} already has an active certificate")
+        else:
+            pending.append((key, student))
+
+    outcomes.update(_render_and_record(pending, payload, replace_active=False))
+    return outcomes
+
+
+@register('regenerate_certificates', batch_size=CERTIFICATE_BATCH_SIZE)
+def regenerate_certificates_task(student_keys, payload):
+    """Replace each student's active certificate with a freshly rendered one"""
+    student_ids = [int(key) for key in student_keys]
+    students = _load_students(student_ids)
+
+    outcomes = {}
+    pending = []
+    for key, student_id in zip(student_keys, student_ids):
+        student = students.get(student_id)
+        if not student:
+            outcomes[key] = JobItemError(f"Student ID {student_id} not found")
+        else:
+            pending.append((key, student))
+
+    outcomes.update(_render_and_record(pending, payload, replace_active=True))
+    return outcomes
+
+
+@register('reconcile_recruitment_rollup')
+def reconcile_recruitment_rollup_task(item_key, payload):
+    """Repair recruitment_rollup counters that drifted from recruitment_status / students"""
+    repaired = reconcile_recruitment_rollup()
+    if repaired:
+        print(f"⚠️ Recruitment rollup drift repaired for HR(s) {sorted(repaired)}: {repaired}")
+    return {'repaired_hrs': sorted(repaired)}
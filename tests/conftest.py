@@ -0,0 +1,133 @@
+"""
+Shared fixtures. Tests run against a throw-away SQLite database; tests marked
+with the ``postgres_db`` fixture also run against PostgreSQL when
+TEST_DATABASE_URL points at a scratch database, and are skipped otherwise.
+"""
+
+import os
+import pytest
+from flask import Flask
+
+import database
+
+
+def _fresh_pools(monkeypatch):
+    monkeypatch.setattr(database, '_pools', {})
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """Migrated SQLite database in a temporary directory"""
+    import migrations
+
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    monkeypatch.setattr(database, 'DB_NAME', str(tmp_path / 'wapl_test.db'))
+    _fresh_pools(monkeypatch)
+    migrations.upgrade()
+    yield database.DB_NAME
+    for pool in database._pools.values():
+        pool.close_idle()
+
+
+@pytest.fixture
+def postgres_db(monkeypatch):
+    """Migrated PostgreSQL database from TEST_DATABASE_URL (skipped when unset)"""
+    import migrations
+
+    url = os.environ.get('TEST_DATABASE_URL')
+    if not url:
+        pytest.skip('TEST_DATABASE_URL not set')
+    monkeypatch.setenv('DATABASE_URL', url)
+    _fresh_pools(monkeypatch)
+    migrations.upgrade()
+    yield url
+    for pool in database._pools.values():
+        pool.close_idle()
+
+
+@pytest.fixture(params=['sqlite', 'postgres'])
+def any_db(request):
+    """Run the test once per backend"""
+    return request.getfixturevalue(f'{request.param}_db')
+
+
+@pytest.fixture
+def app():
+    """Bare Flask app with the per-request unit of work installed"""
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    database.init_app(app)
+    return app
+
+
+def insert(query, params=()):
+    """INSERT returning the new id on either backend"""
+    if database.is_postgres():
+        return database.db.execute_query(query + ' RETURNING id', params, fetch_one=True)['id']
+    return database.db.execute_query(query, params)
+
+
+def make_student(email, full_name='Test Student', status='active', hr_id=None):
+    user_id = insert(
+        "INSERT INTO users (email, password_hash, role, is_verified) VALUES (?, ?, 'student', ?)",
+        (email, 'x', True)
+    )
+    return insert(
+        "INSERT INTO students (user_id, wapl_id, full_name, phone, account_status, assigned_hr_id) VALUES (?, ?, ?, ?, ?, ?)",
+        (user_id, 'WAPL-' + email, full_name, '0000000000', status, hr_id)
+    )
+
+
+def make_hr(email, full_name='Test HR'):
+    user_id = insert(
+        "INSERT INTO users (email, password_hash, role, is_verified) VALUES (?, ?, 'hr', ?)",
+        (email, 'x', True)
+    )
+    return insert(
+        "INSERT INTO hrs (user_id, full_name, company_name, phone, designation) VALUES (?, ?, ?, ?, ?)",
+        (user_id, full_name, 'Acme', '0000000000', 'Recruiter')
+    )
+
+
+@pytest.fixture
+def web(app, sqlite_db):
+    """The bare app with the admin, HR and public API blueprints registered"""
+    from routes.admin import admin_bp
+    from routes.hr import hr_bp
+    from routes.public import public_bp
+
+    app.secret_key = 'test-secret'
+    for blueprint in (admin_bp, hr_bp, public_bp):
+        app.register_blueprint(blueprint)
+    return app
+
+
+def login(client, user_id, role, **extra):
+    """Put a logged-in user into the test client's session"""
+    with client.session_transaction() as session:
+        session.update(user_id=user_id, role=role, email=f'{role}@example.com', **extra)
+    return client
+
+
+@pytest.fixture
+def admin_client(web):
+    # user 1 is the super admin seeded by migration 0003
+    return login(web.test_client(), 1, 'admin', is_super_admin=True)
+
+
+def make_certificate(student_id, unique_id, content_hash=None, pdf_path='https://storage.example.com/cert.pdf',
+                     is_active=True, issue_date=None, expiry_date=None, hr_id=None):
+    from datetime import datetime, timedelta
+    issue_date = issue_date or datetime.now()
+    expiry_date = expiry_date or issue_date + timedelta(days=365)
+    return insert(
+        """INSERT INTO certificates
+           (student_id, certificate_unique_id, issue_date, expiry_date, qr_code, pdf_path, is_active, issued_by_hr_id, content_hash)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (student_id, unique_id, issue_date, expiry_date, f'https://wapl.example.com/verify/{unique_id}',
+         pdf_path, is_active, hr_id, content_hash)
+    )
+
+
+def user_id_of_hr(hr_id):
+    return database.db.execute_query("SELECT user_id FROM hrs WHERE id = ?", (hr_id,), fetch_one=True)['user_id']
@@ -0,0 +1,32 @@
+import pytest
+
+from database import db
+from conftest import make_student
+
+
+@pytest.fixture(params=[True, False], ids=['returning', 'locked-select'])
+def admin_routes(request, sqlite_db, monkeypatch):
+    from routes import admin
+    monkeypatch.setattr(admin, 'SQLITE_HAS_RETURNING', request.param)
+    return admin
+
+
+def status_of(student_id):
+    return db.execute_query("SELECT account_status FROM students WHERE id = ?", (student_id,), fetch_one=True)['account_status']
+
+
+def test_only_rows_in_the_source_status_are_reported(admin_routes):
+    pending = make_student('pending@example.com', status='pending')
+    active = make_student('active@example.com', status='active')
+    suspended = make_student('suspended@example.com', status='suspended')
+
+    with db.transaction():
+        approved = admin_routes._bulk_transition([pending, active, suspended], 'active', ('pending',))
+    assert approved == {pending}
+    assert status_of(suspended) == 'suspended'
+
+    with db.transaction():
+        activated = admin_routes._bulk_transition([pending, active, suspended], 'active', None)
+    # Already-active students are not reported again (no second activation email)
+    assert activated == {suspended}
+    assert {status_of(student) for student in (pending, active, suspended)} == {'active'}
@@ -0,0 +1,83 @@
+from datetime import datetime
+
+import pytest
+
+import utils
+from tasks import reusable_certificates, certificate_pdf_url
+from conftest import make_hr, make_student, make_certificate, user_id_of_hr, login
+
+INPUTS = ('https://wapl.example.com/', 'Asha Rao', 'WAPL2026000001', 'AI, ML', '2026-01-01', '2027-01-01', 'HR One', 'Well done')
+
+
+def content_hash(**changes):
+    names = ('base_domain', 'student_name', 'wapl_id', 'domain_name', 'issue_date', 'expiry_date', 'hr_name', 'certificate_text')
+    values = dict(zip(names, INPUTS), **changes)
+    return utils.certificate_content_hash(**values)
+
+
+@pytest.fixture
+def student(sqlite_db):
+    return make_student('reuse@example.com', full_name='Asha Rao')
+
+
+def test_same_inputs_reuse_the_active_certificate(student):
+    make_certificate(student, 'CERT-1', content_hash=content_hash())
+    reused = reusable_certificates({student: content_hash()})
+    assert reused[student]['certificate_unique_id'] == 'CERT-1'
+
+
+@pytest.mark.parametrize('change', [
+    {'student_name': 'Asha R. Rao'},
+    {'certificate_text': 'Outstanding work'},
+    {'domain_name': 'AI'},
+    {'expiry_date': '2027-06-01'},
+])
+def test_changed_inputs_render_again(student, change):
+    make_certificate(student, 'CERT-1', content_hash=content_hash())
+    assert content_hash(**change) != content_hash()
+    assert reusable_certificates({student: content_hash(**change)}) == {}
+
+
+def test_changed_template_renders_again(student, monkeypatch):
+    make_certificate(student, 'CERT-1', content_hash=content_hash())
+    monkeypatch.setattr(utils.TemplateRegistry, 'version', classmethod(lambda cls: 'new-template'))
+    assert reusable_certificates({student: content_hash()}) == {}
+
+
+def test_revoked_certificate_is_never_reused(student):
+    make_certificate(student, 'CERT-1', content_hash=content_hash(), is_active=False)
+    assert reusable_certificates({student: content_hash()}) == {}
+
+
+def test_missing_local_pdf_is_not_reused(student, tmp_path):
+    make_certificate(student, 'CERT-1', content_hash=content_hash(), pdf_path=str(tmp_path / 'gone.pdf'))
+    assert reusable_certificates({student: content_hash()}) == {}
+
+
+def test_pdf_url_keeps_storage_urls_and_roots_local_paths():
+    assert certificate_pdf_url('https://bucket.example.com/certificates/C_1.pdf') == 'https://bucket.example.com/certificates/C_1.pdf'
+    assert certificate_pdf_url('uploads/certificates/C_1.pdf') == '/uploads/certificates/C_1.pdf'
+
+
+def test_hr_reissue_links_the_stored_pdf(web, tmp_path, monkeypatch):
+    # A missed reuse would render into ./uploads - keep that out of the tree
+    monkeypatch.chdir(tmp_path)
+    hr_id = make_hr('issuer@example.com', full_name='HR One')
+    student_id = make_student('issued@example.com', full_name='Asha Rao', hr_id=hr_id)
+    wapl_id = 'WAPL-issued@example.com'
+    issue_date = datetime.now()
+    expiry_date = issue_date.replace(year=issue_date.year + 1)
+    stored_hash = utils.certificate_content_hash(
+        'http://localhost/', 'Asha Rao', wapl_id, None, issue_date.strftime('%Y-%m-%d'),
+        expiry_date.strftime('%Y-%m-%d'), 'HR One', 'Well done'
+    )
+    remote_pdf = 'https://bucket.example.com/certificates/CERT-9_1700000000.pdf'
+    make_certificate(student_id, 'CERT-9', content_hash=stored_hash, pdf_path=remote_pdf)
+
+    client = login(web.test_client(), user_id_of_hr(hr_id), 'hr')
+    response = client.post(f'/api/hr/issue-certificate/{student_id}', json={'certificate_text': 'Well done'})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['reused'] is True
+    assert body['pdf_url'] == remote_pdf
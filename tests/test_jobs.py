@@ -0,0 +1,165 @@
+from datetime import datetime, timedelta
+import pytest
+
+import jobs
+from database import db
+
+
+@pytest.fixture
+def handler(monkeypatch, sqlite_db):
+    """Register a single-item 'test_job' handler whose behaviour each test scripts"""
+    calls = []
+    script = {}
+
+    def run(key, payload):
+        calls.append(key)
+        outcome = script.get(key)
+        if callable(outcome):
+            return outcome()
+        if isinstance(outcome, list) and outcome:
+            step = outcome.pop(0)
+            if isinstance(step, Exception):
+                raise step
+            return step
+        return {'key': key}
+
+    monkeypatch.setitem(jobs._handlers, 'test_job', (run, 1))
+    monkeypatch.setattr(jobs, 'JOB_MAX_ATTEMPTS', 2)
+    run.calls = calls
+    run.script = script
+    return run
+
+
+def expire_leases():
+    db.execute_query("UPDATE job_items SET locked_until = ?", (datetime.now() - timedelta(seconds=1),))
+
+
+def item_row(job_id, key):
+    return db.execute_query("SELECT * FROM job_items WHERE job_id = ? AND item_key = ?", (job_id, key), fetch_one=True)
+
+
+def test_each_item_is_claimed_by_one_worker(handler):
+    job_id = jobs.enqueue('test_job', ['a', 'b'])
+    first = jobs.claim_next('w1')
+    second = jobs.claim_next('w2')
+    assert {first['item_key'], second['item_key']} == {'a', 'b'}
+    assert jobs.claim_next('w3') is None
+    assert item_row(job_id, first['item_key'])['locked_by'] == 'w1'
+
+
+def test_expired_lease_can_be_reclaimed_and_the_old_result_is_discarded(handler):
+    job_id = jobs.enqueue('test_job', ['a'])
+    stale = jobs.claim_next('w1')
+    expire_leases()
+
+    fresh = jobs.claim_next('w2')
+    assert fresh['item_key'] == 'a'
+    assert fresh['attempts'] == 2
+
+    # The first worker finishes late: its outcome must not be recorded
+    jobs.process_items([stale], 'w1')
+    assert item_row(job_id, 'a')['status'] == 'running'
+
+    jobs.process_items([fresh], 'w2')
+    job = jobs.get_job(job_id)
+    assert job['status'] == 'completed'
+    assert job['succeeded'] == 1 and job['processed'] == 1
+
+
+def test_failed_attempt_is_retried_then_succeeds(handler):
+    handler.script['a'] = [RuntimeError('flaky'), {'ok': True}]
+    job_id = jobs.enqueue('test_job', ['a'])
+
+    jobs.process_items([jobs.claim_next('w1')], 'w1')
+    row = item_row(job_id, 'a')
+    assert row['status'] == 'pending'
+    assert row['error'] == 'flaky'
+
+    expire_leases()
+    jobs.process_items([jobs.claim_next('w1')], 'w1')
+    job = jobs.get_job(job_id)
+    assert job['items'][0]['status'] == 'done'
+    assert job['items'][0]['result'] == {'ok': True}
+    assert job['status'] == 'completed'
+
+
+def test_retried_item_waits_for_its_backoff(handler, monkeypatch):
+    monkeypatch.setattr(jobs, 'JOB_RETRY_BASE_SECONDS', 60)
+    handler.script['a'] = [RuntimeError('storage blip')]
+    job_id = jobs.enqueue('test_job', ['a'])
+
+    before = datetime.now()
+    jobs.process_items([jobs.claim_next('w1')], 'w1')
+    row = item_row(job_id, 'a')
+    assert row['status'] == 'pending'
+    retry_at = datetime.fromisoformat(str(row['locked_until']))
+    assert retry_at >= before + timedelta(seconds=60)
+
+    # Not claimable until the backoff has passed
+    assert jobs.claim_next('w2') is None
+    expire_leases()
+    assert jobs.claim_next('w2')['item_key'] == 'a'
+
+
+def test_retry_delay_grows_and_is_capped(monkeypatch):
+    monkeypatch.setattr(jobs, 'JOB_RETRY_BASE_SECONDS', 10)
+    monkeypatch.setattr(jobs, 'JOB_RETRY_MAX_SECONDS', 30)
+    assert [jobs.retry_delay(n) for n in (1, 2, 3, 4)] == [10, 20, 30, 30]
+
+
+def test_item_fails_for_good_after_max_attempts(handler):
+    handler.script['a'] = [RuntimeError('down'), RuntimeError('still down')]
+    job_id = jobs.enqueue('test_job', ['a'])
+
+    jobs.process_items([jobs.claim_next('w1')], 'w1')
+    expire_leases()
+    jobs.process_items([jobs.claim_next('w1')], 'w1')
+
+    expire_leases()
+    assert jobs.claim_next('w1') is None
+    job = jobs.get_job(job_id)
+    assert job['items'][0]['status'] == 'failed'
+    assert job['items'][0]['error'] == 'still down'
+    assert job['status'] == 'failed'
+
+
+def test_job_item_error_is_not_retried(handler):
+    handler.script['a'] = [jobs.JobItemError('bad input')]
+    job_id = jobs.enqueue('test_job', ['a', 'b'])
+
+    for _ in range(2):
+        jobs.process_items([jobs.claim_next('w1')], 'w1')
+
+    assert handler.calls == ['a', 'b']
+    job = jobs.get_job(job_id)
+    assert [item['status'] for item in job['items']] == ['failed', 'done']
+    assert job['status'] == 'completed'
+    assert (job['succeeded'], job['failed']) == (1, 1)
+
+
+def test_item_writes_roll_back_when_the_lease_was_lost(handler):
+    def write_then_lose_lease():
+        db.execute_query("INSERT INTO domains (domain_name) VALUES ('Written by job')")
+        expire_leases()
+        jobs.claim_next('w2')
+        return {}
+
+    handler.script['a'] = write_then_lose_lease
+    jobs.enqueue('test_job', ['a'])
+    jobs.process_items([jobs.claim_next('w1')], 'w1')
+
+    assert db.execute_query(
+        "SELECT COUNT(*) AS n FROM domains WHERE domain_name = 'Written by job'", fetch_one=True
+    )['n'] == 0
+
+
+def test_spawned_children_do_not_start_worker_threads(monkeypatch):
+    class SpawnedChild:
+        name = 'SpawnProcess-1'
+
+    started = []
+    monkeypatch.setattr(jobs.multiprocessing, 'current_process', lambda: SpawnedChild())
+    monkeypatch.setattr(jobs.multiprocessing, 'parent_process', lambda: None)
+    monkeypatch.setattr(jobs.threading, 'Thread', lambda *args, **kwargs: started.append(kwargs))
+    jobs.start_worker_threads(2)
+    assert started == []
@@ -0,0 +1,183 @@
+import smtplib
+import threading
+from email.message import EmailMessage
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import mailer
+from mailer import SMTPPool, ResendProvider, EmailProviderError, send_with_providers
+from resend_stub import ResendStubHandler
+
+
+def message(n, to=None):
+    return {'to_email': to or f'user{n}@example.com', 'subject': f'Hello {n}', 'text_body': 'Hi', 'html_body': '<p>Hi</p>'}
+
+
+@pytest.fixture
+def resend_stub():
+    """resend_stub.py on a free port, recording the path of every POST"""
+    class Handler(ResendStubHandler):
+        received = []
+        calls = []
+
+        def do_POST(self):
+            self.calls.append(self.path)
+            return super().do_POST()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}', Handler
+    server.shutdown()
+    server.server_close()
+
+
+def test_resend_sends_one_batch_call_per_chunk(resend_stub):
+    url, stub = resend_stub
+    provider = ResendProvider('test-key', 'WAPL <noreply@example.com>', api_url=url, batch_size=2)
+
+    results = provider.send_batch([message(n) for n in range(5)])
+
+    assert results == [None] * 5
+    assert stub.calls == ['/emails/batch'] * 3
+    assert [email['to'] for email in stub.received] == [[f'user{n}@example.com'] for n in range(5)]
+    assert all(email['from'] == 'WAPL <noreply@example.com>' and email['html'] == '<p>Hi</p>' for email in stub.received)
+
+
+def test_rejected_chunk_fails_only_its_messages(resend_stub):
+    url, stub = resend_stub
+    provider = ResendProvider('test-key', 'noreply@example.com', api_url=url, batch_size=2)
+
+    results = provider.send_batch([message(0), message(1), message(2, to='reject@example.com'), message(3), message(4)])
+
+    assert stub.calls == ['/emails/batch'] * 3
+    assert [result is None for result in results] == [True, True, False, False, True]
+    assert all(isinstance(result, EmailProviderError) for result in results[2:4])
+    assert len(stub.received) == 3
+
+
+def test_single_message_uses_the_plain_endpoint(resend_stub):
+    url, stub = resend_stub
+    provider = ResendProvider('test-key', 'noreply@example.com', api_url=url)
+
+    assert provider.send_batch([message(0)]) == [None]
+    assert stub.calls == ['/emails']
+
+
+def test_failed_messages_go_to_the_next_provider(resend_stub):
+    url, stub = resend_stub
+
+    class Fallback:
+        name = 'fallback'
+        sent = []
+
+        def send_batch(self, messages):
+            self.sent.extend(m['to_email'] for m in messages)
+            return [None] * len(messages)
+
+    fallback = Fallback()
+    resend = ResendProvider('test-key', 'noreply@example.com', api_url=url, batch_size=2)
+    messages = [message(0, to='reject@example.com'), message(1), message(2), message(3)]
+
+    assert send_with_providers([resend, fallback], messages) == [None] * 4
+    assert fallback.sent == ['reject@example.com', 'user1@example.com']
+
+
+class FakeSMTP:
+    """Stands in for smtplib.SMTP; ``failures`` maps a recipient to the exception its send raises once"""
+    opened = []
+    failures = {}
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.closed = False
+        self.opened.append(self)
+
+    def ehlo(self):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def noop(self):
+        return (250, b'OK')
+
+    def send_message(self, message):
+        error = self.failures.pop(message['To'], None)
+        if error is not None:
+            raise error
+        self.sent.append(message['To'])
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+def mime(to):
+    message = EmailMessage()
+    message['To'] = to
+    message['Subject'] = 'Hi'
+    message.set_content('Hi')
+    return message
+
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+    monkeypatch.setattr(FakeSMTP, 'opened', [])
+    monkeypatch.setattr(FakeSMTP, 'failures', {})
+    monkeypatch.setattr(mailer.smtplib, 'SMTP', FakeSMTP)
+    return FakeSMTP
+
+
+def test_session_is_reused_across_messages_and_calls(fake_smtp):
+    pool = SMTPPool('user', 'secret', size=2)
+
+    assert pool.send_many([mime('a@example.com'), mime('b@example.com')]) == [None, None]
+    assert pool.send_many([mime('c@example.com')]) == [None]
+
+    assert len(fake_smtp.opened) == 1
+    assert fake_smtp.opened[0].sent == ['a@example.com', 'b@example.com', 'c@example.com']
+    assert len(pool._idle) == 1 and pool._open_count == 1
+
+
+def test_dropped_session_is_replaced_and_the_message_resent(fake_smtp):
+    pool = SMTPPool('user', 'secret', size=1)
+    fake_smtp.failures['b@example.com'] = smtplib.SMTPServerDisconnected('gone')
+
+    results = pool.send_many([mime('a@example.com'), mime('b@example.com'), mime('c@example.com')])
+
+    assert results == [None, None, None]
+    first, second = fake_smtp.opened
+    assert first.closed and first.sent == ['a@example.com']
+    assert second.sent == ['b@example.com', 'c@example.com']
+    assert pool._open_count == 1
+
+
+def test_refused_message_fails_alone_and_the_session_goes_back(fake_smtp):
+    pool = SMTPPool('user', 'secret', size=1)
+    fake_smtp.failures['bad@example.com'] = smtplib.SMTPRecipientsRefused({'bad@example.com': (550, b'No such user')})
+
+    results = pool.send_many([mime('bad@example.com'), mime('ok@example.com')])
+
+    assert isinstance(results[0], smtplib.SMTPRecipientsRefused)
+    assert results[1] is None
+    assert len(fake_smtp.opened) == 1
+    assert len(pool._idle) == 1 and pool._open_count == 1
+
+
+def test_session_is_returned_when_sending_raises(fake_smtp):
+    pool = SMTPPool('user', 'secret', size=1, timeout=1)
+    fake_smtp.failures['a@example.com'] = ValueError('bad header')
+
+    with pytest.raises(ValueError):
+        pool.send_many([mime('a@example.com')])
+
+    # The single slot is free again, so the next send does not time out waiting for it
+    assert len(pool._idle) == 1 and pool._open_count == 1
+    assert pool.send_many([mime('b@example.com')]) == [None]
+    assert len(fake_smtp.opened) == 1
@@ -0,0 +1,103 @@
+import sqlite3
+import threading
+import pytest
+
+import database
+import migrations
+
+
+@pytest.fixture
+def empty_db(tmp_path, monkeypatch):
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    monkeypatch.setattr(database, 'DB_NAME', str(tmp_path / 'empty.db'))
+    monkeypatch.setattr(database, '_pools', {})
+    return database.DB_NAME
+
+
+def latest_version():
+    return migrations.discover()[-1][0]
+
+
+def test_upgrade_applies_everything_once(empty_db):
+    applied = migrations.upgrade()
+    assert applied == [version for version, _, _ in migrations.discover()]
+    assert migrations.pending() == []
+    assert migrations.current_version() == latest_version()
+
+    assert migrations.upgrade() == []
+    assert migrations.current_version() == latest_version()
+
+
+def test_upgrade_stops_at_target(empty_db):
+    assert migrations.upgrade(target=2) == [1, 2]
+    assert [m['version'] for m in migrations.pending()][0] == 3
+    assert migrations.upgrade()[0] == 3
+
+
+def test_concurrent_upgrades_apply_each_migration_once(empty_db):
+    results, errors = [], []
+
+    def run():
+        try:
+            results.append(migrations.upgrade())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+
+    assert errors == []
+    applied = sorted(version for result in results for version in result)
+    assert applied == [version for version, _, _ in migrations.discover()]
+
+
+def test_failed_migration_is_rolled_back_and_not_recorded(empty_db, monkeypatch):
+    migrations.upgrade(target=latest_version() - 1)
+
+    class Broken:
+        @staticmethod
+        def upgrade(cursor, db_type):
+            cursor.execute("CREATE TABLE half_done (id INTEGER)")
+            raise RuntimeError('bad migration')
+
+    found = migrations.discover()
+    version, name, _ = found[-1]
+    monkeypatch.setattr(migrations, 'discover', lambda: found[:-1] + [(version, name, Broken)])
+
+    with pytest.raises(RuntimeError):
+        migrations.upgrade()
+    assert migrations.current_version() == version - 1
+    assert database.db.execute_query(
+        "SELECT COUNT(*) AS n FROM sqlite_master WHERE name = 'half_done'", fetch_one=True
+    )['n'] == 0
+
+
+def test_duplicate_recruitment_status_rows_are_collapsed(empty_db):
+    from conftest import make_hr, make_student
+    from recruitment import reconcile_recruitment_rollup
+
+    migrations.upgrade(target=11)
+    hr_id = make_hr('dedupe-hr@example.com')
+    student_id = make_student('dedupe-student@example.com')
+    db = database.db
+    for status, updated_at in (('viewed', '2024-01-01 10:00:00'), ('selected', '2024-03-01 10:00:00'), ('shortlisted', '2024-02-01 10:00:00')):
+        db.execute_query(
+            "INSERT INTO recruitment_status (student_id, hr_id, status, updated_at) VALUES (?, ?, ?, ?)",
+            (student_id, hr_id, status, updated_at)
+        )
+    reconcile_recruitment_rollup()
+
+    migrations.upgrade()
+
+    rows = db.execute_query(
+        "SELECT status FROM recruitment_status WHERE student_id = ? AND hr_id = ?", (student_id, hr_id), fetch_all=True
+    )
+    assert [row['status'] for row in rows] == ['selected']
+    assert reconcile_recruitment_rollup() == {}
+    with pytest.raises(sqlite3.IntegrityError):
+        db.execute_query(
+            "INSERT INTO recruitment_status (student_id, hr_id, status) VALUES (?, ?, 'viewed')", (student_id, hr_id)
+        )
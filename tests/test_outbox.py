@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+import pytest
+
+import outbox
+from database import db
+
+
+@pytest.fixture
+def delivered(monkeypatch, sqlite_db):
+    """Replace the provider: records sends, fails addresses listed in ``delivered.failing``"""
+    class Sent(list):
+        failing = set()
+
+    sent = Sent()
+
+    def deliver(messages):
+        sent.extend(message['to_email'] for message in messages)
+        return [outbox.EmailDeliveryError('rejected') if message['to_email'] in sent.failing else None
+                for message in messages]
+
+    monkeypatch.setattr(outbox, '_deliver', deliver)
+    monkeypatch.setattr(outbox, 'EMAIL_DELIVERY', 'outbox')
+    return sent
+
+
+def row(outbox_id):
+    return db.execute_query("SELECT * FROM email_outbox WHERE id = ?", (outbox_id,), fetch_one=True)
+
+
+def test_each_message_is_claimed_by_one_sender(delivered):
+    ids = [outbox.enqueue_email(f'user{n}@example.com', 'Hi', 'Body') for n in range(3)]
+    first = outbox.claim_batch('s1', limit=2)
+    second = outbox.claim_batch('s2', limit=2)
+    assert [m['id'] for m in first] == ids[:2]
+    assert [m['id'] for m in second] == ids[2:]
+    assert outbox.claim_batch('s3') == []
+
+
+def test_expired_lease_is_claimed_again(delivered):
+    outbox_id = outbox.enqueue_email('user@example.com', 'Hi', 'Body')
+    outbox.claim_batch('s1')
+    db.execute_query("UPDATE email_outbox SET locked_until = ?", (datetime.now() - timedelta(seconds=1),))
+    again = outbox.claim_batch('s2')
+    assert [m['id'] for m in again] == [outbox_id]
+    assert again[0]['attempts'] == 2
+
+
+def test_failed_send_backs_off_then_fails_for_good(delivered, monkeypatch):
+    monkeypatch.setattr(outbox, 'EMAIL_MAX_ATTEMPTS', 2)
+    delivered.failing.add('bounce@example.com')
+    outbox_id = outbox.enqueue_email('bounce@example.com', 'Hi', 'Body')
+
+    before = datetime.now()
+    outbox.send_batch(outbox.claim_batch('s1'), 's1')
+    message = row(outbox_id)
+    assert message['status'] == 'pending'
+    assert message['last_error'] == 'rejected'
+    retry_at = datetime.fromisoformat(str(message['next_attempt_at']))
+    assert retry_at >= before + timedelta(seconds=outbox.EMAIL_RETRY_BASE_SECONDS * 0.8)
+    # Not due yet
+    assert outbox.claim_batch('s1') == []
+
+    db.execute_query("UPDATE email_outbox SET next_attempt_at = ?", (datetime.now() - timedelta(seconds=1),))
+    outbox.send_batch(outbox.claim_batch('s1'), 's1')
+    message = row(outbox_id)
+    assert message['status'] == 'failed'
+    assert message['attempts'] == 2
+    assert outbox.claim_batch('s1') == []
+
+
+def test_retry_delay_grows_and_is_capped(monkeypatch):
+    monkeypatch.setattr(outbox.random, 'uniform', lambda low, high: 1.0)
+    monkeypatch.setattr(outbox, 'EMAIL_RETRY_BASE_SECONDS', 30)
+    monkeypatch.setattr(outbox, 'EMAIL_RETRY_MAX_SECONDS', 100)
+    assert [outbox.retry_delay(n) for n in (1, 2, 3, 4)] == [30, 60, 100, 100]
+
+
+def test_successful_send_is_marked_sent(delivered):
+    outbox_id = outbox.enqueue_email('ok@example.com', 'Hi', 'Body')
+    outbox.send_batch(outbox.claim_batch('s1'), 's1')
+    assert row(outbox_id)['status'] == 'sent'
+    assert delivered == ['ok@example.com']
+
+
+def test_inline_delivery_sends_after_the_request_commits(delivered, app, monkeypatch):
+    monkeypatch.setattr(outbox, 'EMAIL_DELIVERY', 'inline')
+
+    @app.route('/notify/<int:status>', methods=['POST'])
+    def notify(status):
+        already_sent = len(delivered)
+        outbox.enqueue_email(f'inline{status}@example.com', 'Hi', 'Body')
+        outbox.enqueue_emails([{'to_email': f'batch{status}@example.com', 'subject': 'Hi', 'text_body': 'Body'}])
+        assert len(delivered) == already_sent
+        return 'ok', status
+
+    client = app.test_client()
+    assert client.post('/notify/200').status_code == 200
+    assert client.post('/notify/500').status_code == 500
+
+    assert delivered == ['inline200@example.com', 'batch200@example.com']
+    statuses = db.execute_query("SELECT to_email, status FROM email_outbox ORDER BY id", fetch_all=True)
+    assert statuses == [
+        {'to_email': 'inline200@example.com', 'status': 'sent'},
+        {'to_email': 'batch200@example.com', 'status': 'sent'},
+    ]
@@ -0,0 +1,164 @@
+import os
+import threading
+import pytest
+
+import database
+from database import ConnectionPool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+    def cursor(self):
+        return FakeCursor()
+
+
+class FakeCursor:
+    def execute(self, query, params=()):
+        pass
+
+    def fetchone(self):
+        return (1,)
+
+
+def make_pool(**kwargs):
+    opened = []
+
+    def connect():
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    kwargs.setdefault('min_size', 0)
+    kwargs.setdefault('max_size', 2)
+    kwargs.setdefault('timeout', 0.2)
+    return ConnectionPool(connect, **kwargs), opened
+
+
+def test_released_connection_is_reused():
+    pool, opened = make_pool()
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert len(opened) == 1
+    assert conn.rollbacks == 1
+
+
+def test_discarded_connection_is_closed_and_frees_its_slot():
+    pool, opened = make_pool(max_size=1)
+    conn = pool.acquire()
+    pool.release(conn, discard=True)
+    assert conn.closed
+    other = pool.acquire()
+    assert other is not conn
+    assert len(opened) == 2
+
+
+def test_acquire_times_out_when_exhausted():
+    pool, _ = make_pool(max_size=1)
+    pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+
+
+def test_waiter_gets_connection_when_one_is_released():
+    pool, _ = make_pool(max_size=1, timeout=5)
+    conn = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    pool.release(conn)
+    waiter.join(5)
+    assert got == [conn]
+
+
+def test_recycled_connection_is_replaced():
+    pool, opened = make_pool(recycle=0.000001)
+    conn = pool.acquire()
+    pool.release(conn)
+    fresh = pool.acquire()
+    assert fresh is not conn
+    assert conn.closed
+    assert len(opened) == 2
+
+
+def test_pool_resets_when_used_from_another_pid(monkeypatch):
+    pool, opened = make_pool()
+    inherited = pool.acquire()
+    pool.release(inherited)
+
+    monkeypatch.setattr(os, 'getpid', lambda: pool._pid + 1)
+    conn = pool.acquire()
+    assert conn is not inherited
+    # The parent's socket must never be closed or rolled back by the child
+    assert not inherited.closed
+    assert inherited.rollbacks == 1
+
+
+def test_release_of_parent_connection_is_ignored_after_fork(monkeypatch):
+    pool, _ = make_pool()
+    conn = pool.acquire()
+    monkeypatch.setattr(os, 'getpid', lambda: pool._pid + 1)
+    pool.release(conn)
+    assert conn.rollbacks == 0
+    assert not conn.closed
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork')
+def test_forked_child_starts_with_an_empty_pool(sqlite_db):
+    pool = database.get_pool()
+    conn = pool.acquire()
+    pool.release(conn)
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Child: the at-fork hook must have dropped the inherited connection
+        try:
+            ok = pool._idle == [] and pool._size == 0 and pool._pid == os.getpid()
+            ok = ok and database.db.execute_query('SELECT 1 AS one', fetch_one=True)['one'] == 1
+            os.write(write_fd, b'1' if ok else b'0')
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    result = os.read(read_fd, 1)
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+    assert result == b'1'
+    # The parent closed its idle connections before forking and keeps working
+    assert database.db.execute_query('SELECT 1 AS one', fetch_one=True)['one'] == 1
+
+
+def test_warm_up_connects_without_holding_the_pool_lock():
+    lock_free = []
+
+    def connect():
+        acquired = pool._cond.acquire(blocking=False)
+        lock_free.append(acquired)
+        if acquired:
+            pool._cond.release()
+        return FakeConnection()
+
+    pool = ConnectionPool(connect, min_size=2, max_size=3, timeout=0.2)
+    conn = pool.acquire()
+    assert lock_free and all(lock_free)
+    assert pool._size == 2
+    pool.release(conn)
+
+
+def test_failed_warm_up_frees_the_reserved_slots():
+    def connect():
+        raise OSError('database unreachable')
+
+    pool = ConnectionPool(connect, min_size=2, max_size=2, timeout=0.2)
+    with pytest.raises(OSError):
+        pool.acquire()
+    assert pool._size == 0
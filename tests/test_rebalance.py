@@ -0,0 +1,58 @@
+import pytest
+
+from database import db
+from routes import admin
+from conftest import make_hr, make_student
+
+
+def assigned_to(student_ids):
+    rows = db.execute_query(
+        f"SELECT id, assigned_hr_id FROM students WHERE id IN ({','.join('?' * len(student_ids))})",
+        tuple(student_ids), fetch_all=True
+    )
+    return {row['id']: row['assigned_hr_id'] for row in rows}
+
+
+@pytest.fixture
+def hrs(sqlite_db):
+    return [make_hr(f'hr{n}@example.com') for n in range(3)]
+
+
+def test_rebalance_spreads_evenly(admin_client, hrs, monkeypatch):
+    # Small chunks so the selection spans several IN lists
+    monkeypatch.setattr(admin, 'ASSIGNMENT_CHUNK', 2)
+    students = [make_student(f's{n}@example.com') for n in range(9)]
+
+    response = admin_client.post('/api/admin/assign-students', json={'mode': 'rebalance', 'studentIds': students})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['changed'] == 9
+    assert body['assignments'] == [{'hrId': hr_id, 'assigned': 3} for hr_id in hrs]
+    counts = db.execute_query("SELECT hr_id, assigned_count FROM recruitment_rollup ORDER BY hr_id", fetch_all=True)
+    assert [row['assigned_count'] for row in counts] == [3, 3, 3]
+
+
+def test_rebalance_tops_up_the_least_loaded(admin_client, hrs):
+    already = [make_student(f'a{n}@example.com', hr_id=hrs[0]) for n in range(2)]
+    new = [make_student(f'n{n}@example.com') for n in range(4)]
+    admin.refresh_assigned_counts(hrs)
+
+    response = admin_client.post('/api/admin/assign-students', json={'mode': 'rebalance'})
+
+    # hrs[0] already holds two, so the four newcomers go 2/2 to the others
+    assert response.get_json()['assignments'] == [{'hrId': hrs[1], 'assigned': 2}, {'hrId': hrs[2], 'assigned': 2}]
+    assert set(assigned_to(already).values()) == {hrs[0]}
+    assert sorted(assigned_to(new).values()) == sorted([hrs[1], hrs[1], hrs[2], hrs[2]])
+
+
+def test_rebalance_reports_only_changed_students(admin_client, hrs, monkeypatch):
+    monkeypatch.setattr(admin, 'ASSIGNMENT_CHUNK', 2)
+    assigned = make_student('assigned@example.com', hr_id=hrs[2])
+    inactive = make_student('inactive@example.com', status='pending')
+    free = [make_student(f'f{n}@example.com') for n in range(2)]
+
+    per_hr = admin._rebalance_assignments([assigned, inactive, *free], hrs[:2])
+
+    assert per_hr == {hrs[0]: 1, hrs[1]: 1}
+    assert assigned_to([assigned, inactive]) == {assigned: hrs[2], inactive: None}
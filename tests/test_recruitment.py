@@ -0,0 +1,137 @@
+import pytest
+
+from database import db
+from recruitment import (
+    upsert_recruitment_status, refresh_assigned_counts, reconcile_recruitment_rollup,
+    recruitment_funnel, ROLLUP_COUNTERS
+)
+from conftest import make_hr, make_student, user_id_of_hr, login
+
+
+def rollup(hr_id):
+    return db.execute_query("SELECT * FROM recruitment_rollup WHERE hr_id = ?", (hr_id,), fetch_one=True)
+
+
+@pytest.fixture
+def people(sqlite_db):
+    hr_a, hr_b = make_hr('hr-a@example.com'), make_hr('hr-b@example.com')
+    students = [make_student(f'student{n}@example.com', hr_id=hr_a if n < 2 else hr_b) for n in range(3)]
+    refresh_assigned_counts([hr_a, hr_b])
+    return hr_a, hr_b, students
+
+
+def test_incremental_counters_match_a_full_rebuild(people):
+    hr_a, hr_b, (s1, s2, s3) = people
+    for student_id, hr_id, status in [
+        (s1, hr_a, 'viewed'),
+        (s1, hr_a, 'shortlisted'),
+        (s1, hr_a, 'interview_scheduled'),
+        (s1, hr_a, 'selected'),
+        (s2, hr_a, 'rejected'),
+        (s2, hr_a, 'rejected'),   # unchanged status
+        (s1, hr_b, 'viewed'),     # second HR on a student already in the pipeline
+        (s3, hr_b, 'shortlisted'),
+        (s3, hr_b, 'viewed'),
+    ]:
+        with db.transaction():
+            upsert_recruitment_status(student_id, hr_id, status, None)
+
+    assert reconcile_recruitment_rollup() == {}
+
+    a = rollup(hr_a)
+    assert (a['total_actions'], a['pipeline_students'], a['selected_count'], a['rejected_count']) == (2, 2, 1, 1)
+    assert (a['viewed_count'], a['shortlisted_count'], a['interview_count']) == (0, 0, 0)
+    b = rollup(hr_b)
+    assert (b['total_actions'], b['pipeline_students'], b['viewed_count']) == (2, 1, 2)
+
+    totals, by_hr = recruitment_funnel()
+    assert totals['total_actions'] == 4
+    assert totals['pipeline_students'] == 3
+    assert {row['id'] for row in by_hr} == {hr_a, hr_b}
+
+
+def test_assigned_count_follows_assignment_and_status(people):
+    hr_a, hr_b, (s1, s2, s3) = people
+    assert (rollup(hr_a)['assigned_count'], rollup(hr_b)['assigned_count']) == (2, 1)
+
+    with db.transaction():
+        db.execute_query("UPDATE students SET assigned_hr_id = ? WHERE id = ?", (hr_b, s1))
+        db.execute_query("UPDATE students SET account_status = 'suspended' WHERE id = ?", (s3,))
+        refresh_assigned_counts([hr_a, hr_b])
+
+    assert (rollup(hr_a)['assigned_count'], rollup(hr_b)['assigned_count']) == (1, 1)
+    assert reconcile_recruitment_rollup() == {}
+
+
+def test_rolled_back_status_change_leaves_counters_untouched(people):
+    hr_a, _, (s1, _, _) = people
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            upsert_recruitment_status(s1, hr_a, 'selected', None)
+            raise RuntimeError('handler failed')
+    assert all(rollup(hr_a)[column] == 0 for column in ROLLUP_COUNTERS)
+    assert reconcile_recruitment_rollup() == {}
+
+
+def test_reconcile_repairs_drift(people):
+    hr_a, _, (s1, _, _) = people
+    upsert_recruitment_status(s1, hr_a, 'shortlisted', None)
+    db.execute_query(
+        "UPDATE recruitment_rollup SET shortlisted_count = 7, assigned_count = 0 WHERE hr_id = ?", (hr_a,)
+    )
+
+    repaired = reconcile_recruitment_rollup()
+    assert repaired[hr_a]['shortlisted_count'] == (7, 1)
+    assert repaired[hr_a]['assigned_count'] == (0, 2)
+    assert rollup(hr_a)['shortlisted_count'] == 1
+    assert reconcile_recruitment_rollup() == {}
+
+
+def test_invalid_status_is_rejected(people):
+    hr_a, _, (s1, _, _) = people
+    with pytest.raises(ValueError):
+        upsert_recruitment_status(s1, hr_a, 'hired', None)
+
+
+def test_counters_follow_status_change_reassignment_and_delete(web, admin_client, people):
+    hr_a, hr_b, (s1, s2, s3) = people
+    hr_client = login(web.test_client(), user_id_of_hr(hr_a), 'hr')
+
+    # HR moves a student through the funnel
+    for status in ('viewed', 'shortlisted'):
+        assert hr_client.post(f'/api/hr/student/{s1}/status', json={'status': status}).status_code == 200
+    assert (rollup(hr_a)['total_actions'], rollup(hr_a)['shortlisted_count'], rollup(hr_a)['viewed_count']) == (1, 1, 0)
+
+    # Admin suspends an assigned student
+    assert admin_client.put(f'/api/admin/student/{s2}/status', json={'status': 'suspended'}).status_code == 200
+    assert rollup(hr_a)['assigned_count'] == 1
+
+    # Reassignment moves the count between HRs
+    response = admin_client.post('/api/admin/assign-students', json={'hrId': hr_b, 'studentIds': [s1]})
+    assert response.get_json()['changed'] == 1
+    assert (rollup(hr_a)['assigned_count'], rollup(hr_b)['assigned_count']) == (0, 2)
+
+    # Deleting a student drops it from its HR's count
+    assert admin_client.delete(f'/api/admin/student/{s3}').status_code == 200
+    assert rollup(hr_b)['assigned_count'] == 1
+
+    assert reconcile_recruitment_rollup() == {}
+
+
+def test_reconcile_job_repairs_drift(people):
+    import jobs
+    import tasks  # noqa: F401 - registers the job handlers
+
+    hr_a, hr_b, (s1, _, s3) = people
+    upsert_recruitment_status(s3, hr_b, 'selected', None)
+    db.execute_query("UPDATE recruitment_rollup SET selected_count = 0, pipeline_students = 5 WHERE hr_id = ?", (hr_b,))
+    db.execute_query("DELETE FROM recruitment_rollup WHERE hr_id = ?", (hr_a,))
+    db.commit()
+
+    job_id = jobs.enqueue('reconcile_recruitment_rollup', ['all'])
+    jobs.process_items([jobs.claim_next('test-worker')], 'test-worker')
+
+    assert jobs.get_job(job_id)['status'] == 'completed'
+    assert (rollup(hr_b)['selected_count'], rollup(hr_b)['pipeline_students']) == (1, 1)
+    assert rollup(hr_a)['assigned_count'] == 2
+    assert reconcile_recruitment_rollup() == {}
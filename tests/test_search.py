@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from database import db
+from search import index_students, search_students, search_terms
+from conftest import make_student
+
+
+def make_profiles():
+    jane = make_student('jane.doe@example.com', full_name='Jane Doe')
+    ravi = make_student('ravi_k@mail.example.org', full_name='Ravi Kumar')
+    db.execute_query("UPDATE students SET phone = ?, skills = ? WHERE id = ?",
+                     ('+91 98765-43210', json.dumps(['Python', 'SQL']), jane))
+    db.execute_query("UPDATE students SET phone = ? WHERE id = ?", ('(555) 010-0199', ravi))
+    index_students([jane, ravi])
+    db.commit()
+    return jane, ravi
+
+
+@pytest.fixture
+def profiles(any_db):
+    return make_profiles()
+
+
+def found(text):
+    hits, _ = search_students(text)
+    return [hit['id'] for hit in hits]
+
+
+def test_full_email_matches(profiles):
+    jane, ravi = profiles
+    assert found('jane.doe@example.com') == [jane]
+    assert found('ravi_k@mail.example.org') == [ravi]
+    assert sorted(found('example')) == sorted([jane, ravi])
+
+
+def test_email_parts_match_as_prefixes(profiles):
+    jane, ravi = profiles
+    assert found('jane.do') == [jane]
+    assert found('ravi_k') == [ravi]
+
+
+def test_phone_number_matches_as_typed(profiles):
+    jane, ravi = profiles
+    assert found('+91 98765-43210') == [jane]
+    assert found('98765 43210') == [jane]
+    assert found('(555) 010-0199') == [ravi]
+    assert found('555-010') == [ravi]
+
+
+def test_every_term_must_match(profiles):
+    jane, _ = profiles
+    assert found('jane python') == [jane]
+    assert found('jane kumar') == []
+
+
+def test_terms_split_on_punctuation_and_underscore():
+    assert search_terms('Jane.Doe@Example.com') == ['jane', 'doe', 'example', 'com']
+    assert search_terms('ravi_k +1-555') == ['ravi', 'k', '1', '555']
+
+
+def test_admin_search_finds_full_email(admin_client):
+    jane, _ = make_profiles()
+    response = admin_client.get('/api/admin/students/search', query_string={'q': 'jane.doe@example.com'})
+    assert response.status_code == 200
+    assert [student['id'] for student in response.get_json()['students']] == [jane]
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from database import db
+from skills import normalize_skill, skill_tokens, parse_skill_terms, set_student_skills
+from conftest import make_hr, make_student, user_id_of_hr, login
+
+
+def give_skills(student_id, skills):
+    db.execute_query("UPDATE students SET skills = ? WHERE id = ?", (json.dumps(skills), student_id))
+    set_student_skills(student_id, skills)
+
+
+@pytest.fixture
+def team(sqlite_db):
+    hr_id = make_hr('skills-hr@example.com')
+    students = {
+        name: make_student(f'{name}@example.com', full_name=name, hr_id=hr_id)
+        for name in ('Ana', 'Bo', 'Cy')
+    }
+    give_skills(students['Ana'], ['Python', '  Machine   Learning ', 'SQL'])
+    give_skills(students['Bo'], ['python', 'C++'])
+    give_skills(students['Cy'], ['Node.js'])
+    db.commit()
+    return hr_id, students
+
+
+def filter_names(web, hr_id, **params):
+    client = login(web.test_client(), user_id_of_hr(hr_id), 'hr')
+    response = client.get('/api/hr/students/filter', query_string=params)
+    assert response.status_code == 200
+    return [student['full_name'] for student in response.get_json()]
+
+
+def test_tokens_are_case_and_whitespace_normalized():
+    assert normalize_skill('  Machine \t LEARNING ') == 'machine learning'
+    assert skill_tokens(['Machine Learning', 'machine learning', 'C++', 'Node.js']) == [
+        'machine learning', 'machine', 'learning', 'c++', 'node.js'
+    ]
+    assert parse_skill_terms(' Python ,SQL,, python ') == ['python', 'sql']
+
+
+def test_all_requires_every_skill(web, team):
+    hr_id, _ = team
+    assert filter_names(web, hr_id, skills='python, sql') == ['Ana']
+    assert filter_names(web, hr_id, skills='python, sql', match='all') == ['Ana']
+
+
+def test_any_requires_one_skill(web, team):
+    hr_id, _ = team
+    assert filter_names(web, hr_id, skills='sql, c++', match='any') == ['Ana', 'Bo']
+
+
+def test_query_terms_are_normalized(web, team):
+    hr_id, _ = team
+    assert filter_names(web, hr_id, skills='  MACHINE   learning ') == ['Ana']
+    assert filter_names(web, hr_id, skills='PYTHON') == ['Ana', 'Bo']
+    assert filter_names(web, hr_id, skills='node.js') == ['Cy']
+
+
+def test_invalid_match_is_rejected(web, team):
+    hr_id, _ = team
+    client = login(web.test_client(), user_id_of_hr(hr_id), 'hr')
+    assert client.get('/api/hr/students/filter', query_string={'skills': 'python', 'match': 'most'}).status_code == 400
+
+
+def test_resetting_skills_replaces_tokens(team):
+    _, students = team
+    set_student_skills(students['Ana'], ['Go'])
+    rows = db.execute_query("SELECT skill FROM student_skills WHERE student_id = ?", (students['Ana'],), fetch_all=True)
+    assert [row['skill'] for row in rows] == ['go']
+
+
+def test_delete_student_removes_skill_rows(admin_client, team):
+    _, students = team
+    assert admin_client.delete(f"/api/admin/student/{students['Bo']}").status_code == 200
+
+    remaining = db.execute_query("SELECT DISTINCT student_id FROM student_skills ORDER BY student_id", fetch_all=True)
+    assert [row['student_id'] for row in remaining] == [students['Ana'], students['Cy']]
@@ -0,0 +1,62 @@
+import pytest
+
+from database import db
+from conftest import make_student
+
+
+@pytest.fixture
+def students(sqlite_db):
+    dates = [
+        '2024-03-01 09:00:00',
+        '2024-02-01 09:00:00',
+        '2024-02-01 09:00:00',  # tie, broken by id
+        None,
+        '2024-01-01 09:00:00',
+        None,
+    ]
+    ids = []
+    for n, registration_date in enumerate(dates):
+        student_id = make_student(f'list{n}@example.com', full_name=f'List Student {n}')
+        db.execute_query("UPDATE students SET registration_date = ? WHERE id = ?", (registration_date, student_id))
+        ids.append(student_id)
+    return ids
+
+
+def walk(client, **args):
+    """Follow next_cursor to the end and return the ids of every page"""
+    pages = []
+    cursor = None
+    while True:
+        params = dict(args, limit=2)
+        if cursor:
+            params['cursor'] = cursor
+        response = client.get('/api/admin/students', query_string=params)
+        assert response.status_code == 200
+        body = response.get_json()
+        pages.append([student['id'] for student in body['students']])
+        cursor = body['next_cursor']
+        if not cursor:
+            return pages
+
+
+def test_keyset_pages_include_students_without_a_registration_date(admin_client, students):
+    s0, s1, s2, s3, s4, s5 = students
+    pages = walk(admin_client)
+    assert pages == [[s0, s2], [s1, s4], [s5, s3]]
+
+
+def test_ascending_pages_start_with_students_without_a_registration_date(admin_client, students):
+    s0, s1, s2, s3, s4, s5 = students
+    assert walk(admin_client, order='asc') == [[s3, s5], [s4, s1], [s2, s0]]
+
+
+def test_first_page_reports_the_total(admin_client, students):
+    body = admin_client.get('/api/admin/students', query_string={'limit': 2}).get_json()
+    assert body['total'] == len(students)
+    assert body['has_more'] is True
+    assert 'sort_date' not in body['students'][0]
+
+
+def test_invalid_cursor_is_rejected(admin_client, students):
+    response = admin_client.get('/api/admin/students', query_string={'cursor': 'not-a-cursor'})
+    assert response.status_code == 400
@@ -0,0 +1,132 @@
+import sqlite3
+import psycopg2
+import pytest
+
+from database import db, is_postgres
+from search import index_students
+from conftest import insert, make_student
+
+
+def count(query, params=()):
+    return db.execute_query(query, params, fetch_one=True)['n']
+
+
+def domain_id(name):
+    return insert("INSERT INTO domains (domain_name) VALUES (?)", (name,))
+
+
+@pytest.fixture
+def client(app, sqlite_db):
+    @app.route('/write/<int:status>', methods=['POST'])
+    def write(status):
+        insert("INSERT INTO domains (domain_name) VALUES (?)", (f'Domain {status}',))
+        db.after_commit(lambda: calls.append(status))
+        return 'ok', status
+
+    calls = []
+    client = app.test_client()
+    client.calls = calls
+    return client
+
+
+def test_request_commits_on_success(client):
+    assert client.post('/write/201').status_code == 201
+    assert count("SELECT COUNT(*) AS n FROM domains WHERE domain_name = 'Domain 201'") == 1
+    assert client.calls == [201]
+
+
+def test_request_commits_on_client_error(client):
+    client.post('/write/400')
+    assert count("SELECT COUNT(*) AS n FROM domains WHERE domain_name = 'Domain 400'") == 1
+
+
+def test_request_rolls_back_on_server_error(client):
+    assert client.post('/write/500').status_code == 500
+    assert count("SELECT COUNT(*) AS n FROM domains WHERE domain_name = 'Domain 500'") == 0
+    assert client.calls == []
+
+
+def test_writes_are_invisible_until_commit(sqlite_db):
+    seen = []
+    with db.transaction():
+        domain_id('Pending domain')
+        db.after_commit(lambda: seen.append('committed'))
+        assert seen == []
+    assert seen == ['committed']
+    assert count("SELECT COUNT(*) AS n FROM domains WHERE domain_name = 'Pending domain'") == 1
+
+
+def test_transaction_rolls_back_and_drops_callbacks_on_error(sqlite_db):
+    seen = []
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            domain_id('Doomed domain')
+            db.after_commit(lambda: seen.append('committed'))
+            raise RuntimeError('boom')
+    assert seen == []
+    assert count("SELECT COUNT(*) AS n FROM domains WHERE domain_name = 'Doomed domain'") == 0
+
+
+def test_after_commit_runs_immediately_without_unit_of_work(sqlite_db):
+    seen = []
+    db.after_commit(lambda: seen.append('now'))
+    assert seen == ['now']
+
+
+def test_failing_callback_does_not_break_the_commit(sqlite_db):
+    def broken():
+        raise ValueError('callback failed')
+
+    seen = []
+    with db.transaction():
+        domain_id('Survives callbacks')
+        db.after_commit(broken)
+        db.after_commit(lambda: seen.append('second'))
+    assert seen == ['second']
+    assert count("SELECT COUNT(*) AS n FROM domains WHERE domain_name = 'Survives callbacks'") == 1
+
+
+def test_savepoint_keeps_the_transaction_usable_after_a_duplicate(any_db, app):
+    """The verify-OTP / create-student pattern: skip a duplicate domain and carry on"""
+    @app.route('/register', methods=['POST'])
+    def register():
+        student_id = make_student(f'savepoint-{id(app)}@example.com')
+        for domain in (first, first, second):
+            try:
+                with db.savepoint():
+                    db.execute_query(
+                        "INSERT INTO student_domains (student_id, domain_id) VALUES (?, ?)",
+                        (student_id, domain)
+                    )
+            except (sqlite3.IntegrityError, psycopg2.IntegrityError):
+                pass
+        index_students([student_id])
+        return str(student_id), 201
+
+    first = domain_id(f'Savepoint A {id(app)}')
+    second = domain_id(f'Savepoint B {id(app)}')
+
+    response = app.test_client().post('/register')
+    assert response.status_code == 201
+    student_id = int(response.get_data(as_text=True))
+    assert count("SELECT COUNT(*) AS n FROM student_domains WHERE student_id = ?", (student_id,)) == 2
+    search_key = 'student_id' if is_postgres() else 'rowid'
+    assert count(f"SELECT COUNT(*) AS n FROM student_search WHERE {search_key} = ?", (student_id,)) == 1
+
+    db.execute_query("DELETE FROM student_domains WHERE student_id = ?", (student_id,))
+    db.execute_query("DELETE FROM domains WHERE id IN (?, ?)", (first, second))
+
+
+def test_failed_savepoint_rolls_back_only_its_own_statements(any_db):
+    with db.transaction():
+        kept = domain_id(f'Kept {id(any_db)}')
+        with pytest.raises(Exception):
+            with db.savepoint():
+                domain_id(f'Dropped {id(any_db)}')
+                domain_id(f'Kept {id(any_db)}')  # UNIQUE(domain_name) violation
+    names = [row['domain_name'] for row in db.execute_query(
+        "SELECT domain_name FROM domains WHERE domain_name IN (?, ?)",
+        (f'Kept {id(any_db)}', f'Dropped {id(any_db)}'), fetch_all=True
+    )]
+    assert names == [f'Kept {id(any_db)}']
+    db.execute_query("DELETE FROM domains WHERE id = ?", (kept,))
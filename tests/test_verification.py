@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import utils
+import verification
+from conftest import make_student, make_certificate
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    verification._verification_cache.clear()
+    yield
+    verification._verification_cache.clear()
+
+
+@pytest.fixture
+def student(sqlite_db):
+    return make_student('verify@example.com', full_name='Asha Rao')
+
+
+def test_repeat_request_with_matching_etag_is_not_modified(web, student):
+    make_certificate(student, 'CERT-V1')
+    client = web.test_client()
+
+    first = client.get('/api/verify-certificate/CERT-V1')
+    assert first.status_code == 200
+    assert first.get_json()['valid'] is True
+
+    again = client.get('/api/verify-certificate/CERT-V1', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == first.headers['ETag']
+
+    other = client.get('/api/verify-certificate/CERT-V1', headers={'If-None-Match': '"stale"'})
+    assert other.status_code == 200
+
+
+def test_max_age_never_runs_past_expiry(web, student, monkeypatch):
+    monkeypatch.setattr(verification, 'CERT_VERIFY_CACHE_TTL', 3600)
+    make_certificate(student, 'CERT-V2', expiry_date=datetime.now() + timedelta(seconds=90))
+
+    response = web.test_client().get('/api/verify-certificate/CERT-V2')
+
+    assert response.status_code == 200
+    assert response.cache_control.public
+    assert 0 < response.cache_control.max_age <= 90
+
+
+def test_max_age_is_the_cache_ttl_before_expiry_is_near(web, student, monkeypatch):
+    monkeypatch.setattr(verification, 'CERT_VERIFY_CACHE_TTL', 60)
+    make_certificate(student, 'CERT-V3')
+
+    response = web.test_client().get('/api/verify-certificate/CERT-V3')
+    assert response.cache_control.max_age == 60
+
+
+def test_delete_certificate_invalidates_cached_result(web, admin_client, student):
+    cert_id = make_certificate(student, 'CERT-V4')
+    client = web.test_client()
+    assert client.get('/api/verify-certificate/CERT-V4').get_json()['valid'] is True
+
+    assert admin_client.delete(f'/api/admin/certificate/{cert_id}').status_code == 200
+
+    response = client.get('/api/verify-certificate/CERT-V4')
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Certificate has been revoked'
+
+
+def test_regenerate_invalidates_cached_result(web, admin_client, student, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(utils, 'generate_certificate_pdf', lambda **kwargs: kwargs['output_path'])
+    make_certificate(student, 'CERT-V5')
+    client = web.test_client()
+    assert client.get('/api/verify-certificate/CERT-V5').get_json()['valid'] is True
+
+    response = admin_client.post(f'/api/admin/certificate/regenerate/{student}')
+    assert response.status_code == 200
+    assert response.get_json()['certificate_id'] != 'CERT-V5'
+
+    assert client.get('/api/verify-certificate/CERT-V5').get_json()['message'] == 'Certificate has been revoked'
+
+
+def test_delete_student_invalidates_cached_result(web, admin_client, student):
+    make_certificate(student, 'CERT-V6')
+    client = web.test_client()
+    assert client.get('/api/verify-certificate/CERT-V6').get_json()['certificate']['full_name'] == 'Asha Rao'
+
+    assert admin_client.delete(f'/api/admin/student/{student}').status_code == 200
+
+    assert client.get('/api/verify-certificate/CERT-V6').get_json()['certificate']['full_name'] is None
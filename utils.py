@@ -3,25 +3,33 @@ import string
 import qrcode
 from io import BytesIO
 import os
-import socket
-import requests as http_requests
 from datetime import datetime, timedelta
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
 from reportlab.lib.units import inch, cm
 from reportlab.pdfgen import canvas
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.lib.utils import simpleSplit
+from reportlab import rl_config
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER
 from PIL import Image as PILImage, ImageDraw, ImageFont
 import base64
+import hashlib
+import json
 import random
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
 from dotenv import load_dotenv
+from email_templates import render_email
+from mailer import ResendProvider, SMTPProvider, send_with_providers
 
 # Load environment variables
 load_dotenv()
@@ -41,19 +49,14 @@ def generate_otp(length=6):
 
 def generate_wapl_id():
     """Generate unique WAPL ID in format WAPL2026XXXXXX"""
-    import sqlite3
-    from database import DB_NAME
+    from database import db
     
-    conn = None
     try:
-        # Connect directly
-        conn = sqlite3.connect(DB_NAME, timeout=30.0)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Get the latest WAPL ID
-        cursor.execute("SELECT wapl_id FROM students ORDER BY id DESC LIMIT 1")
-        last_student = cursor.fetchone()
+        # Get the latest WAPL ID (pooled connection, works on both backends)
+        last_student = db.execute_query(
+            "SELECT wapl_id FROM students ORDER BY id DESC LIMIT 1",
+            fetch_one=True
+        )
         
         if last_student and last_student['wapl_id']:
             # Extract number from last WAPL ID (e.g., WAPL2026000001 -> 1)
@@ -74,9 +77,11 @@ def generate_wapl_id():
         year = datetime.now().year
         random_num = random.randint(1, 999999)
         return f"WAPL{year}{random_num:06d}"
-    finally:
-        if conn:
-            conn.close()
+
+
+def certificate_verify_url(base_domain, cert_unique_id):
+    """Public verification URL encoded in a certificate's QR code"""
+    return f"{base_domain.rstrip('/')}/verify-certificate/{cert_unique_id}"
 
 
 def generate_certificate_id():
@@ -85,8 +90,7 @@ def generate_certificate_id():
     random_str = ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(6))
     return f'CERT{timestamp}{random_str}'
 
-def generate_qr_code(data, output_path):
-    """Generate QR code and save to file"""
+def _make_qr(data):
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -95,23 +99,324 @@ def generate_qr_code(data, output_path):
     )
     qr.add_data(data)
     qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    img.save(output_path)
-    return output_path
+    return qr
+
+
+def qr_matrix(data):
+    """QR modules for ``data`` as rows of booleans (True = dark), quiet zone included"""
+    return _make_qr(data).get_matrix()
+
+
+def generate_qr_code(data, output_path=None):
+    """Generate QR code PNG; saved to ``output_path`` if given, otherwise returned as bytes"""
+    img = _make_qr(data).make_image(fill_color="black", back_color="white")
+    if output_path:
+        img.save(output_path)
+        return output_path
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def draw_qr_code(c, data, x, y, size):
+    """Draw the QR code for ``data`` on ReportLab canvas ``c`` as vector modules in a size x size box at (x, y)"""
+    matrix = qr_matrix(data)
+    module = size / len(matrix)
+
+    c.saveState()
+    c.setFillColor(colors.white)
+    c.rect(x, y, size, size, stroke=0, fill=1)
+    c.setFillColor(colors.black)
+    path = c.beginPath()
+    for row_index, row in enumerate(matrix):
+        row_y = y + size - (row_index + 1) * module
+        col = 0
+        while col < len(row):
+            if not row[col]:
+                col += 1
+                continue
+            # One rectangle per horizontal run of dark modules
+            run_start = col
+            while col < len(row) and row[col]:
+                col += 1
+            path.rect(x + run_start * module, row_y, (col - run_start) * module, module)
+    c.drawPath(path, stroke=0, fill=1)
+    c.restoreState()
+
+
+def qr_image(data, size):
+    """QR code for ``data`` as a size x size PIL image, built from the matrix without a PNG round-trip"""
+    matrix = qr_matrix(data)
+    modules = len(matrix)
+    img = PILImage.new('L', (modules, modules), 255)
+    img.putdata([0 if dark else 255 for row in matrix for dark in row])
+    return img.resize((size, size), PILImage.NEAREST)
+
+
+# ==================== CERTIFICATE ASSETS ====================
+
+CERTIFICATE_TEMPLATE_PATH = 'static/certificates/certificate_wapl_id.jpg'
+FONT_BOLD_PATH = 'fonts/PlayfairDisplay-Bold.ttf'
+FONT_REGULAR_PATH = 'fonts/PlayfairDisplay-Regular.ttf'
+
+# 'vector' draws text and QR over the embedded template; 'raster' is the old flattened JPEG page
+CERTIFICATE_ENGINE = os.environ.get('CERTIFICATE_ENGINE', 'vector').lower()
+# Bump when the certificate layout code changes so cached renders are not reused
+CERTIFICATE_LAYOUT_VERSION = '1'
+# Page width in points of template-based certificates (A4 landscape); height follows the template
+CERTIFICATE_PAGE_WIDTH = 842
+# Write image and page streams as binary: ASCII85 makes them 25% larger and is slow in pure Python
+rl_config.useA85 = 0
+
+
+class TemplateRegistry:
+    """
+    Per-process cache of certificate base images and fonts.
+
+    Files are loaded once and reloaded only when their mtime changes.
+    The vector engine only needs the template's size (ReportLab copies a JPEG
+    file into the PDF without decoding it) and fonts registered with ReportLab; the raster engine uses decoded
+    images, handed out as copies because callers draw on them, and FreeType
+    fonts cached per thread since those faces are not safe to share.
+    """
+    _images = {}  # path -> (mtime, decoded RGB image)
+    _sizes = {}  # path -> (mtime, (width, height))
+    _pdf_fonts = {}  # path -> (mtime, registered ReportLab font name)
+    _digests = {}  # path -> (mtime, sha256 of the file)
+    _lock = threading.Lock()
+    _thread_fonts = threading.local()
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    @classmethod
+    def image(cls, path):
+        """Copy of the decoded image at ``path``, or None if the file is missing"""
+        mtime = cls._mtime(path)
+        if mtime is None:
+            return None
+
+        with cls._lock:
+            cached = cls._images.get(path)
+        if cached is None or cached[0] != mtime:
+            with PILImage.open(path) as source:
+                decoded = source.convert("RGB")
+            decoded.load()
+            cached = (mtime, decoded)
+            with cls._lock:
+                cls._images[path] = cached
+        return cached[1].copy()
+
+    @classmethod
+    def font(cls, path, size):
+        """FreeType font at ``path`` in ``size``; raises OSError if it cannot be loaded"""
+        fonts = getattr(cls._thread_fonts, 'fonts', None)
+        if fonts is None:
+            fonts = cls._thread_fonts.fonts = {}
+
+        mtime = cls._mtime(path)
+        cached = fonts.get((path, size))
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, ImageFont.truetype(path, size))
+            fonts[(path, size)] = cached
+        return cached[1]
+
+    @classmethod
+    def size(cls, path):
+        """(width, height) in pixels of the image at ``path``, or None if the file is missing"""
+        mtime = cls._mtime(path)
+        if mtime is None:
+            return None
+
+        with cls._lock:
+            cached = cls._sizes.get(path)
+        if cached is None or cached[0] != mtime:
+            with PILImage.open(path) as probe:  # reads the header only
+                cached = (mtime, probe.size)
+            with cls._lock:
+                cls._sizes[path] = cached
+        return cached[1]
+
+    @classmethod
+    def pdf_font(cls, path, fallback):
+        """Name of the TrueType font at ``path`` registered with ReportLab, or ``fallback`` if it cannot be loaded"""
+        mtime = cls._mtime(path)
+        if mtime is None:
+            return fallback
+
+        with cls._lock:
+            cached = cls._pdf_fonts.get(path)
+            if cached is None or cached[0] != mtime:
+                name = os.path.splitext(os.path.basename(path))[0]
+                try:
+                    pdfmetrics.registerFont(TTFont(name, path))
+                except Exception as e:
+                    print(f"⚠️ Could not load font {path}: {e}")
+                    return fallback
+                cached = (mtime, name)
+                cls._pdf_fonts[path] = cached
+        return cached[1]
+
+    @classmethod
+    def version(cls):
+        """Fingerprint of the engine, template and fonts; changes whenever rendered output would"""
+        parts = [CERTIFICATE_LAYOUT_VERSION, CERTIFICATE_ENGINE]
+        for path in (CERTIFICATE_TEMPLATE_PATH, FONT_BOLD_PATH, FONT_REGULAR_PATH):
+            mtime = cls._mtime(path)
+            with cls._lock:
+                cached = cls._digests.get(path)
+            if cached is None or cached[0] != mtime:
+                digest = None
+                if mtime is not None:
+                    with open(path, 'rb') as f:
+                        digest = hashlib.sha256(f.read()).hexdigest()
+                cached = (mtime, digest)
+                with cls._lock:
+                    cls._digests[path] = cached
+            parts.append(cached[1] or 'missing')
+        return ':'.join(parts)
+
+    @classmethod
+    def preload(cls):
+        """Warm the cache with the certificate template and fonts (e.g. in pool processes)"""
+        try:
+            if CERTIFICATE_ENGINE == 'raster':
+                cls.image(CERTIFICATE_TEMPLATE_PATH)
+                for path, size in ((FONT_BOLD_PATH, 90), (FONT_BOLD_PATH, 54), (FONT_BOLD_PATH, 44), (FONT_REGULAR_PATH, 36)):
+                    cls.font(path, size)
+            else:
+                cls.size(CERTIFICATE_TEMPLATE_PATH)
+                cls.pdf_font(FONT_BOLD_PATH, 'Helvetica-Bold')
+                cls.pdf_font(FONT_REGULAR_PATH, 'Helvetica')
+        except Exception as e:
+            print(f"⚠️ Could not preload certificate assets: {e}")
+
+
+def generate_certificate_pdf(student_name, wapl_id, domain_name, issue_date, expiry_date, qr_code_path, output_path, hr_name=None, certificate_text=None, qr_data=None):
+    """
+    Generate certificate PDF with the configured engine (see CERTIFICATE_ENGINE).
+
+    Pass ``qr_data`` to have the QR code drawn straight from its matrix;
+    ``qr_code_path`` (an existing PNG) is only used when it is not given.
+    """
+    domain_name = domain_name or 'General Training'
+    wapl_id = wapl_id or ''
+    if CERTIFICATE_ENGINE == 'raster':
+        return generate_certificate_pdf_raster(student_name, wapl_id, domain_name, issue_date, expiry_date, qr_code_path, output_path, hr_name, certificate_text, qr_data)
+    return generate_certificate_pdf_vector(student_name, wapl_id, domain_name, issue_date, expiry_date, qr_code_path, output_path, hr_name, certificate_text, qr_data)
+
+
+def _has_qr_file(qr_code_path):
+    return bool(qr_code_path) and os.path.exists(qr_code_path)
 
-def generate_certificate_pdf(student_name, wapl_id, domain_name, issue_date, expiry_date, qr_code_path, output_path, hr_name=None, certificate_text=None):
-    """Generate certificate by overlaying text on base image"""
+
+def _certificate_body_text(domain_name, certificate_text):
+    if certificate_text:
+        return certificate_text
+    return f"This certificate recognizes the candidate's hands-on experience in {domain_name} and successful assessment by WAPL."
+
+
+def generate_certificate_pdf_vector(student_name, wapl_id, domain_name, issue_date, expiry_date, qr_code_path, output_path, hr_name=None, certificate_text=None, qr_data=None):
+    """
+    Generate certificate with the base image embedded once and everything else
+    drawn as PDF text on top of it, instead of flattening the page into a JPEG.
+
+    Coordinates are the raster layout's (template pixels, y down) scaled to
+    points, so both engines place text in the same spots.
+    """
     try:
-        # Use base certificate image from static folder (tracked by git)
-        base_image_path = 'static/certificates/certificate_wapl_id.jpg'
+        template_size = TemplateRegistry.size(CERTIFICATE_TEMPLATE_PATH)
+
+        if template_size is None:
+            # Fallback to ReportLab layout if template missing
+            return generate_certificate_pdf_reportlab(student_name, wapl_id, domain_name, issue_date, expiry_date, qr_code_path, output_path, hr_name, certificate_text, qr_data)
+
+        w, h = template_size
+        scale = CERTIFICATE_PAGE_WIDTH / w
+        page_w, page_h = w * scale, h * scale
+
+        c = canvas.Canvas(output_path, pagesize=(page_w, page_h))
+        # Given a path, ReportLab embeds the JPEG stream as-is (no decode / re-encode)
+        c.drawImage(CERTIFICATE_TEMPLATE_PATH, 0, 0, width=page_w, height=page_h)
+
+        GOLD = colors.HexColor("#8a6a2f")
+        BLUE = colors.HexColor("#1f2b44")
+        BLACK = colors.black
+
+        bold = TemplateRegistry.pdf_font(FONT_BOLD_PATH, 'Helvetica-Bold')
+        regular = TemplateRegistry.pdf_font(FONT_REGULAR_PATH, 'Helvetica')
+
+        def draw(text, x, y, font, size, color, anchor):
+            """Draw like PIL's draw.text: (x, y) in template pixels, anchor 'mm', 'ma' or 'la'"""
+            size *= scale
+            ascent, descent = pdfmetrics.getAscentDescent(font, size)
+            top = page_h - y * scale
+            baseline = top - (ascent + descent) / 2 if anchor == 'mm' else top - ascent
+            c.setFont(font, size)
+            c.setFillColor(color)
+            if anchor == 'la':
+                c.drawString(x * scale, baseline, text)
+            else:
+                c.drawCentredString(x * scale, baseline, text)
+
+        cx = w // 2  # Center X
+
+        # Title text
+        draw("This certificate is proudly presented to", cx, 395, bold, 54, GOLD, 'mm')
+
+        # Student name (prominent)
+        draw(student_name.upper(), cx, 480, bold, 90, BLUE, 'mm')
+
+        # Body text with wrapping
+        body_text = _certificate_body_text(domain_name, certificate_text)
+        body_y = 580
+        for line in simpleSplit(body_text, bold, 44 * scale, (w - 400) * scale):
+            draw(line, cx, body_y, bold, 44, GOLD, 'ma')
+            body_y += 58  # Line spacing
+
+        # Bottom section coordinates
+        left_x = 180
+        base_y = h - 300
+
+        # Issue and expiry dates
+        draw(f"Valid From: {issue_date}", left_x, base_y, regular, 36, BLACK, 'la')
+        draw(f"Valid Until: {expiry_date}", left_x, base_y + 50, regular, 36, BLACK, 'la')
+        draw(f"WAPL ID: {wapl_id}", left_x, base_y + 100, regular, 36, BLACK, 'la')
+
+        # HR name (if provided)
+        if hr_name:
+            draw(f"Issued by: {hr_name}", left_x, base_y + 150, regular, 36, BLACK, 'la')
+
+        # QR Code
+        qr_x, qr_y, qr_size = (w - 400) * scale, page_h - (base_y - 80 + 220) * scale, 220 * scale
+        if qr_data:
+            draw_qr_code(c, qr_data, qr_x, qr_y, qr_size)
+        elif _has_qr_file(qr_code_path):
+            c.drawImage(qr_code_path, qr_x, qr_y, width=qr_size, height=qr_size)
+
+        c.save()
+        return output_path
+
+    except Exception as e:
+        print(f"Error generating certificate: {str(e)}")
+        # Fallback to ReportLab layout
+        return generate_certificate_pdf_reportlab(student_name, wapl_id, domain_name, issue_date, expiry_date, qr_code_path, output_path, hr_name, certificate_text, qr_data)
+
+
+def generate_certificate_pdf_raster(student_name, wapl_id, domain_name, issue_date, expiry_date, qr_code_path, output_path, hr_name=None, certificate_text=None, qr_data=None):
+    """Generate certificate by overlaying text on base image and saving the page as one JPEG"""
+    try:
+        # Use base certificate image from static folder (decoded once per process)
+        img = TemplateRegistry.image(CERTIFICATE_TEMPLATE_PATH)
         
-        if not os.path.exists(base_image_path):
+        if img is None:
             # Fallback to ReportLab if template missing
-            return generate_certificate_pdf_reportlab(student_name, wapl_id, domain_name, issue_date, expiry_date, qr_code_path, output_path, hr_name, certificate_text)
+            return generate_certificate_pdf_reportlab(student_name, wapl_id, domain_name, issue_date, expiry_date, qr_code_path, output_path, hr_name, certificate_text, qr_data)
         
-        # Open base image
-        img = PILImage.open(base_image_path).convert("RGB")
         draw = ImageDraw.Draw(img)
         
         w, h = img.size
@@ -122,12 +427,12 @@ def generate_certificate_pdf(student_name, wapl_id, domain_name, issue_date, exp
         BLUE = "#1f2b44"
         BLACK = "black"
         
-        # Load fonts - adjust paths if needed
+        # Load fonts (parsed once per process and thread)
         try:
-            name_font = ImageFont.truetype("fonts/PlayfairDisplay-Bold.ttf", 90)
-            title_font = ImageFont.truetype("fonts/PlayfairDisplay-Bold.ttf", 54)
-            body_font = ImageFont.truetype("fonts/PlayfairDisplay-Bold.ttf", 44)
-            small_font = ImageFont.truetype("fonts/PlayfairDisplay-Regular.ttf", 36)
+            name_font = TemplateRegistry.font(FONT_BOLD_PATH, 90)
+            title_font = TemplateRegistry.font(FONT_BOLD_PATH, 54)
+            body_font = TemplateRegistry.font(FONT_BOLD_PATH, 44)
+            small_font = TemplateRegistry.font(FONT_REGULAR_PATH, 36)
         except:
             # Fallback to default if fonts not found
             name_font = ImageFont.load_default()
@@ -142,10 +447,7 @@ def generate_certificate_pdf(student_name, wapl_id, domain_name, issue_date, exp
         draw.text((cx, 480), student_name.upper(), BLUE, name_font, anchor="mm")
         
         # Body text with wrapping
-        if certificate_text:
-            body_text = certificate_text
-        else:
-            body_text = f"This certificate recognizes the candidate's hands-on experience in {domain_name} and successful assessment by WAPL."
+        body_text = _certificate_body_text(domain_name, certificate_text)
         
         # Simple text wrapping
         wrapped_lines = []
@@ -186,7 +488,9 @@ def generate_certificate_pdf(student_name, wapl_id, domain_name, issue_date, exp
             draw.text((left_x, base_y + 150), f"Issued by: {hr_name}", BLACK, small_font)
         
         # QR Code
-        if os.path.exists(qr_code_path):
+        if qr_data:
+            img.paste(qr_image(qr_data, 220), (w - 400, base_y - 80))
+        elif _has_qr_file(qr_code_path):
             qr_img = PILImage.open(qr_code_path)
             qr_img = qr_img.resize((220, 220))
             img.paste(qr_img, (w - 400, base_y - 80))
@@ -199,10 +503,10 @@ def generate_certificate_pdf(student_name, wapl_id, domain_name, issue_date, exp
     except Exception as e:
         print(f"Error generating certificate: {str(e)}")
         # Fallback to ReportLab
-        return generate_certificate_pdf_reportlab(student_name, wapl_id, domain_name, issue_date, expiry_date, qr_code_path, output_path, hr_name, certificate_text)
+        return generate_certificate_pdf_reportlab(student_name, wapl_id, domain_name, issue_date, expiry_date, qr_code_path, output_path, hr_name, certificate_text, qr_data)
 
 
-def generate_certificate_pdf_reportlab(student_name, wapl_id, domain_name, issue_date, expiry_date, qr_code_path, output_path, hr_name=None, certificate_text=None):
+def generate_certificate_pdf_reportlab(student_name, wapl_id, domain_name, issue_date, expiry_date, qr_code_path, output_path, hr_name=None, certificate_text=None, qr_data=None):
     """Fallback: Generate professional PDF certificate using ReportLab"""
     # Create custom canvas
     c = canvas.Canvas(output_path, pagesize=A4)
@@ -289,7 +593,6 @@ def generate_certificate_pdf_reportlab(student_name, wapl_id, domain_name, issue
         c.setFont("Helvetica", 10)
         c.setFillColor(colors.HexColor('#424242'))
         # Wrap text
-        from reportlab.lib.utils import simpleSplit
         lines = simpleSplit(certificate_text, "Helvetica", 10, width - 4*cm)
         text_y = height - 13*cm
         for line in lines[:4]:  # Max 4 lines
@@ -297,10 +600,13 @@ def generate_certificate_pdf_reportlab(student_name, wapl_id, domain_name, issue
             text_y -= 0.5*cm
     
     # QR Code section
-    if os.path.exists(qr_code_path):
+    if qr_data or _has_qr_file(qr_code_path):
         qr_x = width/2 - 1.2*cm
         qr_y = height - 15.5*cm
-        c.drawImage(qr_code_path, qr_x, qr_y, width=2.4*cm, height=2.4*cm)
+        if qr_data:
+            draw_qr_code(c, qr_data, qr_x, qr_y, 2.4*cm)
+        else:
+            c.drawImage(qr_code_path, qr_x, qr_y, width=2.4*cm, height=2.4*cm)
         
         c.setFont("Helvetica", 9)
         c.setFillColor(colors.HexColor('#666666'))
@@ -315,6 +621,111 @@ def generate_certificate_pdf_reportlab(student_name, wapl_id, domain_name, issue
     c.save()
     return output_path
 
+# ==================== PARALLEL CERTIFICATE RENDERING ====================
+
+CERTIFICATE_RENDER_PROCESSES = int(os.environ.get('CERTIFICATE_RENDER_PROCESSES', os.cpu_count() or 1))
+
+_render_pool = None
+_render_pool_pid = None
+_render_pool_lock = threading.Lock()
+
+
+def certificate_content_hash(base_domain, student_name, wapl_id, domain_name, issue_date, expiry_date, hr_name=None, certificate_text=None):
+    """
+    Hash of everything a rendered certificate depends on, apart from its own id.
+
+    Dates are the strings printed on the certificate. Two renders with the
+    same hash differ only in the certificate id inside the QR code, so an
+    active certificate with a matching hash can be reused as it is.
+    """
+    inputs = [TemplateRegistry.version(), base_domain.rstrip('/'), student_name, wapl_id,
+              domain_name, str(issue_date), str(expiry_date), hr_name, certificate_text]
+    return hashlib.sha256(json.dumps(inputs).encode('utf-8')).hexdigest()
+
+
+def certificate_render_job(cert_unique_id, base_domain, student_name, wapl_id, domain_name, issue_date, expiry_date, hr_name=None, certificate_text=None):
+    """Describe one certificate as a picklable dict for render_certificates()"""
+    qr_data = certificate_verify_url(base_domain, cert_unique_id)
+    issue_date, expiry_date = issue_date.strftime('%d %B %Y'), expiry_date.strftime('%d %B %Y')
+    return {
+        'qr_data': qr_data,
+        'content_hash': certificate_content_hash(base_domain, student_name, wapl_id, domain_name, issue_date, expiry_date, hr_name, certificate_text),
+        'certificate': {
+            'student_name': student_name,
+            'wapl_id': wapl_id,
+            'domain_name': domain_name,
+            'issue_date': issue_date,
+            'expiry_date': expiry_date,
+            'qr_code_path': None,
+            'qr_data': qr_data,
+            'output_path': f'uploads/certificates/{cert_unique_id}.pdf',
+            'hr_name': hr_name,
+            'certificate_text': certificate_text
+        }
+    }
+
+
+def render_certificate_job(job):
+    """Render one job from certificate_render_job(); runs inside a pool process"""
+    os.makedirs(os.path.dirname(job['certificate']['output_path']), exist_ok=True)
+    return generate_certificate_pdf(**job['certificate'])
+
+
+def _get_render_pool():
+    global _render_pool, _render_pool_pid
+    with _render_pool_lock:
+        # A pool inherited through fork() is unusable in the child
+        if _render_pool is None or _render_pool_pid != os.getpid():
+            _render_pool = ProcessPoolExecutor(
+                max_workers=CERTIFICATE_RENDER_PROCESSES,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=TemplateRegistry.preload
+            )
+            _render_pool_pid = os.getpid()
+        return _render_pool
+
+
+def _reset_render_pool(broken_pool):
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is broken_pool:
+            _render_pool = None
+    broken_pool.shutdown(wait=False)
+
+
+def render_certificates(jobs):
+    """
+    Render many certificates in parallel on a process pool sized to the cores.
+    Returns one result per job, in order: {'ok': True, 'output_path': ...}
+    or {'ok': False, 'error': '...'} - one failure never affects the others.
+    """
+    if not jobs:
+        return []
+
+    if len(jobs) == 1 or CERTIFICATE_RENDER_PROCESSES <= 1:
+        results = []
+        for job in jobs:
+            try:
+                results.append({'ok': True, 'output_path': render_certificate_job(job)})
+            except Exception as e:
+                results.append({'ok': False, 'error': str(e)})
+        return results
+
+    pool = _get_render_pool()
+    futures = [pool.submit(render_certificate_job, job) for job in jobs]
+
+    results = []
+    for future in futures:
+        try:
+            results.append({'ok': True, 'output_path': future.result()})
+        except BrokenProcessPool as e:
+            _reset_render_pool(pool)
+            results.append({'ok': False, 'error': f'Renderer process crashed: {e}'})
+        except Exception as e:
+            results.append({'ok': False, 'error': str(e)})
+    return results
+
+
 def send_email_simulation(to_email, subject, body):
     """Simulate email sending (console log for now)"""
     print(f"\n{'='*60}")
@@ -326,134 +737,48 @@ def send_email_simulation(to_email, subject, body):
     print(f"{'='*60}\n")
 
 
-def send_email_resend(to_email, subject, body, html_body=None):
-    """Send email using Resend API (works on Railway where SMTP is blocked)"""
-    if not RESEND_API_KEY:
-        print("📧 Resend API key not configured, skipping...", flush=True)
-        return False
-    
-    try:
-        print(f"📧 Sending via Resend API to: {to_email}", flush=True)
-        
-        payload = {
-            "from": f"{MAIL_SENDER_NAME} <{RESEND_FROM_EMAIL}>",
-            "to": [to_email],
-            "subject": subject,
-        }
-        
-        if html_body:
-            payload["html"] = html_body
-        else:
-            payload["text"] = body
-        
-        response = http_requests.post(
-            "https://api.resend.com/emails",
-            headers={
-                "Authorization": f"Bearer {RESEND_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            json=payload,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            print(f"✅ Email sent successfully via Resend to {to_email}", flush=True)
-            return True
-        else:
-            print(f"❌ Resend API error: {response.status_code} - {response.text}", flush=True)
-            return False
-            
-    except Exception as e:
-        print(f"❌ Resend error: {str(e)}", flush=True)
-        return False
+_email_providers = {}
+_email_providers_lock = threading.Lock()
 
 
-def send_email_gmail(to_email, subject, body, html_body=None, attachment_path=None):
-    """Send email - tries Resend API first, then Gmail SMTP, then simulation"""
-    
-    # Try Resend API first (works on Railway where SMTP is blocked)
-    if RESEND_API_KEY:
-        if send_email_resend(to_email, subject, body, html_body):
-            return True
-        print("📧 Resend failed, trying Gmail SMTP...", flush=True)
-    
-    try:
-        # Debug logging
-        print(f"📧 Attempting to send email via Gmail SMTP to: {to_email}", flush=True)
-        print(f"📧 GMAIL_EMAIL configured: {'Yes' if GMAIL_EMAIL else 'No'}", flush=True)
-        print(f"📧 GMAIL_PASSWORD configured: {'Yes (' + str(len(GMAIL_PASSWORD)) + ' chars)' if GMAIL_PASSWORD else 'No'}", flush=True)
-        
-        # Verify credentials are set
-        if not GMAIL_EMAIL or not GMAIL_PASSWORD:
-            print("⚠️ WARNING: Gmail credentials not configured!", flush=True)
-            print(f"GMAIL_USER/GMAIL_EMAIL: {GMAIL_EMAIL or 'NOT SET'}")
-            print(f"GMAIL_APP_PASSWORD/GMAIL_PASSWORD: {'SET' if GMAIL_PASSWORD else 'NOT SET'}")
-            print(f"GMAIL_APP_PASSWORD/GMAIL_PASSWORD: {'SET' if GMAIL_PASSWORD else 'NOT SET'}")
-            # Fallback to simulation
-            send_email_simulation(to_email, subject, body)
-            return False
-        
-        # Create message
-        message = MIMEMultipart('alternative')
-        message['From'] = f"{MAIL_SENDER_NAME} <{GMAIL_EMAIL}>"
-        message['To'] = to_email
-        message['Subject'] = subject
-        
-        # Attach plain text body
-        message.attach(MIMEText(body, 'plain'))
-        
-        # Attach HTML body if provided
-        if html_body:
-            message.attach(MIMEText(html_body, 'html'))
-        
-        # Attach file if provided
-        if attachment_path and os.path.exists(attachment_path):
-            with open(attachment_path, 'rb') as attachment:
-                part = MIMEBase('application', 'octet-stream')
-                part.set_payload(attachment.read())
-                encoders.encode_base64(part)
-                part.add_header('Content-Disposition', f'attachment; filename= {os.path.basename(attachment_path)}')
-                message.attach(part)
-        
-        # Send email via Gmail SMTP with timeout
-        # Try port 587 with STARTTLS first (more compatible with cloud platforms)
-        print(f"📧 Connecting to smtp.gmail.com:587 (STARTTLS)...", flush=True)
-        try:
-            smtp_server = smtplib.SMTP('smtp.gmail.com', 587, timeout=30)
-            smtp_server.ehlo()
-            smtp_server.starttls()
-            smtp_server.ehlo()
-        except Exception as e1:
-            print(f"📧 Port 587 failed ({e1}), trying port 465 (SSL)...", flush=True)
-            smtp_server = smtplib.SMTP_SSL('smtp.gmail.com', 465, timeout=30)
-        
-        print(f"📧 Connected! Logging in as {GMAIL_EMAIL}...", flush=True)
-        smtp_server.login(GMAIL_EMAIL, GMAIL_PASSWORD)
-        print(f"📧 Login successful! Sending message...", flush=True)
-        smtp_server.send_message(message)
-        smtp_server.quit()
-        
-        print(f"✅ Email sent successfully to {to_email}", flush=True)
-        return True
-        
-    except smtplib.SMTPAuthenticationError as e:
-        print(f"❌ Gmail authentication failed! Error: {e}", flush=True)
-        print("Please check your GMAIL_USER and GMAIL_APP_PASSWORD")
-        print("Note: Use Gmail App Password, not your regular password")
-        print("Generate at: https://myaccount.google.com/apppasswords")
-        return False
-    
-    except socket.timeout:
-        print(f"❌ SMTP connection timeout! Gmail SMTP might be blocked.", flush=True)
-        return False
+def email_providers():
+    """Configured email providers in the order they are tried: Resend, then Gmail SMTP"""
+    config = (RESEND_API_KEY, RESEND_FROM_EMAIL, GMAIL_EMAIL, GMAIL_PASSWORD, MAIL_SENDER_NAME)
+    with _email_providers_lock:
+        providers = _email_providers.get(config)
+        if providers is None:
+            providers = []
+            if RESEND_API_KEY:
+                providers.append(ResendProvider(RESEND_API_KEY, f"{MAIL_SENDER_NAME} <{RESEND_FROM_EMAIL}>"))
+            if GMAIL_EMAIL and GMAIL_PASSWORD:
+                providers.append(SMTPProvider(GMAIL_EMAIL, GMAIL_PASSWORD, f"{MAIL_SENDER_NAME} <{GMAIL_EMAIL}>"))
+            _email_providers.clear()
+            _email_providers[config] = providers
+        return providers
 
-    except Exception as e:
-        print(f"❌ Error sending email: {str(e)}", flush=True)
-        import traceback
-        traceback.print_exc()
-        print(f"Falling back to simulation...")
-        send_email_simulation(to_email, subject, body)
-        return False
+
+def queue_email(to_email, subject, text_body, html_body=None):
+    """Queue an email in the outbox; background senders deliver it with retries (see outbox.py)"""
+    from outbox import enqueue_email  # outbox imports utils for delivery
+    enqueue_email(to_email, subject, text_body, html_body)
+    return True
+
+
+def send_email_batch(messages):
+    """
+    Send many emails, given as dicts with to_email, subject, text_body and html_body.
+
+    Resend takes them in batch calls; whatever it cannot deliver goes out over
+    pooled SMTP sessions (see mailer.py). Returns one bool per message.
+    """
+    providers = email_providers()
+    if not providers:
+        print("⚠️ WARNING: No email provider configured (RESEND_API_KEY or Gmail credentials)!", flush=True)
+        for message in messages:
+            send_email_simulation(message['to_email'], message['subject'], message['text_body'])
+        return [False] * len(messages)
+    
+    return [error is None for error in send_with_providers(providers, messages)]
 
 
 def debug_gmail_connection(to_email):
@@ -507,411 +832,36 @@ def debug_gmail_connection(to_email):
 
 
 def send_otp_email(to_email, otp_code, full_name="User"):
-    """Send OTP email with professional HTML template"""
-    subject = "WAPL Registration - OTP Verification"
-    
-    # Plain text body
-    text_body = f"""
-Hello {full_name},
-
-Your OTP for WAPL Registration is: {otp_code}
-
-This OTP is valid for 10 minutes.
-
-If you did not request this OTP, please ignore this email.
-
-Best regards,
-WAPL System
-"""
-    
-    # HTML body with styling
-    html_body = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <style>
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            line-height: 1.6;
-            color: #333;
-        }}
-        .container {{
-            max-width: 600px;
-            margin: 0 auto;
-            padding: 20px;
-            border: 1px solid #ddd;
-            border-radius: 8px;
-            background-color: #f9f9f9;
-        }}
-        .header {{
-            background-color: #1f2b44;
-            color: white;
-            padding: 20px;
-            border-radius: 8px 8px 0 0;
-            text-align: center;
-        }}
-        .header h2 {{
-            margin: 0;
-            font-size: 24px;
-        }}
-        .content {{
-            padding: 20px;
-            background-color: white;
-        }}
-        .otp-box {{
-            background-color: #f0f0f0;
-            border: 2px solid #1f2b44;
-            padding: 20px;
-            text-align: center;
-            border-radius: 8px;
-            margin: 20px 0;
-        }}
-        .otp-code {{
-            font-size: 36px;
-            font-weight: bold;
-            color: #1f2b44;
-            letter-spacing: 5px;
-            font-family: 'Courier New', monospace;
-        }}
-        .validity {{
-            color: #e74c3c;
-            font-weight: bold;
-            margin-top: 10px;
-        }}
-        .footer {{
-            text-align: center;
-            padding: 20px;
-            color: #666;
-            font-size: 12px;
-            border-top: 1px solid #ddd;
-        }}
-        .warning {{
-            background-color: #fff3cd;
-            border: 1px solid #ffc107;
-            color: #856404;
-            padding: 10px;
-            border-radius: 4px;
-            margin: 15px 0;
-            font-size: 14px;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h2>WAPL Registration</h2>
-        </div>
-        <div class="content">
-            <p>Hello <strong>{full_name}</strong>,</p>
-            
-            <p>Thank you for registering with WAPL (Student Portfolio and Placement Management System)!</p>
-            
-            <p>Your OTP (One-Time Password) for email verification is:</p>
-            
-            <div class="otp-box">
-                <div class="otp-code">{otp_code}</div>
-                <div class="validity">⏱️ Valid for 10 minutes</div>
-            </div>
-            
-            <div class="warning">
-                <strong>🔒 Security Notice:</strong> Never share this OTP with anyone. WAPL team will never ask for your OTP.
-            </div>
-            
-            <p>If you did not request this OTP, you can safely ignore this email.</p>
-            
-            <p>Need help? Contact our support team.</p>
-            
-            <p>Best regards,<br><strong>WAPL System</strong></p>
-        </div>
-        <div class="footer">
-            <p>This is an automated email. Please do not reply to this message.</p>
-            <p>&copy; 2026 WAPL - Student Portfolio and Placement Management System</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
-    
-    return send_email_gmail(to_email, subject, text_body, html_body)
+    """Send OTP email (templates/email/otp.html)"""
+    html_body, text_body = render_email('otp.html', full_name=full_name, otp_code=otp_code)
+    return queue_email(to_email, "WAPL Registration - OTP Verification", text_body, html_body)
 
 
 def send_registration_confirmation_email(to_email, full_name, wapl_id):
-    """Send registration confirmation email"""
-    subject = "WAPL Registration Successful"
-    
-    text_body = f"""
-Hello {full_name},
-
-Congratulations! Your registration with WAPL is complete.
-
-Your WAPL ID: {wapl_id}
-
-Your account is currently pending admin approval. You will receive an email once your account is activated.
-
-Best regards,
-WAPL System
-"""
-    
-    html_body = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <style>
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            line-height: 1.6;
-            color: #333;
-        }}
-        .container {{
-            max-width: 600px;
-            margin: 0 auto;
-            padding: 20px;
-            border: 1px solid #ddd;
-            border-radius: 8px;
-            background-color: #f9f9f9;
-        }}
-        .header {{
-            background-color: #27ae60;
-            color: white;
-            padding: 20px;
-            border-radius: 8px 8px 0 0;
-            text-align: center;
-        }}
-        .header h2 {{
-            margin: 0;
-            font-size: 24px;
-        }}
-        .content {{
-            padding: 20px;
-            background-color: white;
-        }}
-        .wapl-id-box {{
-            background-color: #ecf0f1;
-            border: 2px solid #27ae60;
-            padding: 15px;
-            text-align: center;
-            border-radius: 8px;
-            margin: 15px 0;
-        }}
-        .wapl-id {{
-            font-size: 24px;
-            font-weight: bold;
-            color: #27ae60;
-            font-family: 'Courier New', monospace;
-        }}
-        .info-box {{
-            background-color: #e8f4f8;
-            border-left: 4px solid #3498db;
-            padding: 15px;
-            margin: 15px 0;
-        }}
-        .footer {{
-            text-align: center;
-            padding: 20px;
-            color: #666;
-            font-size: 12px;
-            border-top: 1px solid #ddd;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h2>✅ Registration Successful</h2>
-        </div>
-        <div class="content">
-            <p>Hello <strong>{full_name}</strong>,</p>
-            
-            <p>Congratulations! Your registration with WAPL is complete. We're excited to have you on board!</p>
-            
-            <p>Your unique WAPL ID is:</p>
-            <div class="wapl-id-box">
-                <div class="wapl-id">{wapl_id}</div>
-            </div>
-            
-            <div class="info-box">
-                <strong>ℹ️ Next Step:</strong> Your account is currently pending admin approval. You will receive an email notification once your account is activated and ready to use.
-            </div>
-            
-            <p>Thank you for joining WAPL - Student Portfolio and Placement Management System!</p>
-            
-            <p>Best regards,<br><strong>WAPL System</strong></p>
-        </div>
-        <div class="footer">
-            <p>This is an automated email. Please do not reply to this message.</p>
-            <p>&copy; 2026 WAPL</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
-    
-    return send_email_gmail(to_email, subject, text_body, html_body)
+    """Send registration confirmation email (templates/email/registration_confirmation.html)"""
+    html_body, text_body = render_email('registration_confirmation.html', full_name=full_name, wapl_id=wapl_id)
+    return queue_email(to_email, "WAPL Registration Successful", text_body, html_body)
 
 
 def send_account_activation_email(to_email, full_name, wapl_id):
-    """Send account activation email when admin approves student"""
-    subject = "WAPL Account Activated - Ready to Use"
-    
-    text_body = f"""
-Hello {full_name},
-
-Great news! Your WAPL account has been activated by the admin.
-
-Your WAPL ID: {wapl_id}
-
-Your account is now active and ready to use. You can now:
-- Access your student dashboard
-- View your portfolio
-- Participate in recruitment activities
-- Download your certificates
-
-You can log in using your registered email and password.
-
-Best regards,
-WAPL System
-"""
-    
-    html_body = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <style>
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            line-height: 1.6;
-            color: #333;
-        }}
-        .container {{
-            max-width: 600px;
-            margin: 0 auto;
-            padding: 20px;
-            border: 1px solid #ddd;
-            border-radius: 8px;
-            background-color: #f9f9f9;
-        }}
-        .header {{
-            background-color: #27ae60;
-            color: white;
-            padding: 20px;
-            border-radius: 8px 8px 0 0;
-            text-align: center;
-        }}
-        .header h2 {{
-            margin: 0;
-            font-size: 24px;
-        }}
-        .content {{
-            padding: 20px;
-            background-color: white;
-        }}
-        .success-message {{
-            background-color: #d4edda;
-            border: 1px solid #c3e6cb;
-            color: #155724;
-            padding: 15px;
-            border-radius: 8px;
-            margin: 15px 0;
-            text-align: center;
-            font-size: 18px;
-            font-weight: bold;
-        }}
-        .wapl-id-box {{
-            background-color: #ecf0f1;
-            border: 2px solid #27ae60;
-            padding: 15px;
-            text-align: center;
-            border-radius: 8px;
-            margin: 15px 0;
-        }}
-        .wapl-id {{
-            font-size: 24px;
-            font-weight: bold;
-            color: #27ae60;
-            font-family: 'Courier New', monospace;
-        }}
-        .features {{
-            background-color: #e8f4f8;
-            border-left: 4px solid #3498db;
-            padding: 15px;
-            margin: 15px 0;
-        }}
-        .features ul {{
-            margin: 10px 0;
-            padding-left: 20px;
-        }}
-        .features li {{
-            margin: 8px 0;
-        }}
-        .cta-button {{
-            display: inline-block;
-            background-color: #27ae60;
-            color: white;
-            padding: 12px 30px;
-            text-decoration: none;
-            border-radius: 5px;
-            margin-top: 20px;
-            font-weight: bold;
-        }}
-        .footer {{
-            text-align: center;
-            padding: 20px;
-            color: #666;
-            font-size: 12px;
-            border-top: 1px solid #ddd;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h2>✅ Account Activated</h2>
-        </div>
-        <div class="content">
-            <p>Hello <strong>{full_name}</strong>,</p>
-            
-            <div class="success-message">
-                🎉 Your WAPL account has been activated!
-            </div>
-            
-            <p>Congratulations! The admin has reviewed and approved your registration. Your account is now active and ready to use.</p>
-            
-            <p>Your WAPL ID:</p>
-            <div class="wapl-id-box">
-                <div class="wapl-id">{wapl_id}</div>
-            </div>
-            
-            <div class="features">
-                <strong>✨ What you can now do:</strong>
-                <ul>
-                    <li>Access your personalized student dashboard</li>
-                    <li>Build and manage your portfolio</li>
-                    <li>Participate in recruitment activities</li>
-                    <li>Download your certificates</li>
-                    <li>Update your profile and skills</li>
-                </ul>
-            </div>
-            
-            <p><strong>How to get started:</strong></p>
-            <p>Log in to your account using your registered email and password. You'll be directed to your personalized dashboard.</p>
-            
-            <p>If you have any questions or need assistance, please contact our support team.</p>
-            
-            <p>Best regards,<br><strong>WAPL System</strong></p>
-        </div>
-        <div class="footer">
-            <p>This is an automated email. Please do not reply to this message.</p>
-            <p>&copy; 2026 WAPL - Student Portfolio and Placement Management System</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
-    
-    return send_email_gmail(to_email, subject, text_body, html_body)
+    """Send account activation email when admin approves student (templates/email/account_activation.html)"""
+    html_body, text_body = render_email('account_activation.html', full_name=full_name, wapl_id=wapl_id)
+    return queue_email(to_email, "WAPL Account Activated - Ready to Use", text_body, html_body)
+
+
+def send_account_activation_emails(students):
+    """Queue activation emails for many students (dicts with email, full_name, wapl_id) in one batch"""
+    from outbox import enqueue_emails  # outbox imports utils for delivery
+    messages = []
+    for student in students:
+        html_body, text_body = render_email('account_activation.html', full_name=student['full_name'], wapl_id=student['wapl_id'])
+        messages.append({
+            'to_email': student['email'],
+            'subject': "WAPL Account Activated - Ready to Use",
+            'text_body': text_body,
+            'html_body': html_body
+        })
+    return enqueue_emails(messages)
 
 def sanitize_input(text):
     """Sanitize input to prevent XSS"""
@@ -924,6 +874,21 @@ def allowed_file(filename, allowed_extensions):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
+def encode_cursor(*values):
+    """Opaque pagination cursor for the sort-key values of the last row on a page"""
+    raw = json.dumps([str(value) if isinstance(value, datetime) else value for value in values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, size):
+    """Inverse of encode_cursor; raises ValueError for anything malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    return values
+
 from storage import Storage
 
 def save_uploaded_file(file, upload_folder, user_id, file_type):
@@ -0,0 +1,110 @@
+"""
+Public certificate verification results, cached per process.
+
+Every QR scan hits /verify-certificate/<id>; results are cached by
+certificate_unique_id for CERT_VERIFY_CACHE_TTL seconds, never past the
+certificate's expiry (so it flips to 'expired' on time). Revoking or replacing
+a certificate invalidates its entry after the transaction commits; other
+worker processes pick the change up within the TTL.
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+from database import db, is_postgres
+from cache import TTLCache
+
+CERT_VERIFY_CACHE_TTL = float(os.environ.get('CERT_VERIFY_CACHE_TTL', 60))
+CERT_VERIFY_CACHE_SIZE = int(os.environ.get('CERT_VERIFY_CACHE_SIZE', 4096))
+# Unknown ids (typos, probing) are remembered briefly so bursts do not reach the database
+CERT_VERIFY_MISS_TTL = float(os.environ.get('CERT_VERIFY_MISS_TTL', 30))
+
+_verification_cache = TTLCache(ttl=CERT_VERIFY_CACHE_TTL, maxsize=CERT_VERIFY_CACHE_SIZE)
+
+
+def _as_datetime(value):
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    return value
+
+
+def _load(cert_id):
+    certificate = db.execute_query(
+        '''SELECT c.*, s.full_name, s.wapl_id
+           FROM certificates c
+           LEFT JOIN students s ON c.student_id = s.id
+           WHERE c.certificate_unique_id = ?''',
+        (cert_id,),
+        fetch_one=True
+    )
+    if not certificate:
+        return _result('not_found', None, None)
+
+    cert_dict = dict(certificate)
+    # Domains come from the student_domains junction, like the printed certificate
+    domains = db.execute_query(
+        '''SELECT d.domain_name FROM student_domains sd
+           JOIN domains d ON sd.domain_id = d.id
+           WHERE sd.student_id = ?
+           ORDER BY d.domain_name''',
+        (cert_dict['student_id'],),
+        fetch_all=True
+    )
+    cert_dict['domain_name'] = ', '.join(row['domain_name'] for row in domains) or None
+
+    expiry_date = _as_datetime(cert_dict['expiry_date'])
+    # Handle both boolean (PostgreSQL) and integer (SQLite) for is_active
+    if cert_dict['is_active'] not in (True, 1):
+        status = 'revoked'
+    elif expiry_date and expiry_date < datetime.now():
+        status = 'expired'
+    else:
+        status = 'valid'
+    return _result(status, cert_dict, expiry_date if status == 'valid' else None)
+
+
+def _result(status, certificate, expires_at):
+    body = json.dumps([status, certificate], sort_keys=True, default=str)
+    return {
+        'status': status,
+        'certificate': certificate,
+        'expires_at': expires_at,
+        'etag': hashlib.sha256(body.encode()).hexdigest()[:32]
+    }
+
+
+def get_verification(cert_id):
+    """
+    {'status': valid | expired | revoked | not_found, 'certificate', 'etag', 'max_age'}
+
+    ``max_age`` is how long the result may be reused: the cache TTL, cut short at expiry.
+    """
+    result = _verification_cache.get_or_set(cert_id, lambda: _load(cert_id), ttl=_ttl)
+    return dict(result, max_age=int(_ttl(result)))
+
+
+def _ttl(result):
+    if result['status'] == 'not_found':
+        return CERT_VERIFY_MISS_TTL
+    if result['expires_at']:
+        return max(0.0, min(CERT_VERIFY_CACHE_TTL, (result['expires_at'] - datetime.now()).total_seconds()))
+    return CERT_VERIFY_CACHE_TTL
+
+
+def invalidate_certificates(cert_unique_ids):
+    """Drop cached results for these certificates once the current transaction commits"""
+    cert_unique_ids = [cert_id for cert_id in cert_unique_ids if cert_id]
+    if cert_unique_ids:
+        db.after_commit(lambda: [_verification_cache.invalidate(cert_id) for cert_id in cert_unique_ids])
+
+
+def invalidate_active_certificates(student_id):
+    """Invalidate the student's active certificates; call before deactivating them"""
+    is_active_val = "TRUE" if is_postgres() else "1"
+    rows = db.execute_query(
+        f"SELECT certificate_unique_id FROM certificates WHERE student_id = ? AND is_active = {is_active_val}",
+        (student_id,),
+        fetch_all=True
+    )
+    invalidate_certificates([row['certificate_unique_id'] for row in rows])
@@ -0,0 +1,71 @@
+"""
+Background job worker - processes queued jobs (e.g. bulk certificate issuance)
+and delivers queued email from the outbox.
+
+    python worker.py                 # one queue-polling process
+    python worker.py --processes 2
+
+Certificate rendering inside a worker already fans out over a process pool
+sized to the cores (CERTIFICATE_RENDER_PROCESSES), so one process is usually
+enough; more processes mainly add queue-polling redundancy.
+
+Run it next to the web service and set JOB_WORKER_THREADS=0 (and
+EMAIL_SENDER_THREADS=0) there, or rely on the threads the web process starts
+by default.
+"""
+
+import os
+import sys
+import signal
+import threading
+import argparse
+import multiprocessing
+from dotenv import load_dotenv
+
+# Load environment variables before database picks its backend
+load_dotenv()
+
+import jobs
+import outbox
+import tasks  # registers background job handlers
+
+
+def _worker_process(index):
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    print(f"👷 Job worker {index} started (pid {os.getpid()})")
+    sender = threading.Thread(target=outbox.run_sender, kwargs={'stop_event': stop_event}, name=f'email-sender-{index}', daemon=True)
+    sender.start()
+    jobs.run_worker(stop_event=stop_event)
+    sender.join(timeout=outbox.EMAIL_LEASE_SECONDS)
+    print(f"👋 Job worker {index} stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WAPL background job worker')
+    parser.add_argument('--processes', type=int, default=int(os.environ.get('JOB_WORKER_PROCESSES', 1)))
+    args = parser.parse_args()
+
+    processes = [
+        multiprocessing.Process(target=_worker_process, args=(index,), name=f'job-worker-{index}')
+        for index in range(max(1, args.processes))
+    ]
+    for process in processes:
+        process.start()
+
+    def _shutdown(*_):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+
+    for process in processes:
+        process.join()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())